@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark: peak memory when attaching a large file with add_document_by_path
+
+Compares reading the whole file and base64 encoding it in one go (the previous
+approach) with the memory-mapped, chunked encoding now used by the BundleHelper.
+Memory is measured with tracemalloc.
+
+Usage:
+    python benchmarks/bench_document_memory.py [SIZE_IN_MB]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from base64 import b64encode
+
+from blueink import BundleHelper
+
+
+def read_and_encode(file_path: str):
+    with open(file_path, "rb") as file:
+        return b64encode(file.read()).decode("utf-8")
+
+
+def add_document_by_path(file_path: str):
+    bh = BundleHelper(file_cache=None)
+    bh.add_document_by_path(file_path)
+    return bh
+
+
+def measure(label: str, func, file_path: str, size: int):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func(file_path)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    encoded_size = 4 * ((size + 2) // 3)
+    print(
+        f"{label:<24} {peak / 1024 / 1024:8.1f} MiB peak"
+        f" ({peak / encoded_size:.2f}x encoded size) {elapsed:6.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    size = int(float(sys.argv[1] if len(sys.argv) > 1 else 200) * 1024 * 1024)
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as file:
+        file.write(os.urandom(size))
+        file.flush()
+
+        print(f"File size: {size / 1024 / 1024:.0f} MiB")
+        measure("read() + b64encode()", read_and_encode, file.name, size)
+        measure("add_document_by_path()", add_document_by_path, file.name, size)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark: compiling many Persons with the PersonHelper
+
+Compares building the contact channels as ContactChannelSchema models validated
+again by PersonSchema (the previous PersonHelper.as_dict()) with the current
+PersonHelper.as_dicts(), which still validates the name and metadata with
+PersonSchema, on a first and a repeated sync. Also checks that helpers created
+with default arguments no longer share their lists.
+
+Usage:
+    python benchmarks/bench_person_helper.py [NUMBER_OF_PERSONS]
+"""
+
+import sys
+import time
+
+from blueink.model.persons import ContactChannelSchema, PersonSchema
+from blueink.person_helper import PersonHelper
+
+
+def previous_as_dict(helper: PersonHelper) -> dict:
+    channels = []
+    for email in helper.get_emails():
+        channels.append(ContactChannelSchema(email=email, kind="em"))
+    for phone in helper.get_phones():
+        channels.append(ContactChannelSchema(phone=phone, kind="mp"))
+
+    person = PersonSchema(
+        name=helper._name, metadata=helper._metadata, channels=channels
+    )
+    return person.dict(exclude_unset=True)
+
+
+def make_helpers(n_persons: int):
+    helpers = []
+    for i in range(n_persons):
+        helper = PersonHelper(name=f"Person {i}", metadata={"crm_id": i})
+        helper.add_email(f"person{i}@example.com")
+        helper.add_phone(f"505555{i:04d}")
+        helpers.append(helper)
+    return helpers
+
+
+def measure(label: str, func, helpers):
+    start = time.perf_counter()
+    result = func(helpers)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<28} {elapsed:8.2f} s"
+        f" {elapsed / len(helpers) * 1e6:8.1f} us/person"
+    )
+    return result
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"Persons: {n}")
+    helpers = make_helpers(n)
+
+    channels = sum(len(h.get_emails()) + len(h.get_phones()) for h in helpers)
+    print(f"Channels held by the helpers: {channels} (expected {2 * n})")
+
+    before = measure(
+        "PersonSchema per person", lambda hs: [previous_as_dict(h) for h in hs], helpers
+    )
+    after = measure("PersonHelper.as_dicts()", PersonHelper.as_dicts, helpers)
+    assert before == after
+
+    # A long-running sync sees the same contacts again; validated emails are cached
+    measure("as_dicts(), repeated sync", PersonHelper.as_dicts, helpers)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark: concurrent API requests over the requests, urllib3 and HTTP/2 (httpx)
+transports
+
+Sends the same batch of GET requests through RequestHelper, from a thread pool as
+the *_many methods do, with each transport. By default the requests go to a local
+fake API (a threaded http.server adding a fixed latency per request), which only
+speaks HTTP/1.1: over plain HTTP, httpx falls back to HTTP/1.1 too, so this
+measures the transports' overhead and connection reuse. Pass --url to measure
+multiplexing against a server that negotiates HTTP/2 over TLS.
+
+Requires httpx with HTTP/2 support: pip install httpx[http2]
+
+Usage:
+    python benchmarks/bench_transport.py [--requests N] [--workers N]
+        [--latency SECONDS] [--url URL --api-key KEY]
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from blueink.batch import run_batch
+from blueink.request_helper import RequestHelper
+from blueink.transport import HttpxTransport, RequestsTransport, Urllib3Transport
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are sent separately; don't let them wait for an ACK
+    disable_nagle_algorithm = True
+    latency = 0.02
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        payload = json.dumps({"id": self.path, "status": "co"}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # The default of 5 drops connections under load
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+def measure(label: str, helper: RequestHelper, urls, workers: int):
+    start = time.perf_counter()
+    results = list(run_batch(helper.get, urls, max_workers=workers))
+    elapsed = time.perf_counter() - start
+    failed = sum(not result.ok for result in results)
+    print(
+        f"{label:<24} {elapsed:8.2f} s {len(urls) / elapsed:8.0f} requests/s"
+        f"  failed: {failed}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--url", help="endpoint to GET instead of the fake API")
+    parser.add_argument("--api-key", default="benchmark")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        FakeApiHandler.latency = args.latency
+        server = CountingServer(("127.0.0.1", 0), FakeApiHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/bundles/"
+
+    urls = [url] * args.requests
+    print(f"Requests: {args.requests}, workers: {args.workers}, url: {url}")
+
+    for label, make_transport in (
+        ("RequestsTransport", RequestsTransport),
+        ("Urllib3Transport", Urllib3Transport),
+        ("HttpxTransport (HTTP/2)", HttpxTransport),
+    ):
+        helper = RequestHelper(args.api_key, transport=make_transport())
+        if server is not None:
+            server.connections = 0
+        try:
+            measure(label, helper, urls, args.workers)
+        finally:
+            helper.close()
+        if server is not None:
+            print(f"{'':<24} connections opened: {server.connections}")
+
+    if server is not None:
+        server.shutdown()
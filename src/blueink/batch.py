@@ -0,0 +1,191 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator
+
+import requests
+
+# Default number of concurrent requests made by the bulk (*_many) methods
+DEFAULT_MAX_WORKERS = 8
+
+# Default delay before the first retry of a failed item, doubled on each retry
+DEFAULT_BACKOFF = 1.0
+
+
+class BatchResult:
+    def __init__(
+        self,
+        index: int,
+        item: Any,
+        response=None,
+        error: Exception = None,
+        action: str = None,
+        attempts: int = 1,
+    ):
+        """Outcome of one item of a batch operation
+
+        Args:
+            index: position of the item in the input
+            item: the input item, eg. a packet ID or a BundleHelper
+            response: the return value for the item, typically a NormalizedResponse
+            error: the exception raised for the item, if it failed
+            action: what was (or was to be) done for the item, for operations
+                that decide per item, eg. "created", "updated" or "unchanged"
+            attempts: number of times the item was tried, including retries
+        """
+        self.index = index
+        self.item = item
+        self.response = response
+        self.error = error
+        self.action = action
+        self.attempts = attempts
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self):
+        outcome = "ok" if self.ok else f"error={self.error!r}"
+        if self.action:
+            outcome = f"{self.action} {outcome}"
+        if self.attempts > 1:
+            outcome = f"{outcome} after {self.attempts} attempts"
+        return f"<BatchResult {self.index} {self.item!r} {outcome}>"
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """Thread-safe token bucket, limiting how often an operation can start
+
+        Args:
+            rate: sustained number of operations per second
+            burst: number of operations that can start at once after idling
+            clock: returns the current time in seconds
+            sleep: waits for a number of seconds
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self._interval = 1.0 / rate
+        self._burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        # Theoretical arrival time of the next operation, at the sustained rate
+        self._next_at = clock()
+
+    def acquire(self):
+        """Wait until an operation may start"""
+        with self._lock:
+            now = self._clock()
+            next_at = max(self._next_at, now)
+            start = max(now, next_at - (self._burst - 1) * self._interval)
+            self._next_at = next_at + self._interval
+        if start > now:
+            self._sleep(start - now)
+
+
+def check_response(response):
+    """Raise an HTTPError for a response with an error status
+
+    Clients created with raise_exceptions=False return error responses rather than
+    raising; bulk methods check them with this, so failed items are reported (and
+    retried) as errors either way.
+    """
+    status = getattr(response, "status", None)
+    if status is not None and status >= 400:
+        raise requests.HTTPError(
+            f"{status} Error", response=getattr(response, "original_response", None)
+        )
+    return response
+
+
+def is_transient(error: Exception) -> bool:
+    """Return whether a failed request is worth retrying: connection errors,
+    timeouts, rate limiting (429) and server errors (5xx)"""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return False
+
+
+def retry_after(headers) -> float:
+    """Return the seconds to wait requested by the Retry-After header of a 429 or
+    503 response, or 0"""
+    try:
+        return float((headers or {}).get("Retry-After", 0))
+    except ValueError:
+        return 0  # An HTTP date, which isn't worth parsing here
+
+
+def run_batch(
+    func: Callable,
+    items: Iterable,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_pending: int = None,
+    rate_limiter: RateLimiter = None,
+    retries: int = 0,
+    backoff: float = DEFAULT_BACKOFF,
+    retry_if: Callable[[Exception], bool] = is_transient,
+) -> Iterator[BatchResult]:
+    """Call func for every item concurrently, yielding results in input order
+
+    Items are consumed lazily; at most max_pending of them are submitted or
+    completed-but-not-yet-yielded at any time, so memory stays bounded however many
+    items there are. An exception raised by func fails only that item, after up to
+    `retries` more attempts if retry_if(exception) is true.
+
+    Args:
+        func: called with each item, in a worker thread
+        items: any iterable, including a generator
+        max_workers: number of worker threads
+        max_pending: bound on in-flight items (default: 2 * max_workers)
+        rate_limiter: Optional RateLimiter, acquired before every call to func
+        retries: number of times a failed item is retried
+        backoff: seconds before the first retry, doubled for each further one. A
+            longer Retry-After sent by the server is honored.
+        retry_if: tells whether an exception is worth retrying
+
+    Returns:
+        iterator of BatchResult, in the same order as items
+    """
+    if max_pending is None:
+        max_pending = 2 * max_workers
+
+    def call(item):
+        attempt = 1
+        while True:
+            try:
+                if rate_limiter is not None:
+                    rate_limiter.acquire()
+                return func(item), None, attempt
+            except Exception as e:
+                if attempt > retries or not retry_if(e):
+                    return None, e, attempt
+                response = getattr(e, "response", None)
+                delay = retry_after(getattr(response, "headers", None))
+                time.sleep(max(backoff * 2 ** (attempt - 1), delay))
+                attempt += 1
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for index, item in enumerate(items):
+            pending.append((index, item, executor.submit(call, item)))
+            if len(pending) >= max_pending:
+                yield _result(*pending.popleft())
+
+        while pending:
+            yield _result(*pending.popleft())
+
+
+def _result(index, item, future) -> BatchResult:
+    response, error, attempts = future.result()
+    return BatchResult(index, item, response=response, error=error, attempts=attempts)
@@ -1,8 +1,17 @@
+import copy
+import functools
 import io
+import json
+import mimetypes
 from base64 import b64encode
+from collections.abc import Mapping
 from os.path import basename
-from typing import List
+from typing import TYPE_CHECKING, Iterable, List
 
+from pydantic.json import pydantic_encoder
+
+from blueink.constants import FIELD_KIND
+from blueink.field_store import FieldStore
 from blueink.model.bundles import (
     AutoPlacement,
     Bundle,
@@ -11,12 +20,103 @@ from blueink.model.bundles import (
     EnvelopeTemplateFieldValue,
     Field,
     ImportedDocument,
+    KeyGenerator,
     Packet,
     TemplateRef,
     TemplateRefAssignment,
     TemplateRefFieldValue,
     ValidationError,
 )
+from blueink.utils.files import (
+    EncodedFileCache,
+    b64_content_digest,
+    content_digest,
+    encode_file,
+    encode_file_object,
+    encoded_file_cache,
+)
+
+if TYPE_CHECKING:
+    from blueink.template_registry import TemplateRegistry
+
+# Positional column order for tuple rows passed to add_fields / add_auto_placements
+FIELD_COLUMNS = ("x", "y", "w", "h", "p", "kind", "editors", "label", "key")
+AUTO_PLACEMENT_COLUMNS = (
+    "kind",
+    "search",
+    "w",
+    "h",
+    "offset_x",
+    "offset_y",
+    "editors",
+    "page",
+)
+
+
+def _is_missing(value) -> bool:
+    # None, or NaN as used by pandas / numpy for missing values
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def _tolist(values) -> list:
+    # numpy arrays and pandas Series convert their scalars to python types
+    tolist = getattr(values, "tolist", None)
+    return tolist() if tolist is not None else list(values)
+
+
+def _as_row_dicts(rows, columns: tuple) -> List[dict]:
+    """Normalize tabular input to one dict per row, dropping missing values
+
+    Args:
+        rows: an iterable of tuples (in the order given by columns) or of dicts,
+            a dict of column lists, a pandas DataFrame, or a numpy array
+            (structured, or 2D with columns in the order given by columns)
+        columns: column names for positional (tuple) rows
+
+    Returns:
+        list of dicts
+    """
+    names = getattr(getattr(rows, "dtype", None), "names", None)
+    if names:
+        rows = {name: rows[name] for name in names}
+    elif hasattr(rows, "columns") and hasattr(rows, "__getitem__"):
+        rows = {name: rows[name] for name in rows.columns}
+    elif hasattr(rows, "tolist") and not isinstance(rows, Mapping):
+        rows = rows.tolist()
+
+    if isinstance(rows, Mapping):
+        names = list(rows.keys())
+        values = [_tolist(column) for column in rows.values()]
+        if len({len(column) for column in values}) > 1:
+            raise ValueError("All columns must have the same length")
+        rows = (dict(zip(names, row)) for row in zip(*values))
+
+    out = []
+    for idx, row in enumerate(rows):
+        if not isinstance(row, Mapping):
+            if len(row) > len(columns):
+                raise ValueError(
+                    f"Row {idx} has {len(row)} values, expected at most {len(columns)}"
+                )
+            row = zip(columns, row)
+        else:
+            row = row.items()
+        out.append({k: v for k, v in row if not _is_missing(v)})
+    return out
+
+
+def _mutator(method):
+    """Refuse to run a method that changes the helper, once it has been frozen"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._frozen:
+            raise RuntimeError(
+                "This BundleHelper is frozen. Use clone() to get a modifiable copy."
+            )
+        return method(self, *args, **kwargs)
+
+    return wrapper
 
 
 class BundleHelper:
@@ -31,6 +131,11 @@ class BundleHelper:
         team: str = None,
         signing_brand: str = None,
         expires: str = None,
+        trusted: bool = False,
+        seed=None,
+        dedupe_documents: bool = False,
+        file_cache: EncodedFileCache = encoded_file_cache,
+        template_registry: "TemplateRegistry" = None,
     ):
         """Helper class to aid building a Bundle.
 
@@ -46,6 +151,20 @@ class BundleHelper:
             team:
             signing_brand:
             expires:
+            trusted: skip model validation while building, for data that was
+                already validated upstream. Call validate() to check on demand.
+            seed: Optional seed for the generated document, field and packet keys,
+                so that the same build steps always produce the same keys
+            dedupe_documents: upload each distinct file content only once, as a
+                multipart file referenced via "file_index" by every document with
+                that content. Otherwise each document carries its own "file_b64"
+                (identical contents still share one encoded copy in memory).
+            file_cache: process-wide cache of encoded file contents, keyed by
+                content digest and, for paths, by modification time. Pass None
+                to disable caching.
+            template_registry: Optional TemplateRegistry. Template roles and field
+                keys are then checked against it as they are added, raising a
+                ValidationError before anything is sent.
         """
         self._label = label
         self._in_order = in_order
@@ -55,20 +174,151 @@ class BundleHelper:
         self._cc_emails = []
         self._documents = {}
         self._packets = {}
+        # document key -> FieldStore, fields are only expanded on serialization
+        self._fields = {}
         self._custom_key = custom_key
         self._team = team
         self._signing_brand = signing_brand
         self._expires = expires
         self._envelope_template = None
+        self._trusted = trusted
+        # Generated keys are unique within this Bundle
+        self._keys = KeyGenerator(seed)
+
+        # A frozen helper can't be changed, only cloned. A clone shares the
+        # documents, field stores and envelope template of its prototype until it
+        # modifies them, see _writable_document() and _writable_fields()
+        self._frozen = False
+        self._shared_documents = set()
+        self._shared_fields = set()
+        self._shared_envelope_template = False
+
+        # One encoded payload per distinct file content, keyed by content digest
+        self._payloads = {}
+        self._dedupe_documents = dedupe_documents
+        self._file_cache = file_cache
+        self._template_registry = template_registry
+        self._file_indexes = {}  # content digest -> index into self.files
 
         # for file uploads, index should match those in the document "file_index" field
         self.file_names = []
         self.file_types = []
         self.files = []
 
+    def __getstate__(self):
+        # The registry is only needed while building, and can't be pickled; a
+        # helper compiled in another process goes without it
+        state = self.__dict__.copy()
+        state["_template_registry"] = None
+        return state
+
+    def freeze(self) -> "BundleHelper":
+        """Make this helper read-only, so that it can be used as a prototype.
+
+        Any later attempt to add to or change the helper raises a RuntimeError. Use
+        clone() to get modifiable copies.
+
+        Returns:
+            self
+        """
+        self._frozen = True
+        return self
+
+    def clone(self) -> "BundleHelper":
+        """Return a cheap, modifiable copy of this frozen helper.
+
+        Documents (including their encoded file payloads), fields and the envelope
+        template are shared with the prototype, and only copied by the clone when it
+        modifies them (eg. via set_value() or add_field()). Signers added to the
+        clone belong to the clone only. Keys generated by the clone never collide
+        with those of the prototype.
+
+        Returns:
+            a new BundleHelper
+
+        Raises:
+            RuntimeError if this helper is not frozen
+        """
+        if not self._frozen:
+            raise RuntimeError("Only a frozen BundleHelper can be cloned.")
+
+        clone = copy.copy(self)
+        clone._frozen = False
+        clone._cc_emails = list(self._cc_emails)
+        clone._documents = dict(self._documents)
+        clone._packets = dict(self._packets)
+        clone._fields = dict(self._fields)
+        clone._keys = self._keys.spawn()
+        clone._shared_documents = set(self._documents)
+        clone._shared_fields = set(self._fields)
+        clone._shared_envelope_template = self._envelope_template is not None
+        clone.file_names = list(self.file_names)
+        clone.file_types = list(self.file_types)
+        clone.files = list(self.files)
+        clone._payloads = dict(self._payloads)
+        clone._file_indexes = dict(self._file_indexes)
+        return clone
+
+    def _writable_document(self, document_key: str):
+        """Return the document, first copying it if it is shared with a prototype"""
+        document = self._documents[document_key]
+        if document_key in self._shared_documents:
+            # The lists are the only parts of a document modified in place
+            document = document.copy(
+                update={
+                    name: list(value)
+                    for name, value in document
+                    if isinstance(value, list)
+                }
+            )
+            self._documents[document_key] = document
+            self._shared_documents.discard(document_key)
+        return document
+
+    def _writable_fields(self, document_key: str) -> FieldStore:
+        """Return the document's FieldStore, creating or un-sharing it as needed"""
+        store = self._fields.get(document_key)
+        if store is None:
+            store = self._fields[document_key] = FieldStore()
+        elif document_key in self._shared_fields:
+            store = self._fields[document_key] = store.copy()
+            self._shared_fields.discard(document_key)
+        return store
+
+    def _template_problems(
+        self,
+        template_id: str,
+        roles: Iterable[str] = (),
+        field_keys: Iterable[str] = (),
+        registry: "TemplateRegistry" = None,
+    ) -> List[str]:
+        """Check roles and field keys against the template definition in the
+        registry (by default the helper's), if there is one"""
+        registry = registry if registry is not None else self._template_registry
+        if registry is None:
+            return []
+        entry = registry.get(template_id, fetch=True)
+        if entry is None:
+            return [f"Template {template_id} not found"]
+        return entry.problems(roles, field_keys)
+
+    def _check_template(self, template_id: str, roles=(), field_keys=()):
+        problems = self._template_problems(template_id, roles, field_keys)
+        if problems:
+            raise ValidationError("; ".join(problems))
+
+    def _new_key(self, type: str, key: str = None) -> str:
+        """Return the caller supplied key (reserving it), or generate a unique one"""
+        if key:
+            self._keys.reserve(key)
+            return key
+        return self._keys.generate(type)
+
+    @_mutator
     def add_cc(self, email: str):
         self._cc_emails.append(email)
 
+    @_mutator
     def add_document_by_url(self, url: str, **additional_data) -> str:
         """Add a file using a URL
 
@@ -79,13 +329,22 @@ class BundleHelper:
         Returns:
             Document Key
         """
-        document = Document.create(file_url=url, **additional_data)
+        document = Document.create(
+            key=self._new_key("doc", additional_data.pop("key", None)),
+            file_url=url,
+            trusted=self._trusted,
+            **additional_data,
+        )
         self._documents[document.key] = document
         return document.key
 
+    @_mutator
     def add_document_by_path(self, file_path: str, **additional_data) -> str:
         """Add a file using a file path. File context used, should safely open/close file
 
+        The file is memory-mapped and encoded in chunks, see
+        blueink.utils.files.encode_file()
+
         Args:
             file_path:
             additional_data:
@@ -95,11 +354,14 @@ class BundleHelper:
         """
         filename = basename(file_path)
 
-        with open(file_path, "rb") as file:
-            b64str = b64encode(file.read()).decode("utf-8")
+        if self._file_cache is not None:
+            digest, b64str = self._file_cache.encode_path(file_path)
+        else:
+            digest, b64str = encode_file(file_path)
 
-        return self.add_document_by_b64(filename, b64str, **additional_data)
+        return self._add_encoded_document(filename, b64str, digest, **additional_data)
 
+    @_mutator
     def add_document_by_file(self, file: io.FileIO, **additional_data) -> str:
         """Add a file using a file path. File context used, should safely open/close file
 
@@ -112,12 +374,15 @@ class BundleHelper:
         """
         filename = file.name
 
-        file.seek(0)
-        b64str = b64encode(file.read()).decode("utf-8")
+        digest, b64str = encode_file_object(file)
         file.flush()
 
-        return self.add_document_by_b64(filename, b64str, **additional_data)
+        if self._file_cache is not None:
+            b64str = self._file_cache.put(digest, b64str)
 
+        return self._add_encoded_document(filename, b64str, digest, **additional_data)
+
+    @_mutator
     def add_document_by_html(self, html_content: str, **additional_data) -> str:
         """Add a document using an HTML string for HTML-to-PDF conversion.
 
@@ -128,10 +393,16 @@ class BundleHelper:
         Returns:
             Document Key
         """
-        document = Document.create(file_html=html_content, **additional_data)
+        document = Document.create(
+            key=self._new_key("doc", additional_data.pop("key", None)),
+            file_html=html_content,
+            trusted=self._trusted,
+            **additional_data,
+        )
         self._documents[document.key] = document
         return document.key
 
+    @_mutator
     def add_document_by_b64(self, filename: str, b64str: str, **additional_data):
         """Add a file using a b64 string; utf-8 encoded
 
@@ -143,15 +414,54 @@ class BundleHelper:
         Returns:
             Document Key
         """
-        file_index = len(self.files)
+        digest = b64_content_digest(b64str)
+        return self._add_encoded_document(filename, b64str, digest, **additional_data)
+
+    def _add_encoded_document(
+        self, filename: str, b64str: str, digest: str, **additional_data
+    ) -> str:
+        """Add a document with base64 encoded content, keeping one copy per content
+
+        Args:
+            filename:
+            b64str:
+            digest: content digest of the file, see blueink.utils.files
+            additional_data:
+
+        Returns:
+            Document Key
+        """
+        b64str = self._payloads.setdefault(digest, b64str)
+
+        if self._dedupe_documents:
+            file_index = self._file_indexes.get(digest)
+            if file_index is None:
+                file_index = self._file_indexes[digest] = len(self.files)
+                content_type = mimetypes.guess_type(filename)[0]
+                self.files.append(
+                    {
+                        "filename": filename,
+                        "file_b64": b64str,
+                        "content_type": content_type,
+                    }
+                )
+                self.file_names.append(filename)
+                self.file_types.append(content_type)
+            content = {"file_index": file_index}
+        else:
+            content = {"file_b64": b64str}
 
         document = Document.create(
-            filename=filename, file_b64=b64str, **additional_data
+            key=self._new_key("doc", additional_data.pop("key", None)),
+            filename=filename,
+            trusted=self._trusted,
+            **content,
+            **additional_data,
         )
-        print(f"doc -- {document.key}")
         self._documents[document.key] = document
         return document.key
 
+    @_mutator
     def add_document_by_bytearray(
         self, filename: str, byte_array: bytearray, **additional_data
     ) -> str:
@@ -165,13 +475,18 @@ class BundleHelper:
         Returns:
             Document Key
         """
+        return self._add_document_by_bytes(filename, byte_array, **additional_data)
 
-        bytes = io.BytesIO(byte_array)
-        with io.BufferedReader(bytes, len(byte_array)) as file:
-            b64str = b64encode(file.read()).decode("utf-8")
+    def _add_document_by_bytes(self, filename: str, data: bytes, **additional_data):
+        if self._file_cache is not None:
+            digest, b64str = self._file_cache.encode_bytes(data)
+        else:
+            digest = content_digest(data)
+            b64str = b64encode(data).decode("utf-8")
 
-        return self.add_document_by_b64(filename, b64str, **additional_data)
+        return self._add_encoded_document(filename, b64str, digest, **additional_data)
 
+    @_mutator
     def add_document_template(
         self,
         template_id: str,
@@ -188,34 +503,44 @@ class BundleHelper:
 
         Returns:
             document key
+
+        Raises:
+            ValidationError if a role or field key isn't in the template, when the
+            helper has a template_registry
         """
         if template_id in self._documents.keys():
             raise RuntimeError(
                 f"Document/Template with id {template_id} already added."
             )
+        self._check_template(template_id, assignments, initial_field_values)
 
         assigns = []
         for role, signer in assignments.items():
-            ref = TemplateRefAssignment.create(role=role, signer=signer)
+            ref = TemplateRefAssignment.create(
+                role=role, signer=signer, trusted=self._trusted
+            )
             assigns.append(ref)
 
         vals = []
         for field_key, init_val in initial_field_values.items():
             fieldval = TemplateRefFieldValue.create(
-                key=field_key, initial_value=init_val
+                key=field_key, initial_value=init_val, trusted=self._trusted
             )
             vals.append(fieldval)
 
         template = TemplateRef.create(
+            key=self._new_key("tmpl", additional_data.pop("key", None)),
             template_id=template_id,
             assignments=assigns,
             field_values=vals,
+            trusted=self._trusted,
             **additional_data,
         )
 
         self._documents[template.key] = template
         return template.key
 
+    @_mutator
     def add_field(
         self,
         document_key: str,
@@ -263,29 +588,178 @@ class BundleHelper:
         if document_key not in self._documents:
             raise RuntimeError(f"No document found with key {document_key}!")
 
-        field = Field.create(
-            x,
-            y,
-            w,
-            h,
-            p,
-            kind,
-            label=label,
+        optional_data = dict(
             v_pattern=v_pattern,
             v_min=v_min,
             v_max=v_max,
             v_regex=v_regex,
             v_regex_msg=v_regex_msg,
             v_attachment_types=v_attachment_types,
-            key=key,
             **additional_data,
         )
-        for packet_key in editors:
-            field.add_editor(packet_key)
+        editors = list(editors) if editors else None
+
+        store = self._writable_fields(document_key)
+
+        if self._trusted:
+            key = self._new_key("field", key)
+            store.append(key, kind, x, y, w, h, p, label, editors, optional_data)
+            return key
 
-        self._documents[document_key].add_field(field)
+        # Validate through the Field model, but only keep its values
+        field = Field.create(
+            x,
+            y,
+            w,
+            h,
+            p,
+            kind,
+            key=self._new_key("field", key),
+            label=label,
+            editors=editors,
+            **optional_data,
+        )
+        store.append_field(field)
         return field.key
 
+    @_mutator
+    def add_fields(
+        self, document_key: str, rows: Iterable, editors: List[str] = None
+    ) -> List[str]:
+        """Create and add many fields to a particular document in one call.
+
+        All rows are validated in a single pass (unless the helper is trusted)
+        before any field is added, so either all fields are added or none.
+
+        Args:
+            document_key:
+            rows: the fields, as an iterable of tuples in FIELD_COLUMNS order
+                (x, y, w, h, p, kind[, editors, label, key]), an iterable of
+                dicts, a dict of column lists, a pandas DataFrame or a numpy
+                array. Dict / column input may also contain any other field
+                attribute, eg. v_min or v_regex.
+            editors: Optional packet keys used for every row without its own editors
+
+        Returns:
+            Field keys [List[str]], in row order
+
+        Raises:
+            RuntimeError if the document does not exist
+            ValidationError if any row has an invalid kind, coordinates or editors
+        """
+        if document_key not in self._documents:
+            raise RuntimeError(f"No document found with key {document_key}!")
+
+        rows = _as_row_dicts(rows, FIELD_COLUMNS)
+        if not self._trusted:
+            self._check_rows(
+                rows, ("x", "y", "w", "h", "kind"), ("x", "y", "w", "h", "p"), editors
+            )
+
+        store = self._writable_fields(document_key)
+
+        keys = []
+        for row in rows:
+            key = self._new_key("field", row.pop("key", None))
+            row_editors = row.pop("editors", None) or editors
+            store.append(
+                key,
+                row.pop("kind"),
+                row.pop("x"),
+                row.pop("y"),
+                row.pop("w"),
+                row.pop("h"),
+                page=row.pop("p", None),
+                label=row.pop("label", None),
+                editors=list(row_editors) if row_editors else None,
+                extra=row,
+            )
+            keys.append(key)
+        return keys
+
+    @_mutator
+    def add_auto_placements(
+        self, document_key: str, rows: Iterable, editors: List[str] = None
+    ):
+        """Add many auto-placement fields to a document in one call.
+
+        All rows are validated in a single pass (unless the helper is trusted)
+        before any auto-placement is added.
+
+        Args:
+            document_key: Key of the document to add the auto-placements to
+            rows: the auto-placements, as an iterable of tuples in
+                AUTO_PLACEMENT_COLUMNS order (kind, search, w, h[, offset_x,
+                offset_y, editors, page]), an iterable of dicts, a dict of column
+                lists, a pandas DataFrame or a numpy array
+            editors: Optional signer keys used for every row without its own editors
+
+        Raises:
+            RuntimeError if the document does not exist
+            ValidationError if any row has an invalid kind, size or editors
+        """
+        if document_key not in self._documents:
+            raise RuntimeError(f"No document found with key {document_key}!")
+
+        rows = _as_row_dicts(rows, AUTO_PLACEMENT_COLUMNS)
+        if not self._trusted:
+            self._check_rows(
+                rows,
+                ("kind", "search", "w", "h"),
+                ("w", "h", "offset_x", "offset_y", "page"),
+                editors,
+            )
+
+        document = self._writable_document(document_key)
+        for row in rows:
+            row_editors = row.pop("editors", None) or editors
+            if row_editors:
+                row["editors"] = list(row_editors)
+            # Already validated above
+            document.add_auto_placement(AutoPlacement.create(trusted=True, **row))
+
+    def _check_rows(
+        self,
+        rows: List[dict],
+        required: tuple,
+        integers: tuple,
+        editors: List[str] = None,
+    ):
+        """Validate normalized rows for add_fields / add_auto_placements in one pass
+
+        Integer columns are coerced in place, as the models would.
+
+        Raises:
+            ValidationError describing the first kind of problem found
+        """
+        allowed_kinds = set(FIELD_KIND.values())
+        used_editors = set(editors or ())
+        for idx, row in enumerate(rows):
+            missing = [name for name in required if name not in row]
+            if missing:
+                raise ValidationError(f"Row {idx} is missing {', '.join(missing)}")
+            if row["kind"] not in allowed_kinds:
+                raise ValidationError(
+                    f"Row {idx}: Field Kind '{row['kind']}' not allowed."
+                    f" Must be one of {FIELD_KIND.values()}"
+                )
+            for name in integers:
+                if name in row:
+                    try:
+                        row[name] = int(row[name])
+                    except (TypeError, ValueError):
+                        raise ValidationError(
+                            f"Row {idx}: {name} must be an integer, got {row[name]!r}"
+                        )
+            used_editors.update(row.get("editors") or ())
+
+        unknown_editors = used_editors - self._packets.keys()
+        if unknown_editors:
+            raise ValidationError(
+                f"Editors without a corresponding packet: {sorted(unknown_editors)}"
+            )
+
+    @_mutator
     def add_auto_placement(
         self,
         document_key: str,
@@ -346,6 +820,7 @@ class BundleHelper:
             offset_y=offset_y,
             page=page,
             v_attachment_types=v_attachment_types,
+            trusted=self._trusted,
             **additional_data,
         )
 
@@ -353,8 +828,9 @@ class BundleHelper:
             for editor_key in editors:
                 auto_placement.add_editor(editor_key)
 
-        self._documents[document_key].add_auto_placement(auto_placement)
+        self._writable_document(document_key).add_auto_placement(auto_placement)
 
+    @_mutator
     def add_signer(
         self,
         name: str,
@@ -404,14 +880,16 @@ class BundleHelper:
             auth_id=auth_id,
             deliver_via=deliver_via,
             order=order,
-            key=key,
+            key=self._new_key("packet", key),
             requires_witness=requires_witness,
             witness_nominated_by=witness_nominated_by,
+            trusted=self._trusted,
             **additional_data,
         )
         self._packets[packet.key] = packet
         return packet.key
 
+    @_mutator
     def assign_role(
         self, document_key: str, signer_key: str, role: str, **additional_data
     ):
@@ -433,10 +911,14 @@ class BundleHelper:
             raise RuntimeError(
                 f"Signer {signer_key} does not have a corresponding packet"
             )
+        self._check_template(self._documents[document_key].template_id, roles=[role])
 
-        assignment = TemplateRefAssignment.create(role, signer_key, **additional_data)
-        self._documents[document_key].add_assignment(assignment)
+        assignment = TemplateRefAssignment.create(
+            role, signer_key, trusted=self._trusted, **additional_data
+        )
+        self._writable_document(document_key).add_assignment(assignment)
 
+    @_mutator
     def set_value(self, document_key: str, key: str, value: str, **additional_data):
         """Set a field's value in a document.
 
@@ -453,9 +935,16 @@ class BundleHelper:
                 f"Document found with key {document_key} is not a Template!"
             )
 
-        field_val = TemplateRefFieldValue.create(key, value, **additional_data)
-        self._documents[document_key].field_values.append(field_val)
+        self._check_template(
+            self._documents[document_key].template_id, field_keys=[key]
+        )
+
+        field_val = TemplateRefFieldValue.create(
+            key, value, trusted=self._trusted, **additional_data
+        )
+        self._writable_document(document_key).add_field_value(field_val)
 
+    @_mutator
     def set_envelope_template(
         self, template_id: str, field_values: dict = None, **additional_data
     ):
@@ -477,20 +966,25 @@ class BundleHelper:
                 field_values={"company_name": "ACME Corp"}
             )
         """
+        self._check_template(template_id, field_keys=field_values or ())
+
         vals = []
         if field_values:
             for field_key, init_val in field_values.items():
                 fieldval = EnvelopeTemplateFieldValue.create(
-                    key=field_key, initial_value=init_val
+                    key=field_key, initial_value=init_val, trusted=self._trusted
                 )
                 vals.append(fieldval)
 
+        self._shared_envelope_template = False
         self._envelope_template = EnvelopeTemplate.create(
             template_id=template_id,
             field_values=vals if vals else None,
+            trusted=self._trusted,
             **additional_data,
         )
 
+    @_mutator
     def add_envelope_template_field_value(
         self, key: str, initial_value: str, **additional_data
     ):
@@ -508,16 +1002,27 @@ class BundleHelper:
             raise RuntimeError(
                 "No envelope template set. Call set_envelope_template() first."
             )
+        self._check_template(self._envelope_template.template_id, field_keys=[key])
 
         field_val = EnvelopeTemplateFieldValue.create(
-            key=key, initial_value=initial_value, **additional_data
+            key=key,
+            initial_value=initial_value,
+            trusted=self._trusted,
+            **additional_data,
         )
+        if self._shared_envelope_template:
+            self._envelope_template = self._envelope_template.copy(
+                update={
+                    "field_values": list(self._envelope_template.field_values or [])
+                }
+            )
+            self._shared_envelope_template = False
         self._envelope_template.add_field_value(field_val)
 
     def _compile_bundle(self, **additional_data) -> Bundle:
         """
         Builds a Bundle object complete with all the packets (signers) and documents added through the course
-        of this BundleHelper's usage cycle.
+        of this BundleHelper's usage cycle. Fields are kept out of the Bundle and only added by as_data().
 
         :param additional_data: Optional and will append any additional kwargs to the json of the bundle
         :return:
@@ -537,10 +1042,57 @@ class BundleHelper:
             team=self._team,
             signing_brand=self._signing_brand,
             expires=self._expires,
+            trusted=self._trusted,
             **additional_data,
         )
         return bundle_out
 
+    def validate(self, template_registry: "TemplateRegistry" = None):
+        """Validate everything added to this helper in a single pass.
+
+        Intended for helpers built with trusted=True, where the per-object checks
+        (field kinds, deliver_via, email addresses, ...) were skipped while building.
+        Given a TemplateRegistry (or built with one), the roles and field keys used
+        with templates and the envelope template are checked against their
+        definitions too, without calling the API.
+
+        Args:
+            template_registry: Optional TemplateRegistry, defaults to the helper's
+
+        Raises:
+            ValidationError if a template role or field key is unknown
+            pydantic.ValidationError if any part of the Bundle is invalid
+        """
+        problems = []
+        for document in self._documents.values():
+            if type(document) is TemplateRef:
+                problems.extend(
+                    self._template_problems(
+                        document.template_id,
+                        [a.role for a in document.assignments or []],
+                        [v.key for v in document.field_values or []],
+                        registry=template_registry,
+                    )
+                )
+        if self._envelope_template is not None:
+            problems.extend(
+                self._template_problems(
+                    self._envelope_template.template_id,
+                    field_keys=[
+                        v.key for v in self._envelope_template.field_values or []
+                    ],
+                    registry=template_registry,
+                )
+            )
+        if problems:
+            raise ValidationError("; ".join(problems))
+
+        Bundle.parse_obj(self.as_data())
+        if self._envelope_template is not None:
+            EnvelopeTemplate.parse_obj(
+                self._envelope_template.dict(exclude_unset=True, exclude_none=True)
+            )
+
     def as_data(self, **additional_data):
         """Return a Bundle as a python dictionary
 
@@ -551,7 +1103,16 @@ class BundleHelper:
             Bundle as dictionary
         """
         bundle = self._compile_bundle(**additional_data)
-        return bundle.dict(exclude_unset=True, exclude_none=True)
+        data = bundle.dict(exclude_unset=True, exclude_none=True)
+        self._attach_fields(data["documents"])
+        return data
+
+    def _attach_fields(self, documents: List[dict]):
+        """Expand the stored fields into their serialized documents, in place"""
+        for document in documents:
+            store = self._fields.get(document.get("key"))
+            if store:
+                document.setdefault("fields", []).extend(store.as_dicts())
 
     def as_data_for_envelope_template(self, **additional_data):
         """Return data for creating a bundle from an envelope template.
@@ -619,5 +1180,4 @@ class BundleHelper:
         Returns:
             Bundle as json
         """
-        bundle = self._compile_bundle(**additional_data)
-        return bundle.json(exclude_unset=True, exclude_none=True)
+        return json.dumps(self.as_data(**additional_data), default=pydantic_encoder)
@@ -12,6 +12,7 @@ from blueink.subclients.packet import PacketSubClient
 from blueink.subclients.person import PersonSubClient
 from blueink.subclients.template import TemplateSubClient
 from blueink.subclients.webhook import WebhookSubClient
+from blueink.transport import Transport
 
 
 class Client:
@@ -21,6 +22,9 @@ class Client:
         base_url: str = None,
         raise_exceptions: bool = True,
         security_headers: dict = None,
+        http2: bool = False,
+        compression: str = None,
+        transport: Transport = None,
     ):
         """Initialize a Client instance to access the Blueink eSignature API
 
@@ -34,13 +38,22 @@ class Client:
             security_headers: Place for additional security headers, likely unnecessary
             raise_exceptions (Default True): raise HTTPError if code != 200. Otherwise
             return as NormalizedResponse objects.
+            http2: send requests over HTTP/2, multiplexing concurrent requests (eg.
+                from the *_many methods) on one connection. Requires httpx, see
+                RequestHelper.
+            compression: Optional "gzip" or "deflate", to compress large request
+                bodies, eg. Bundles with file_b64 or file_html documents
+            transport: Optional Transport sending the requests, eg. wrapped in
+                middlewares for retries, rate limiting or metrics. See
+                blueink.transport.
 
         Returns:
             A Client instance
 
         Raises:
             ValueError if a private API key is neither passed during instantiation
-            nor specified via the environment.
+            nor specified via the environment, or if both http2 and transport are
+            given.
         """
         if not private_api_key:
             private_api_key = environ.get(ENV_BLUEINK_PRIVATE_API_KEY)
@@ -64,6 +77,9 @@ class Client:
             private_api_key,
             raise_exceptions,
             security_headers=security_headers,
+            http2=http2,
+            compression=compression,
+            transport=transport,
         )
 
         self.bundles = BundleSubClient(self._base_url, self._request_helper)
@@ -74,3 +90,7 @@ class Client:
             self._base_url, self._request_helper
         )
         self.webhooks = WebhookSubClient(self._base_url, self._request_helper)
+
+    def close(self):
+        """Release the connections held by the client"""
+        self._request_helper.close()
@@ -1,6 +1,7 @@
 from munch import Munch
 
 BLUEINK_PAGINATION_HEADER = "X-Blueink-Pagination"
+BLUEINK_WEBHOOK_SIGNATURE_HEADER = "X-Blueink-Signature"
 DEFAULT_BASE_URL = "https://api.blueink.com/api/v2"
 ENV_BLUEINK_PRIVATE_API_KEY = "BLUEINK_PRIVATE_API_KEY"
 ENV_BLUEINK_API_URL = "BLUEINK_API_URL"
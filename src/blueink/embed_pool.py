@@ -0,0 +1,318 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from blueink.constants import EVENT_TYPE
+
+# URLs are not served when they expire within this many seconds
+DEFAULT_EXPIRY_MARGIN = 30
+
+# Lifetime assumed for URLs returned without an expiry time
+DEFAULT_TTL = 300
+
+# Events after which a Packet's embed URL is no longer useful
+INVALIDATING_EVENT_TYPES = {
+    EVENT_TYPE.EVENT_PACKET_COMPLETE,
+    EVENT_TYPE.EVENT_BUNDLE_COMPLETE,
+    EVENT_TYPE.EVENT_BUNDLE_CANCELLED,
+    EVENT_TYPE.EVENT_BUNDLE_ERROR,
+}
+
+
+def parse_expires(expires: Optional[str]) -> Optional[float]:
+    """Return an ISO 8601 timestamp, as returned by the API, as a Unix time"""
+    if not expires:
+        return None
+    # datetime.fromisoformat() only accepts a "Z" suffix from Python 3.11
+    if expires.endswith("Z"):
+        expires = expires[:-1] + "+00:00"
+    return datetime.fromisoformat(expires).timestamp()
+
+
+class EmbedUrlPool:
+    def __init__(
+        self,
+        client,
+        max_workers: int = 4,
+        expiry_margin: float = DEFAULT_EXPIRY_MARGIN,
+        default_ttl: float = DEFAULT_TTL,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Pre-generates embedded signing and preparation session URLs
+
+        Generating an embed URL is a round trip to the API. The pool does it ahead
+        of time, in the background, for Packets (or preparation sessions) likely
+        to be opened soon, and get() then serves the URL without waiting. URLs are
+        held until shortly before they expire, and each one is served once. A
+        URL that isn't in the pool is generated on demand; concurrent requests for
+        the same Packet then share one API call, and its URL.
+
+        Invalidate a Packet's URL when its status changes, eg. by registering
+        handle_event() with a WebhookReceiver.
+
+        Typical Usage:
+            pool = EmbedUrlPool(client)
+            pool.prefetch(packet_ids, bundle_id=bundle.id)
+            receiver.on(ALL_EVENTS, pool.handle_event)
+            ...
+            url = pool.get(packet_id)  # when the signer clicks "sign"
+
+        Args:
+            client: a blueink Client
+            max_workers: number of concurrent background requests
+            expiry_margin: URLs expiring within this many seconds are discarded
+            default_ttl: lifetime assumed for URLs returned without "expires"
+            clock: returns the current Unix time
+        """
+        self._client = client
+        self._expiry_margin = expiry_margin
+        self._default_ttl = default_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._urls: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._pending: Dict[Tuple[str, str], Future] = {}
+        self._on_demand: Dict[Tuple[str, str], Future] = {}  # generated by get()
+        self._stale = set()  # pending keys invalidated while being generated
+        self._bundles: Dict[str, set] = {}  # bundle id -> packet ids
+        self._sweep_at = 64  # size of _urls from which expired URLs are swept
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="blueink-embed"
+        )
+
+    def __len__(self):
+        with self._lock:
+            return len(self._urls)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def prefetch(
+        self, packet_ids: Iterable[str], bundle_id: str = None, wait: bool = False
+    ) -> List[Future]:
+        """Generate embed URLs for Packets in the background
+
+        Packets that already have a fresh URL, or one being generated, are
+        skipped.
+
+        Args:
+            packet_ids: the Packets likely to be opened soon
+            bundle_id: Optional Bundle of the Packets, so events about the Bundle
+                invalidate their URLs
+            wait: block until the URLs are generated
+
+        Returns:
+            one Future per URL being generated, resolving to the URL
+        """
+        futures = []
+        for packet_id in packet_ids:
+            if bundle_id is not None:
+                with self._lock:
+                    self._bundles.setdefault(bundle_id, set()).add(packet_id)
+            future = self._schedule(("packet", packet_id), self._packet_factory)
+            if future is not None:
+                futures.append(future)
+        with self._lock:
+            self._trim_bundles()
+        if wait:
+            for future in futures:
+                future.exception()
+        return futures
+
+    def get(self, packet_id: str, timeout: float = None) -> str:
+        """Return an embedded signing URL for a Packet, from the pool if possible
+
+        Args:
+            packet_id: the ID of the Packet
+            timeout: Optional seconds to wait for a URL generated on demand
+
+        Returns:
+            the URL. It is removed from the pool.
+        """
+        return self._take(("packet", packet_id), self._packet_factory, timeout)
+
+    def prefetch_preparation_session(self, key: str, data: dict) -> Optional[Future]:
+        """Create a preparation session in the background
+
+        Args:
+            key: identifies the session in the pool, eg. the id of the user who
+                will prepare documents
+            data: configuration for the session, see
+                client.bundles.create_preparation_session()
+
+        Returns:
+            a Future resolving to the URL, or None if the pool already has one
+        """
+        return self._schedule(("preparation", key), self._preparation_factory(data))
+
+    def get_preparation_session(
+        self, key: str, data: dict, timeout: float = None
+    ) -> str:
+        """Return a preparation session URL, from the pool if possible
+
+        Args:
+            key: identifies the session, as for prefetch_preparation_session()
+            data: configuration used if the session has to be created now
+            timeout: Optional seconds to wait for a session created on demand
+
+        Returns:
+            the URL. It is removed from the pool.
+        """
+        return self._take(
+            ("preparation", key), self._preparation_factory(data), timeout
+        )
+
+    def invalidate(self, packet_id: str):
+        """Discard the URL held for a Packet, eg. when its status changed"""
+        with self._lock:
+            self._discard(("packet", packet_id))
+
+    def invalidate_bundle(self, bundle_id: str):
+        """Discard the URLs held for the Packets of a Bundle given to prefetch()"""
+        with self._lock:
+            for packet_id in self._bundles.pop(bundle_id, ()):
+                self._discard(("packet", packet_id))
+
+    def handle_event(self, event):
+        """Invalidate URLs made stale by a webhook event
+
+        Meant to be registered with a WebhookReceiver for ALL_EVENTS.
+
+        Args:
+            event: a WebhookEvent
+        """
+        if event.event_type not in INVALIDATING_EVENT_TYPES:
+            return
+        data = event.data if isinstance(event.data, dict) else {}
+        packet_id = getattr(event, "packet_id", None) or data.get("packet_id")
+        if packet_id:
+            self.invalidate(packet_id)
+        if event.bundle_id:
+            self.invalidate_bundle(event.bundle_id)
+
+    def _packet_factory(self, key: Tuple[str, str]):
+        return self._client.packets.embed_url(key[1])
+
+    def _preparation_factory(self, data: dict):
+        return lambda key: self._client.bundles.create_preparation_session(data)
+
+    def _schedule(self, key, factory) -> Optional[Future]:
+        with self._lock:
+            self._sweep_expired()
+            if self._fresh(key) or key in self._pending:
+                return None
+            future = self._executor.submit(self._generate, key, factory)
+            self._pending[key] = future
+            return future
+
+    def _take(self, key, factory, timeout: float = None) -> str:
+        with self._lock:
+            entry = self._urls.pop(key, None)
+            if entry is not None and self._usable(entry):
+                return entry[0]
+            future = self._pending.get(key)
+
+        if future is not None:
+            try:
+                future.result(timeout)
+            except Exception:
+                pass  # Generated on demand below
+            with self._lock:
+                entry = self._urls.pop(key, None)
+            if entry is not None and self._usable(entry):
+                return entry[0]
+        # Not prefetched, failed, or taken by a concurrent caller, as URLs are
+        # served once
+        return self._generate_on_demand(key, factory, timeout)
+
+    def _generate_on_demand(self, key, factory, timeout: float = None) -> str:
+        # Generate a URL without pooling it. Concurrent callers for the same key
+        # wait for the first one's API call and share its URL.
+        with self._lock:
+            future = self._on_demand.get(key)
+            owner = future is None
+            if owner:
+                future = self._on_demand[key] = Future()
+        if not owner:
+            return future.result(timeout)
+
+        try:
+            url = self._request_url(key, factory)[0]
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(url)
+            return url
+        finally:
+            with self._lock:
+                self._on_demand.pop(key, None)
+
+    def _generate(self, key, factory) -> str:
+        try:
+            url, expires_at = self._request_url(key, factory)
+            with self._lock:
+                if key not in self._stale:
+                    self._urls[key] = (url, expires_at)
+            return url
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+                self._stale.discard(key)
+
+    def _request_url(self, key, factory) -> Tuple[str, float]:
+        response = factory(key)
+        expires_at = parse_expires(response.data.get("expires"))
+        if expires_at is None:
+            expires_at = self._clock() + self._default_ttl
+        return response.data.url, expires_at
+
+    def _discard(self, key):
+        # Must be called with the lock held
+        self._urls.pop(key, None)
+        if key in self._pending:
+            self._stale.add(key)
+
+    def _fresh(self, key) -> bool:
+        # Must be called with the lock held
+        entry = self._urls.get(key)
+        if entry is None:
+            return False
+        if not self._usable(entry):
+            del self._urls[key]
+            return False
+        return True
+
+    def _sweep_expired(self):
+        # Must be called with the lock held. Drop the URLs no longer usable once
+        # the pool has doubled since the last sweep, so URLs that are never taken
+        # don't accumulate, at an amortized O(1) cost per URL
+        if len(self._urls) < self._sweep_at:
+            return
+        for key, entry in list(self._urls.items()):
+            if not self._usable(entry):
+                del self._urls[key]
+        self._sweep_at = max(2 * len(self._urls), 64)
+
+    def _trim_bundles(self):
+        # Must be called with the lock held. Forget the Packets whose URLs have
+        # been served, invalidated or dropped, once they outnumber the URLs held,
+        # so Bundles that are never invalidated don't accumulate
+        held = len(self._urls) + len(self._pending)
+        if sum(len(ids) for ids in self._bundles.values()) <= 2 * held + 64:
+            return
+        for bundle_id in list(self._bundles):
+            packet_ids = {
+                packet_id
+                for packet_id in self._bundles[bundle_id]
+                if ("packet", packet_id) in self._urls
+                or ("packet", packet_id) in self._pending
+            }
+            if packet_ids:
+                self._bundles[bundle_id] = packet_ids
+            else:
+                del self._bundles[bundle_id]
+
+    def _usable(self, entry: Tuple[str, float]) -> bool:
+        return entry[1] - self._expiry_margin > self._clock()
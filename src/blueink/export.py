@@ -0,0 +1,247 @@
+import json
+import os
+from typing import Iterator, List, Tuple
+
+from munch import Munch
+
+from blueink.batch import DEFAULT_MAX_WORKERS, run_batch
+from blueink.paginator import iter_pages
+
+# Columns of the Parquet export, with their pyarrow types. Nested values are JSON
+# strings; top level keys not listed here are kept in the "extra" column.
+PARQUET_COLUMNS = {
+    "id": "string",
+    "label": "string",
+    "status": "string",
+    "created": "string",
+    "sent": "string",
+    "completed_at": "string",
+    "in_order": "bool_",
+    "is_test": "bool_",
+    "email_subject": "string",
+    "email_message": "string",
+    "cc_emails": "string",
+    "custom_key": "string",
+    "team": "string",
+    "signing_brand": "string",
+    "expires": "string",
+    "packets": "string",
+    "documents": "string",
+    "events": "string",
+    "files": "string",
+    "data": "string",
+    "extra": "string",
+}
+
+
+class BundleExporter:
+    def __init__(
+        self,
+        client,
+        per_page: int = 50,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        **query_params,
+    ):
+        """Streams every Bundle, with its events, files and data, to NDJSON or
+        Parquet files
+
+        Bundles are fetched a page at a time. The related data of the Bundles on a
+        page is fetched concurrently, then the page is written out and released,
+        so memory use is bounded by the page size, not by the number of Bundles.
+        Progress is checkpointed by page number, so an interrupted export can be
+        resumed.
+
+        Typical Usage:
+            exporter = BundleExporter(client, status=BUNDLE_STATUS.COMPLETE)
+            exporter.to_ndjson("bundles.ndjson")
+
+        Args:
+            client: a blueink Client
+            per_page: number of Bundles per page
+            max_workers: number of concurrent related data requests
+            query_params: filters for the Bundles list, see client.bundles.list()
+        """
+        self._client = client
+        self._per_page = per_page
+        self._max_workers = max_workers
+        self._query_params = query_params
+
+    def iter_pages(self, start_page: int = 1) -> Iterator[Tuple[int, List[Munch]]]:
+        """Yield the Bundles page by page, with events, files and data attached
+
+        Unlike client.bundles.paged_list(), errors are raised rather than ending the
+        iteration or leaving out related data, so an export is never silently
+        truncated.
+
+        Args:
+            start_page: first page to fetch
+
+        Returns:
+            iterator of (page number, list of bundles)
+        """
+        bundles = self._client.bundles
+        pages = iter_pages(
+            bundles.list,
+            per_page=self._per_page,
+            start_page=start_page,
+            **self._query_params,
+        )
+        for page, response in enumerate(pages, start_page):
+            results = run_batch(
+                lambda bundle: bundles._attach_additional_data(bundle, check=True),
+                response.data,
+                max_workers=self._max_workers,
+            )
+            for result in results:
+                if not result.ok:
+                    raise result.error
+            yield page, response.data
+
+    def to_ndjson(self, path: str, resume: bool = True) -> int:
+        """Export to a file with one Bundle per line
+
+        The checkpoint records the next page and the size of the file after the
+        last completed page. On resume, anything written after that is truncated,
+        so no Bundle is exported twice.
+
+        Args:
+            path: output file
+            resume: continue from the checkpoint of a previous run, if there is
+                one. Otherwise the file is overwritten.
+
+        Returns:
+            number of Bundles written by this call
+        """
+        checkpoint = self._read_checkpoint(path) if resume else None
+        start_page, offset = (1, 0)
+        if checkpoint is not None:
+            start_page, offset = checkpoint["next_page"], checkpoint["offset"]
+
+        count = 0
+        with open(path, "ab" if checkpoint else "wb") as file:
+            file.truncate(offset)
+            file.seek(offset)
+            for page, page_bundles in self.iter_pages(start_page):
+                for bundle in page_bundles:
+                    file.write(json.dumps(bundle).encode("utf-8") + b"\n")
+                count += len(page_bundles)
+                file.flush()
+                self._write_checkpoint(
+                    path, {"next_page": page + 1, "offset": file.tell()}
+                )
+        return count
+
+    def to_parquet(
+        self, directory: str, row_group_size: int = 10000, resume: bool = True
+    ) -> int:
+        """Export to a directory of Parquet files. Requires pyarrow.
+
+        Bundles are buffered until at least row_group_size of them (rounded up to a
+        whole page) are held, then written as a single row group to a new file named
+        after its first page, eg. part-000001.parquet. Every file has the same
+        schema, see PARQUET_COLUMNS: nested values (packets, documents, events,
+        files, data) are stored as JSON strings, and any top level key without a
+        column of its own in the "extra" column, as a JSON object.
+
+        Args:
+            directory: output directory, created if needed
+            row_group_size: number of Bundles per file
+            resume: continue from the checkpoint of a previous run, if there is one
+
+        Returns:
+            number of Bundles written by this call
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError(
+                "Exporting to Parquet requires pyarrow, install it with"
+                " 'pip install pyarrow'"
+            )
+
+        os.makedirs(directory, exist_ok=True)
+        checkpoint_base = os.path.join(directory, "export")
+        checkpoint = self._read_checkpoint(checkpoint_base) if resume else None
+        start_page = checkpoint["next_page"] if checkpoint else 1
+
+        schema = pa.schema(
+            [(name, getattr(pa, kind)()) for name, kind in PARQUET_COLUMNS.items()]
+        )
+        count = 0
+        rows = []
+        first_page = start_page
+
+        def write_part(next_page):
+            part = os.path.join(directory, f"part-{first_page:06d}.parquet")
+            pq.write_table(pa.Table.from_pylist(rows, schema=schema), part)
+            self._write_checkpoint(checkpoint_base, {"next_page": next_page})
+
+        for page, page_bundles in self.iter_pages(start_page):
+            rows.extend(parquet_row(bundle) for bundle in page_bundles)
+            if len(rows) >= row_group_size:
+                write_part(page + 1)
+                count += len(rows)
+                rows = []
+                first_page = page + 1
+
+        if rows:
+            write_part(page + 1)
+            count += len(rows)
+        return count
+
+    @staticmethod
+    def checkpoint_path(path: str) -> str:
+        return f"{path}.checkpoint"
+
+    def _read_checkpoint(self, path: str):
+        try:
+            with open(self.checkpoint_path(path), encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def _write_checkpoint(self, path: str, checkpoint: dict):
+        # Written to a temporary file first, so a crash never leaves it truncated
+        path = self.checkpoint_path(path)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+            json.dump(checkpoint, file)
+        os.replace(f"{path}.tmp", path)
+
+
+def flatten_bundle(bundle: dict) -> dict:
+    """Return a copy of a Bundle with nested values (dicts, lists) encoded as JSON
+    strings, as a row of a columnar table
+
+    Args:
+        bundle:
+
+    Returns:
+        dict of scalar values
+    """
+    return {
+        key: json.dumps(value) if isinstance(value, (dict, list)) else value
+        for key, value in bundle.items()
+    }
+
+
+def parquet_row(bundle: dict) -> dict:
+    """Return a Bundle as a row of the Parquet export, with a value for each of
+    PARQUET_COLUMNS
+
+    Args:
+        bundle:
+
+    Returns:
+        dict of column name to scalar value
+    """
+    row = dict.fromkeys(PARQUET_COLUMNS)
+    extra = {}
+    for key, value in flatten_bundle(bundle).items():
+        if key in row and key != "extra":
+            row[key] = value
+        else:
+            extra[key] = bundle[key]
+    if extra:
+        row["extra"] = json.dumps(extra)
+    return row
@@ -0,0 +1,143 @@
+from typing import List
+
+from blueink.model.bundles import Field
+
+
+class FieldStore:
+    """Compact, columnar storage for the fields of a single document.
+
+    Instead of holding one pydantic Field object per field, the values common to
+    every field are kept in parallel lists and the rarely used optional values
+    (validation settings, additional data) in a per-row dict that is only
+    allocated when needed. Rows are expanded to the wire format by as_dicts(),
+    when the Bundle is serialized.
+    """
+
+    __slots__ = (
+        "keys",
+        "kinds",
+        "xs",
+        "ys",
+        "ws",
+        "hs",
+        "pages",
+        "labels",
+        "editors",
+        "extras",
+    )
+
+    def __init__(self):
+        self.keys = []
+        self.kinds = []
+        self.xs = []
+        self.ys = []
+        self.ws = []
+        self.hs = []
+        self.pages = []
+        self.labels = []
+        self.editors = []
+        self.extras = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def copy(self) -> "FieldStore":
+        """Return a copy that can be appended to without affecting this store"""
+        store = FieldStore()
+        for name in self.__slots__:
+            setattr(store, name, list(getattr(self, name)))
+        return store
+
+    def append(
+        self,
+        key: str,
+        kind: str,
+        x: int,
+        y: int,
+        w: int,
+        h: int,
+        page: int = None,
+        label: str = None,
+        editors: List[str] = None,
+        extra: dict = None,
+    ):
+        """Append a single field row. Values are stored as-is, without validation.
+
+        Args:
+            key:
+            kind:
+            x:
+            y:
+            w:
+            h:
+            page: Optional
+            label: Optional
+            editors: Optional list of packet keys; an empty list is stored as None
+            extra: Optional dict of any other field attributes. None values are
+                dropped, as they would be on serialization anyway.
+        """
+        if extra:
+            extra = {k: v for k, v in extra.items() if v is not None}
+
+        self.keys.append(key)
+        self.kinds.append(kind)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.ws.append(w)
+        self.hs.append(h)
+        self.pages.append(page)
+        self.labels.append(label)
+        self.editors.append(editors or None)
+        self.extras.append(extra or None)
+
+    def append_field(self, field: Field):
+        """Append the values of an already validated Field
+
+        Args:
+            field: the Field to store. It is not retained.
+        """
+        extra = field.dict(exclude_none=True)
+        self.append(
+            extra.pop("key"),
+            extra.pop("kind"),
+            extra.pop("x"),
+            extra.pop("y"),
+            extra.pop("w"),
+            extra.pop("h"),
+            page=extra.pop("page", None),
+            label=extra.pop("label", None),
+            editors=extra.pop("editors", None),
+            extra=extra,
+        )
+
+    def as_dicts(self) -> List[dict]:
+        """Expand the stored rows to the wire format of a Field
+
+        Returns:
+            list of dicts, one per field, in insertion order
+        """
+        out = []
+        rows = zip(
+            self.keys,
+            self.kinds,
+            self.xs,
+            self.ys,
+            self.ws,
+            self.hs,
+            self.pages,
+            self.labels,
+            self.editors,
+            self.extras,
+        )
+        for key, kind, x, y, w, h, page, label, editors, extra in rows:
+            field = {"kind": kind, "key": key, "x": x, "y": y, "w": w, "h": h}
+            if label is not None:
+                field["label"] = label
+            if page is not None:
+                field["page"] = page
+            if extra:
+                field.update(extra)
+            if editors:
+                field["editors"] = list(editors)
+            out.append(field)
+        return out
@@ -0,0 +1,392 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Set, Tuple, Union
+
+from munch import Munch, munchify
+
+from blueink.constants import BUNDLE_STATUS, EVENT_TYPE
+from blueink.paginator import iter_pages
+
+# Bundle status implied by a webhook event, for events that don't carry the Bundle
+EVENT_BUNDLE_STATUS = {
+    EVENT_TYPE.EVENT_BUNDLE_LAUNCHED: BUNDLE_STATUS.SENT,
+    EVENT_TYPE.EVENT_BUNDLE_COMPLETE: BUNDLE_STATUS.COMPLETE,
+    EVENT_TYPE.EVENT_BUNDLE_DOCS_READY: BUNDLE_STATUS.COMPLETE,
+    EVENT_TYPE.EVENT_BUNDLE_ERROR: BUNDLE_STATUS.FAILED,
+    EVENT_TYPE.EVENT_BUNDLE_CANCELLED: BUNDLE_STATUS.CANCELLED,
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bundles (
+    id TEXT PRIMARY KEY,
+    status TEXT,
+    label TEXT,
+    custom_key TEXT,
+    team TEXT,
+    created TEXT,
+    completed_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bundles_status ON bundles (status, created);
+CREATE INDEX IF NOT EXISTS bundles_custom_key ON bundles (custom_key);
+CREATE INDEX IF NOT EXISTS bundles_team ON bundles (team, status);
+CREATE INDEX IF NOT EXISTS bundles_label ON bundles (label);
+CREATE INDEX IF NOT EXISTS bundles_created ON bundles (created);
+CREATE INDEX IF NOT EXISTS bundles_completed_at ON bundles (completed_at);
+
+CREATE TABLE IF NOT EXISTS signers (
+    bundle_id TEXT NOT NULL REFERENCES bundles (id) ON DELETE CASCADE,
+    email TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS signers_email ON signers (email, bundle_id);
+CREATE INDEX IF NOT EXISTS signers_bundle_id ON signers (bundle_id);
+"""
+
+
+class BundleIndex:
+    def __init__(self, path: str = ":memory:"):
+        """Local, queryable index of Bundle metadata, stored in SQLite
+
+        Fed by sync() (a scan of client.bundles.list()) and kept current with
+        apply_webhook_event(), the index answers lookups by status, custom_key,
+        team, label, signer email and created / completed dates without calling
+        the API. The index can be shared between threads.
+
+        Typical Usage:
+            index = BundleIndex("bundles.sqlite3")
+            index.sync(client)
+            for bundle in index.find(status=BUNDLE_STATUS.SENT, team="sales"):
+                print(bundle.id)
+
+        Args:
+            path: SQLite database file. Defaults to an in-memory database.
+        """
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA foreign_keys = ON")
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.executescript(_SCHEMA)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM bundles").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def upsert(self, bundles: Iterable[dict]) -> int:
+        """Add Bundles to the index, replacing any with the same id
+
+        Args:
+            bundles: Bundles as returned by the API
+
+        Returns:
+            number of Bundles stored
+        """
+        rows = []
+        signers = []
+        for bundle in bundles:
+            rows.append(
+                (
+                    bundle["id"],
+                    bundle.get("status"),
+                    bundle.get("label"),
+                    bundle.get("custom_key"),
+                    bundle.get("team"),
+                    bundle.get("created"),
+                    bundle.get("completed_at"),
+                    json.dumps(bundle),
+                )
+            )
+            for packet in bundle.get("packets") or []:
+                if packet.get("email"):
+                    signers.append((bundle["id"], packet["email"].lower()))
+
+        with self._lock, self._db:
+            self._db.executemany(
+                "DELETE FROM signers WHERE bundle_id = ?", ((r[0],) for r in rows)
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO bundles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._db.executemany("INSERT INTO signers VALUES (?, ?)", signers)
+        return len(rows)
+
+    def sync(self, client, per_page: int = 100, **query_params) -> int:
+        """Add every Bundle listed by the API to the index
+
+        Each page is stored in a single transaction as it arrives. A failed page
+        raises, rather than leaving the index silently incomplete.
+
+        Args:
+            client: a blueink Client
+            per_page: number of Bundles per page
+            query_params: filters, see client.bundles.list(), eg. to only sync
+                Bundles of a status
+
+        Returns:
+            number of Bundles stored
+        """
+        count = 0
+        for response in iter_pages(
+            client.bundles.list, per_page=per_page, **query_params
+        ):
+            count += self.upsert(response.data)
+        return count
+
+    def apply_webhook_event(self, event: dict) -> bool:
+        """Update the index from the payload of a webhook event
+
+        A payload carrying the Bundle (under "bundle", or "data" when it has a
+        status) replaces the stored Bundle. Otherwise the status implied by the
+        event type (see EVENT_BUNDLE_STATUS) is applied to an already indexed
+        Bundle; a Bundle becoming complete gets the event's "created" time (or the
+        current time, if the event has none) as its completed_at.
+
+        Args:
+            event: the webhook payload, with "event_type" and the Bundle or its id
+
+        Returns:
+            True if the index was changed
+        """
+        bundle = event.get("bundle")
+        data = event.get("data")
+        if bundle is None and isinstance(data, dict) and "status" in data:
+            bundle = data
+        if isinstance(bundle, dict) and "id" in bundle:
+            return self.upsert([bundle]) > 0
+
+        status = EVENT_BUNDLE_STATUS.get(event.get("event_type"))
+        bundle_id = bundle or event.get("bundle_id")
+        if isinstance(data, dict):
+            bundle_id = bundle_id or data.get("bundle_id")
+        if status is None or not bundle_id:
+            return False
+
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT data FROM bundles WHERE id = ?", (bundle_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            stored = json.loads(row[0])
+            stored["status"] = status
+            if status == BUNDLE_STATUS.COMPLETE and not stored.get("completed_at"):
+                stored["completed_at"] = (
+                    event.get("created") or datetime.now(timezone.utc).isoformat()
+                )
+            self._db.execute(
+                "UPDATE bundles SET status = ?, completed_at = ?, data = ?"
+                " WHERE id = ?",
+                (status, stored.get("completed_at"), json.dumps(stored), bundle_id),
+            )
+        return True
+
+    def get(self, bundle_id: str) -> Optional[Munch]:
+        """Return an indexed Bundle, or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM bundles WHERE id = ?", (bundle_id,)
+            ).fetchone()
+        return munchify(json.loads(row[0])) if row else None
+
+    def find(
+        self,
+        status: Union[str, List[str]] = None,
+        custom_key: str = None,
+        team: str = None,
+        label: str = None,
+        signer_email: str = None,
+        created_after: str = None,
+        created_before: str = None,
+        completed_after: str = None,
+        completed_before: str = None,
+        limit: int = None,
+    ) -> List[Munch]:
+        """Return the indexed Bundles matching all of the given filters
+
+        Dates are ISO 8601 strings, as returned by the API, and compared as such;
+        "after" bounds are inclusive, "before" bounds exclusive.
+
+        Args:
+            status: a BUNDLE_STATUS, or a list of them
+            custom_key:
+            team:
+            label: exact label
+            signer_email: email of any signer, case insensitive
+            created_after:
+            created_before:
+            completed_after:
+            completed_before:
+            limit: maximum number of Bundles returned
+
+        Returns:
+            list of Bundles, newest first
+        """
+        clauses = []
+        params = []
+        if status is not None:
+            statuses = [status] if isinstance(status, str) else list(status)
+            clauses.append(f"status IN ({', '.join('?' * len(statuses))})")
+            params.extend(statuses)
+        for column, value in (
+            ("custom_key", custom_key),
+            ("team", team),
+            ("label", label),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        for column, operator, value in (
+            ("created", ">=", created_after),
+            ("created", "<", created_before),
+            ("completed_at", ">=", completed_after),
+            ("completed_at", "<", completed_before),
+        ):
+            if value is not None:
+                clauses.append(f"{column} {operator} ?")
+                params.append(value)
+        if signer_email is not None:
+            clauses.append("id IN (SELECT bundle_id FROM signers WHERE email = ?)")
+            params.append(signer_email.lower())
+
+        sql = "SELECT data FROM bundles"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [munchify(json.loads(row[0])) for row in rows]
+
+
+# Contact channel kinds, as used by PersonHelper
+CHANNEL_KIND_EMAIL = "em"
+CHANNEL_KIND_PHONE = "mp"
+
+
+def channel_values(person: dict) -> Tuple[List[str], List[str]]:
+    """Return the emails and phone numbers of a Person dict, normalized for
+    matching; emails are case insensitive
+
+    Returns:
+        (emails, phones)
+    """
+    emails = []
+    phones = []
+    for channel in person.get("channels") or []:
+        if channel.get("email"):
+            emails.append(channel["email"].lower())
+        if channel.get("phone"):
+            phones.append(channel["phone"].strip())
+    return emails, phones
+
+
+def _person_state(person: dict) -> tuple:
+    # What an update would change: name, metadata and the set of contact values
+    emails, phones = channel_values(person)
+    return (
+        person.get("name"),
+        json.dumps(person.get("metadata") or {}, sort_keys=True),
+        frozenset(emails),
+        frozenset(phones),
+    )
+
+
+class PersonIndex:
+    def __init__(self):
+        """In-memory index of Persons by email and phone number
+
+        Built from client.persons.list(), it tells whether a contact already
+        exists, and whether an incoming record differs from it, without calling
+        the API. See PersonSubClient.upsert_many().
+        """
+        self._by_email = {}
+        self._by_phone = {}
+        self._states = {}  # person_id -> state of the Person, see _person_state()
+
+    def __len__(self):
+        return len(self._states)
+
+    def __contains__(self, person_id: str):
+        return person_id in self._states
+
+    def upsert(self, persons: Iterable[dict]) -> int:
+        """Add Persons to the index, replacing any with the same id
+
+        The emails and phone numbers of a replaced Person no longer match it,
+        unless the Person still has them.
+
+        Args:
+            persons: Persons as returned by the API, with an id
+
+        Returns:
+            number of Persons stored
+        """
+        count = 0
+        for person in persons:
+            person_id = person["id"]
+            previous = self._states.get(person_id)
+            if previous is not None:
+                _, _, old_emails, old_phones = previous
+                for values, old_values in (
+                    (self._by_email, old_emails),
+                    (self._by_phone, old_phones),
+                ):
+                    for value in old_values:
+                        if values.get(value) == person_id:
+                            del values[value]
+
+            self._states[person_id] = _person_state(person)
+            emails, phones = channel_values(person)
+            for email in emails:
+                self._by_email[email] = person_id
+            for phone in phones:
+                self._by_phone[phone] = person_id
+            count += 1
+        return count
+
+    def sync(self, client, per_page: int = 100) -> int:
+        """Add every Person listed by the API to the index
+
+        A failed page raises, rather than leaving the index silently incomplete.
+
+        Args:
+            client: a blueink Client
+            per_page: number of Persons per page
+
+        Returns:
+            number of Persons stored
+        """
+        count = 0
+        for response in iter_pages(client.persons.list, per_page=per_page):
+            count += self.upsert(response.data)
+        return count
+
+    def match(self, person: dict) -> Set[str]:
+        """Return the ids of the indexed Persons sharing an email or phone number
+        with a Person
+
+        Args:
+            person: a Person dict, eg. from PersonHelper.as_dict()
+
+        Returns:
+            set of person ids, empty if the Person is new
+        """
+        emails, phones = channel_values(person)
+        matches = {self._by_email.get(email) for email in emails}
+        matches.update(self._by_phone.get(phone) for phone in phones)
+        matches.discard(None)
+        return matches
+
+    def is_current(self, person_id: str, person: dict) -> bool:
+        """Return whether an indexed Person already has the name, metadata and
+        contact channels of a Person dict"""
+        return self._states.get(person_id) == _person_state(person)
@@ -0,0 +1,203 @@
+import csv
+import json
+import os
+from typing import Callable, Dict, Iterator, Tuple
+
+from munch import Munch
+
+from blueink.batch import DEFAULT_MAX_WORKERS, check_response, run_batch
+from blueink.bundle_helper import BundleHelper
+
+
+def read_rows(path: str, format: str = None) -> Iterator[dict]:
+    """Lazily read rows from a CSV or NDJSON file, one dict per row
+
+    Args:
+        path: path of the file
+        format: "csv" or "ndjson". If not given, it is derived from the file
+            extension (.csv, or .ndjson / .jsonl)
+
+    Returns:
+        iterator of dicts. CSV values are strings.
+    """
+    if format is None:
+        extension = os.path.splitext(path)[1].lower()
+        format = "csv" if extension == ".csv" else "ndjson"
+
+    if format == "csv":
+        with open(path, newline="", encoding="utf-8") as file:
+            yield from csv.DictReader(file)
+    elif format == "ndjson":
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        raise ValueError(f"Unsupported format '{format}', use 'csv' or 'ndjson'")
+
+
+class RowMapper:
+    def __init__(
+        self,
+        signer_columns: Dict[str, str],
+        prototype: BundleHelper = None,
+        envelope_template_id: str = None,
+        value_columns: Dict = None,
+        signer_key: str = "signer-1",
+        **bundle_kwargs,
+    ):
+        """Maps one row of data to a BundleHelper for a single signer
+
+        Either clones a frozen prototype BundleHelper (see BundleHelper.freeze()),
+        or creates a new BundleHelper from bundle_kwargs; optionally for an envelope
+        template.
+
+        Args:
+            signer_columns: maps add_signer() arguments to row columns, eg.
+                {"name": "Full Name", "email": "Email Address"}
+            prototype: Optional frozen BundleHelper to clone for every row
+            envelope_template_id: Optional envelope template to create the Bundle
+                from
+            value_columns: maps field values to row columns. With an envelope
+                template, keys are envelope template field keys. Otherwise keys
+                are (document_key, field_key) tuples, set via set_value() on the
+                template documents of the prototype.
+            signer_key: key of the signer's packet, eg. to match the role in the
+                envelope template or prototype
+            bundle_kwargs: passed to BundleHelper() when there is no prototype
+        """
+        if prototype is not None and bundle_kwargs:
+            raise ValueError("Pass either a prototype or BundleHelper arguments")
+
+        self._signer_columns = signer_columns
+        self._prototype = prototype
+        self._envelope_template_id = envelope_template_id
+        self._value_columns = value_columns or {}
+        self._signer_key = signer_key
+        self._bundle_kwargs = bundle_kwargs
+
+    def __call__(self, row: dict) -> BundleHelper:
+        if self._prototype is not None:
+            bh = self._prototype.clone()
+        else:
+            bh = BundleHelper(**self._bundle_kwargs)
+
+        signer = {arg: row[column] for arg, column in self._signer_columns.items()}
+        bh.add_signer(key=self._signer_key, **signer)
+
+        values = {key: row[column] for key, column in self._value_columns.items()}
+        if self._envelope_template_id is not None:
+            bh.set_envelope_template(self._envelope_template_id, values)
+        else:
+            for (document_key, field_key), value in values.items():
+                bh.set_value(document_key, field_key, value)
+        return bh
+
+
+class MassSender:
+    def __init__(
+        self,
+        client,
+        row_mapper: Callable[[dict], BundleHelper],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_pending: int = None,
+    ):
+        """Sends one Bundle per row of a CSV or NDJSON file
+
+        Rows are read lazily, mapped to BundleHelpers and sent with bounded
+        concurrency. The result for every row is appended, in row order, to an
+        output NDJSON file, and a checkpoint is kept next to it, so an interrupted
+        run can be resumed. Memory use does not depend on the size of the input.
+
+        Typical Usage:
+            mapper = RowMapper(
+                {"name": "name", "email": "email"},
+                envelope_template_id="T-abc123",
+                value_columns={"company_name": "company"},
+                label="Annual Agreement",
+            )
+            summary = MassSender(client, mapper).run("signers.csv", "results.ndjson")
+
+        Args:
+            client: a blueink Client
+            row_mapper: called with each row (a dict), returns a BundleHelper,
+                eg. a RowMapper
+            max_workers: number of concurrent requests
+            max_pending: bound on in-flight rows (default: 2 * max_workers)
+        """
+        self._client = client
+        self._row_mapper = row_mapper
+        self._max_workers = max_workers
+        self._max_pending = max_pending
+
+    @staticmethod
+    def checkpoint_path(output_path: str) -> str:
+        return f"{output_path}.checkpoint"
+
+    def run(self, input_path: str, output_path: str, format: str = None) -> Munch:
+        """Send a Bundle for every row of the input file not sent by a previous run
+
+        Each line of the output is a JSON object with the row number ("row",
+        0-based), "ok", and either "bundle_id" and "status", or "error".
+
+        Args:
+            input_path: CSV or NDJSON file, see read_rows()
+            output_path: NDJSON file the results are appended to
+            format: Optional format of the input file
+
+        Returns:
+            Munch with the number of rows "skipped" (done by a previous run),
+            "succeeded" and "failed"
+        """
+        start_row = self._read_checkpoint(output_path)
+        rows = (
+            (index, row)
+            for index, row in enumerate(read_rows(input_path, format))
+            if index >= start_row
+        )
+
+        summary = Munch(skipped=start_row, succeeded=0, failed=0)
+        with open(output_path, "a", encoding="utf-8") as output:
+            results = run_batch(
+                self._send_row,
+                rows,
+                max_workers=self._max_workers,
+                max_pending=self._max_pending,
+            )
+            for result in results:
+                row_number = result.item[0]
+                record = {"row": row_number, "ok": result.ok}
+                if result.ok:
+                    summary.succeeded += 1
+                    record["bundle_id"] = result.response.data.get("id")
+                    record["status"] = result.response.status
+                else:
+                    summary.failed += 1
+                    record["error"] = str(result.error)
+
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+                self._write_checkpoint(output_path, row_number + 1)
+        return summary
+
+    def _send_row(self, indexed_row: Tuple[int, dict]):
+        bh = self._row_mapper(indexed_row[1])
+        if bh._envelope_template is not None:
+            response = self._client.bundles.create_from_envelope_template_helper(bh)
+        else:
+            response = self._client.bundles.create_from_bundle_helper(bh)
+        return check_response(response)
+
+    def _read_checkpoint(self, output_path: str) -> int:
+        try:
+            with open(self.checkpoint_path(output_path), encoding="utf-8") as file:
+                return json.load(file)["next_row"]
+        except FileNotFoundError:
+            return 0
+
+    def _write_checkpoint(self, output_path: str, next_row: int):
+        # Written to a temporary file first, so a crash never leaves it truncated
+        path = self.checkpoint_path(output_path)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+            json.dump({"next_row": next_row}, file)
+        os.replace(f"{path}.tmp", path)
@@ -13,10 +13,79 @@ class ValidationError(RuntimeError):
 
 
 def generate_key(type, length=5):
-    slug = "".join(random.choice(string.ascii_letters) for i in range(length))
+    slug = "".join(random.choices(string.ascii_letters, k=length))
     return f"{type}_{slug}"
 
 
+class KeyGenerator:
+    # Consecutive collisions after which a longer slug is used instead
+    MAX_COLLISIONS = 8
+
+    def __init__(self, seed=None, length: int = 5):
+        """Generates document, field and packet keys that are unique within a Bundle
+
+        Every key generated or reserved is remembered, and never generated again.
+        When seeded, the same sequence of calls produces the same keys.
+
+        Args:
+            seed: Optional seed, for reproducible keys
+            length: number of random letters after the key type prefix
+        """
+        self._random = random.Random(seed)
+        self._length = length
+        self._used = set()
+        self._parent = None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._used or (self._parent is not None and key in self._parent)
+
+    def __len__(self) -> int:
+        return len(self._used) + (len(self._parent) if self._parent else 0)
+
+    def spawn(self) -> "KeyGenerator":
+        """Return a generator that continues from this one, without copying its keys
+
+        The child avoids every key used by this generator, which must no longer be
+        used itself. It starts from the same random state, so children of a seeded
+        generator are reproducible.
+        """
+        child = KeyGenerator(length=self._length)
+        child._random.setstate(self._random.getstate())
+        child._parent = self
+        return child
+
+    def reserve(self, key: str):
+        """Mark a key supplied by the caller as used"""
+        self._used.add(key)
+
+    def generate(self, type: str) -> str:
+        """Return a new key, eg. "field_aBcDe", not used before in this generator"""
+        length = self._length
+        collisions = 0
+        while True:
+            slug = "".join(self._random.choices(string.ascii_letters, k=length))
+            key = f"{type}_{slug}"
+            if key not in self:
+                self._used.add(key)
+                return key
+
+            collisions += 1
+            if collisions >= self.MAX_COLLISIONS:
+                length += 1
+                collisions = 0
+
+
+def _build(cls, trusted: bool, **values):
+    """Instantiate a model, skipping validation if the values are already trusted
+
+    Trusted values are stored as-is via construct(), so no validators run and no
+    type coercion happens. Use this only for data that was validated upstream.
+    """
+    if trusted:
+        return cls.construct(**values)
+    return cls(**values)
+
+
 class AutoPlacement(BaseModel):
     """Model for auto-placement fields that automatically find and place fields on documents"""
 
@@ -42,6 +111,7 @@ class AutoPlacement(BaseModel):
         h: int,
         offset_x: int = 0,
         offset_y: int = 0,
+        trusted: bool = False,
         **kwargs,
     ):
         """Create an AutoPlacement instance
@@ -53,12 +123,15 @@ class AutoPlacement(BaseModel):
             h: Height of the field
             offset_x: Horizontal offset from the search text (default: 0)
             offset_y: Vertical offset from the search text (default: 0)
+            trusted: skip validation, for data that was already validated upstream
             **kwargs: Additional parameters like editors, page, etc.
 
         Returns:
             AutoPlacement instance
         """
-        obj = AutoPlacement(
+        obj = _build(
+            cls,
+            trusted,
             kind=kind,
             search=search,
             w=w,
@@ -103,10 +176,12 @@ class Field(BaseModel):
         extra = "allow"
 
     @classmethod
-    def create(cls, x, y, w, h, page, kind, key=None, **kwargs):
+    def create(cls, x, y, w, h, page, kind, key=None, trusted=False, **kwargs):
         if not key:
             key = generate_key("field", 5)
-        obj = Field(key=key, x=x, y=y, w=w, h=h, page=page, kind=kind, **kwargs)
+        obj = _build(
+            cls, trusted, key=key, x=x, y=y, w=w, h=h, page=page, kind=kind, **kwargs
+        )
         return obj
 
     @validator("kind")
@@ -149,10 +224,10 @@ class Packet(BaseModel):
         return v
 
     @classmethod
-    def create(cls, name, key=None, **kwargs):
+    def create(cls, name, key=None, trusted=False, **kwargs):
         if not key:
             key = generate_key("packet", 5)
-        obj = Packet(key=key, name=name, **kwargs)
+        obj = _build(cls, trusted, key=key, name=name, **kwargs)
         return obj
 
 
@@ -164,8 +239,8 @@ class TemplateRefAssignment(BaseModel):
         extra = "allow"
 
     @classmethod
-    def create(cls, role, signer, **kwargs):
-        obj = TemplateRefAssignment(role=role, signer=signer, **kwargs)
+    def create(cls, role, signer, trusted=False, **kwargs):
+        obj = _build(cls, trusted, role=role, signer=signer, **kwargs)
         return obj
 
 
@@ -177,8 +252,8 @@ class TemplateRefFieldValue(BaseModel):
         extra = "allow"
 
     @classmethod
-    def create(cls, key, initial_value, **kwargs):
-        obj = TemplateRefFieldValue(key=key, initial_value=initial_value, **kwargs)
+    def create(cls, key, initial_value, trusted=False, **kwargs):
+        obj = _build(cls, trusted, key=key, initial_value=initial_value, **kwargs)
         return obj
 
 
@@ -192,8 +267,8 @@ class EnvelopeTemplateFieldValue(BaseModel):
         extra = "allow"
 
     @classmethod
-    def create(cls, key, initial_value, **kwargs):
-        obj = EnvelopeTemplateFieldValue(key=key, initial_value=initial_value, **kwargs)
+    def create(cls, key, initial_value, trusted=False, **kwargs):
+        obj = _build(cls, trusted, key=key, initial_value=initial_value, **kwargs)
         return obj
 
 
@@ -207,9 +282,13 @@ class EnvelopeTemplate(BaseModel):
         extra = "allow"
 
     @classmethod
-    def create(cls, template_id, field_values=None, **kwargs):
-        obj = EnvelopeTemplate(
-            template_id=template_id, field_values=field_values, **kwargs
+    def create(cls, template_id, field_values=None, trusted=False, **kwargs):
+        obj = _build(
+            cls,
+            trusted,
+            template_id=template_id,
+            field_values=field_values,
+            **kwargs,
         )
         return obj
 
@@ -228,10 +307,10 @@ class TemplateRef(BaseModel):
         extra = "allow"
 
     @classmethod
-    def create(cls, key=None, **kwargs):
+    def create(cls, key=None, trusted=False, **kwargs):
         if not key:
             key = generate_key("tmpl", 5)
-        obj = TemplateRef(key=key, **kwargs)
+        obj = _build(cls, trusted, key=key, **kwargs)
         return obj
 
     def add_assignment(self, assignment: TemplateRefAssignment):
@@ -262,10 +341,10 @@ class Document(BaseModel):
         extra = "allow"
 
     @classmethod
-    def create(cls, key=None, **kwargs):
+    def create(cls, key=None, trusted=False, **kwargs):
         if not key:
             key = generate_key("doc", 5)
-        obj = Document(key=key, **kwargs)
+        obj = _build(cls, trusted, key=key, **kwargs)
         return obj
 
     def add_field(self, field: Field):
@@ -347,8 +426,14 @@ class Bundle(BaseModel):
         extra = "allow"
 
     @classmethod
-    def create(cls, packets: List[Packet], documents: List[Document], **kwargs):
-        obj = Bundle(packets=packets, documents=documents, **kwargs)
+    def create(
+        cls,
+        packets: List[Packet],
+        documents: List[Document],
+        trusted: bool = False,
+        **kwargs,
+    ):
+        obj = _build(cls, trusted, packets=packets, documents=documents, **kwargs)
         return obj
 
     def add_packet(self, packet: Packet):
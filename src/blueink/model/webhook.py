@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, List, Optional
 
 from pydantic import BaseModel, Field, validator
 
@@ -28,3 +28,32 @@ class WebhookSchema(BaseModel):
                 f"subscription event_type '{event_type}' not allowed. Must be one of "
                 f"{EVENT_TYPE.values()}"
             )
+        return event_types
+
+
+class WebhookEvent(BaseModel):
+    """A webhook event, as delivered to a webhook receiver
+
+    event_type is one of EVENT_TYPE. Event types not known to this library are
+    accepted too, so new ones don't cause deliveries to be rejected.
+    """
+
+    id: Optional[str]
+    event_type: str
+    data: Optional[Any]
+
+    class Config:
+        extra = "allow"
+
+    @property
+    def bundle_id(self) -> Optional[str]:
+        """The id of the Bundle the event is about, if the payload identifies it"""
+        for values in (self.__dict__, self.data):
+            if not isinstance(values, dict):
+                continue
+            bundle = values.get("bundle")
+            if isinstance(bundle, dict):
+                return bundle.get("id")
+            if bundle or values.get("bundle_id"):
+                return bundle or values.get("bundle_id")
+        return None
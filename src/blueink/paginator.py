@@ -1,5 +1,8 @@
+from typing import Callable, Iterator
+
 from requests.exceptions import HTTPError
 
+from blueink.batch import check_response
 from blueink.request_helper import NormalizedResponse
 
 
@@ -38,7 +41,7 @@ class PaginatedIterator:
             api_response: NormalizedResponse = self._paged_func(
                 page=self.next_page,
                 per_page=self._items_per_page,
-                **self._paged_func_args
+                **self._paged_func_args,
             )
         except HTTPError:
             raise StopIteration
@@ -51,3 +54,37 @@ class PaginatedIterator:
 
         self.next_page = self.next_page + 1
         return api_response
+
+
+def iter_pages(
+    list_function: Callable[..., NormalizedResponse],
+    per_page: int = 100,
+    start_page: int = 1,
+    **query_params,
+) -> Iterator[NormalizedResponse]:
+    """Yield the response for each page of a list method, eg. client.bundles.list
+
+    Unlike PaginatedIterator, errors are raised rather than ending the iteration
+    (error responses too, for Clients created with raise_exceptions=False), so
+    callers never act on a silently truncated list.
+
+    Args:
+        list_function: list method taking page, per_page and query params
+        per_page: items per page
+        start_page: first page to fetch
+        query_params: Query params to be passed to the list_function
+
+    Returns:
+        iterator of NormalizedResponse, one per page
+    """
+    page = start_page
+    while True:
+        response = check_response(
+            list_function(page=page, per_page=per_page, **query_params)
+        )
+        yield response
+
+        pagination = response.pagination
+        if pagination is None or page >= pagination.total_pages:
+            return
+        page += 1
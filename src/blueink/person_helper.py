@@ -1,19 +1,37 @@
-from typing import List
+from functools import lru_cache
+from typing import Iterable, List
+
+from pydantic import EmailStr
 
 from blueink.model.persons import ContactChannelSchema, PersonSchema
 
 
+@lru_cache(maxsize=131072)
+def _validate_email(email: str) -> str:
+    # Validates and normalizes an email like ContactChannelSchema does. Cached, as
+    # syncs tend to see the same contacts over and over.
+    try:
+        return EmailStr.validate(email)
+    except (TypeError, ValueError):
+        # Raise the same ValidationError the schema would
+        ContactChannelSchema(email=email, kind="em")
+        raise
+
+
 class PersonHelper:
     def __init__(
         self,
         name: str = None,
-        metadata: dict = {},
-        phones: List[str] = [],
-        emails: List[str] = [],
+        metadata: dict = None,
+        phones: List[str] = None,
+        emails: List[str] = None,
     ):
         """Helper class to aid building a Person.
 
         Once Person is ready, use as_dict() to compile python dictionary for the Person.
+        The given metadata, phones and emails are copied, so later changes to them
+        don't affect the helper.
+
         Args:
             name:
             metadata:
@@ -21,9 +39,9 @@ class PersonHelper:
             emails:
         """
         self._name = name
-        self._metadata = metadata
-        self._phones = phones
-        self._emails = emails
+        self._metadata = dict(metadata) if metadata is not None else {}
+        self._phones = list(phones) if phones is not None else []
+        self._emails = list(emails) if emails is not None else []
 
     def add_phone(self, phone: str) -> List[str]:
         """
@@ -36,7 +54,7 @@ class PersonHelper:
             A copy of all of the phone numbers currently in the list
         """
         self._phones.append(phone)
-        return self._phones
+        return list(self._phones)
 
     def set_phones(self, phones: List[str]) -> List[str]:
         """
@@ -48,8 +66,8 @@ class PersonHelper:
         Returns:
             A copy of all of the phone numbers currently in the list
         """
-        self._phones = phones
-        return self._phones
+        self._phones = list(phones)
+        return list(self._phones)
 
     def get_phones(self) -> List[str]:
         """
@@ -58,7 +76,7 @@ class PersonHelper:
         Returns:
             A copy of all of the phone numbers currently in the list
         """
-        return self._phones
+        return list(self._phones)
 
     def add_email(self, email: str) -> List[str]:
         """
@@ -70,7 +88,7 @@ class PersonHelper:
             A copy of all of the emails currently in the list
         """
         self._emails.append(email)
-        return self._emails
+        return list(self._emails)
 
     def set_emails(self, emails: List[str]) -> List[str]:
         """
@@ -82,8 +100,8 @@ class PersonHelper:
         Returns:
             A copy of all of the emails currently in the list
         """
-        self._emails = emails
-        return self._emails
+        self._emails = list(emails)
+        return list(self._emails)
 
     def get_emails(self) -> List[str]:
         """
@@ -92,7 +110,7 @@ class PersonHelper:
         Returns:
             A copy of all of the emails currently in the list
         """
-        return self._emails
+        return list(self._emails)
 
     def set_metadata(self, metadata: dict) -> dict:
         """
@@ -104,8 +122,8 @@ class PersonHelper:
         Returns:
             A copy of the current metadata
         """
-        self._metadata = metadata
-        return self._metadata
+        self._metadata = dict(metadata)
+        return dict(self._metadata)
 
     def set_name(self, name: str) -> str:
         """
@@ -127,23 +145,35 @@ class PersonHelper:
         Returns:
             Returns a person as a dictionary
         """
-        channels = []
-
-        for email in self._emails:
-            channels.append(ContactChannelSchema(email=email, kind="em"))
-        for phone in self._phones:
-            channels.append(ContactChannelSchema(phone=phone, kind="mp"))
+        # Name and metadata are validated by PersonSchema. Channels are validated
+        # like ContactChannelSchema, but built directly as dicts, rather than as
+        # models that would be re-validated by PersonSchema and then converted
+        # back to dicts
+        person = PersonSchema(name=self._name, metadata=self._metadata)
+        channels = [{"email": _validate_email(e), "kind": "em"} for e in self._emails]
+        channels.extend({"phone": phone, "kind": "mp"} for phone in self._phones)
 
-        person_out = PersonSchema(
-            name=self._name,
-            metadata=self._metadata,
-            channels=channels,
-        )
-        out_dict = person_out.dict(
-            exclude_unset=True,
-        )
+        out_dict = {
+            "name": person.name,
+            "metadata": dict(person.metadata),
+            "channels": channels,
+        }
 
         # Merge in the additional data
         out_dict = {**out_dict, **kwargs}
 
         return out_dict
+
+    @staticmethod
+    def as_dicts(person_helpers: Iterable["PersonHelper"], **kwargs) -> List[dict]:
+        """
+        Return many persons as dictionaries, eg. for a bulk import
+
+        Args:
+            person_helpers: the PersonHelpers to compile
+            kwargs: additional data merged into every person
+
+        Returns:
+            list of dictionaries, in the same order as person_helpers
+        """
+        return [helper.as_dict(**kwargs) for helper in person_helpers]
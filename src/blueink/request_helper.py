@@ -2,6 +2,14 @@ import requests
 from munch import munchify
 
 from blueink.constants import BLUEINK_PAGINATION_HEADER
+from blueink.transport import (
+    DEFAULT_COMPRESSION_THRESHOLD,
+    CompressionMiddleware,
+    HttpxTransport,
+    RequestsTransport,
+    Transport,
+    to_requests_response,
+)
 
 
 class Pagination:
@@ -53,14 +61,70 @@ class NormalizedResponse:
             )
 
 
+# Sent with every request unless overridden, as by requests.request(). Not
+# "Connection", which HTTP/2 forbids.
+DEFAULT_HEADERS = {
+    name: value
+    for name, value in requests.utils.default_headers().items()
+    if name != "Connection"
+}
+
+
 class RequestHelper:
     def __init__(
-        self, private_api_key, raise_exceptions=False, security_headers: dict = None
+        self,
+        private_api_key,
+        raise_exceptions=False,
+        security_headers: dict = None,
+        http2: bool = False,
+        compression: str = None,
+        compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD,
+        transport: Transport = None,
     ):
+        """Sends the API requests of a Client, through a Transport
+
+        Compressed responses are always accepted, and decoded transparently.
+
+        Args:
+            private_api_key:
+            raise_exceptions: raise HTTPError for error responses
+            security_headers: headers added to every request
+            http2: send requests with an HttpxTransport over HTTP/2, multiplexing
+                concurrent requests to the API on a single connection. Requires
+                httpx with HTTP/2 support: pip install httpx[http2]
+            compression: Optional "gzip" or "deflate". Request bodies of at least
+                compression_threshold bytes, eg. Bundles with file_b64 or file_html
+                documents, are then compressed as they are sent, with chunked
+                transfer encoding. See CompressionMiddleware.
+            compression_threshold: size in bytes from which bodies are compressed
+            transport: Optional Transport, possibly wrapped in middlewares, see
+                blueink.transport. Defaults to a RequestsTransport, or an
+                HttpxTransport if http2 is set.
+
+        Raises:
+            ValueError: if both http2 and transport are given. To use HTTP/2 with
+                middlewares, wrap an HttpxTransport(http2=True) in them.
+        """
+        if http2 and transport is not None:
+            raise ValueError(
+                "http2 and transport can't both be given; pass an HttpxTransport"
+                " as the transport instead"
+            )
+        if transport is None:
+            transport = HttpxTransport() if http2 else RequestsTransport()
+        if compression is not None:
+            transport = CompressionMiddleware(
+                transport, compression, compression_threshold
+            )
 
         self._private_api_key = private_api_key
         self._raise_exceptions = raise_exceptions
         self._security_headers = security_headers
+        self._transport = transport
+
+    def close(self):
+        """Close the connections held by the transport"""
+        self._transport.close()
 
     def delete(self, url, **kwargs):
         return self._make_request("delete", url, **kwargs)
@@ -113,17 +177,19 @@ class RequestHelper:
         content_type=None,
     ):
 
-        response = requests.request(
-            method,
+        request = requests.Request(
+            method.upper(),
             url,
             params=params,
             data=data,
             json=json,
-            headers=self._build_headers(
-                content_type=content_type, more_headers=headers
-            ),
+            headers={
+                **DEFAULT_HEADERS,
+                **self._build_headers(content_type=content_type, more_headers=headers),
+            },
             files=files,
-        )
+        ).prepare()
+        response = to_requests_response(self._transport.send(request), request)
 
         if self._raise_exceptions:
             response.raise_for_status()
@@ -1,17 +1,39 @@
+import base64
 import io
 import json
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Tuple
 
 from munch import Munch
 
 from blueink import endpoints
+from blueink.batch import (
+    DEFAULT_BACKOFF,
+    DEFAULT_MAX_WORKERS,
+    BatchResult,
+    RateLimiter,
+    check_response,
+    run_batch,
+)
 from blueink.bundle_helper import BundleHelper
-from blueink.constants import BUNDLE_STATUS
-from blueink.paginator import PaginatedIterator
+from blueink.constants import BUNDLE_STATUS, PACKET_STATUS
+from blueink.paginator import PaginatedIterator, iter_pages
 from blueink.request_helper import NormalizedResponse
 from blueink.subclients.subclient import SubClient
 
 
+def compile_bundle_helper(bdl_helper: BundleHelper) -> Tuple[bool, str, list]:
+    """Compile a BundleHelper to a request payload. Module-level, so it can run in
+    a worker process.
+
+    Returns:
+        (from_envelope_template, JSON body, files)
+    """
+    if bdl_helper._envelope_template is not None:
+        return True, json.dumps(bdl_helper.as_data_for_envelope_template()), []
+    return False, bdl_helper.as_json(), bdl_helper.files
+
+
 class BundleSubClient(SubClient):
     def _prepare_files(self, file_list: [io.BufferedReader]):
         if isinstance(file_list, dict):
@@ -39,14 +61,15 @@ class BundleSubClient(SubClient):
                         )
                     )
                 elif "file_b64" in file_dict:
-                    b64 = file_dict["file_b64"]
+                    # Uploaded as the file's bytes, not as base64 text
+                    content = base64.b64decode(file_dict["file_b64"])
                     field_name = f"files[{idx}]"
                     files_data.append(
                         (
                             field_name,
                             (
                                 file_dict.get("filename"),
-                                b64,
+                                content,
                                 file_dict.get("content_type"),
                             ),
                         )
@@ -103,6 +126,74 @@ class BundleSubClient(SubClient):
         files = bdl_helper.files
         return self.create(data=data, files=files)
 
+    def create_many(
+        self,
+        bdl_helpers: Iterable[BundleHelper],
+        compile_workers: int = None,
+        send_workers: int = DEFAULT_MAX_WORKERS,
+        max_pending: int = None,
+    ) -> Iterator[BatchResult]:
+        """Create many Bundles, compiling them in worker processes.
+
+        Compiling a BundleHelper (validation, encoding, JSON serialization) is CPU
+        bound, so it runs in a process pool and keeps all cores busy, while the
+        compiled payloads are posted from a thread pool. Helpers set up with an
+        envelope template are created via create_from_envelope_template.
+
+        Helpers are consumed lazily, and at most max_pending are being compiled,
+        sent, or waiting to be yielded at any time. An error response fails its
+        Bundle, whether or not the Client raises exceptions.
+
+        Typical Usage:
+            for result in client.bundles.create_many(helpers):
+                if result.ok:
+                    print(result.response.data.id)
+                else:
+                    print(f"Bundle {result.index} failed: {result.error}")
+
+        Args:
+            bdl_helpers: iterable of BundleHelpers. They must be picklable.
+            compile_workers: number of compiling processes (default: CPU count)
+            send_workers: number of concurrent requests
+            max_pending: bound on in-flight helpers (default: 2 * send_workers)
+
+        Returns:
+            iterator of BatchResult (item: the BundleHelper, response: the
+            NormalizedResponse), in the same order as bdl_helpers
+        """
+        with ProcessPoolExecutor(max_workers=compile_workers) as compile_pool:
+            # Compilation is submitted as each helper enters the bounded window of
+            # run_batch, and the sending thread waits for it
+            compiling = (
+                (bdl_helper, compile_pool.submit(compile_bundle_helper, bdl_helper))
+                for bdl_helper in bdl_helpers
+            )
+            results = run_batch(
+                lambda pair: check_response(self._create_compiled(*pair[1].result())),
+                compiling,
+                max_workers=send_workers,
+                max_pending=max_pending,
+            )
+            for result in results:
+                result.item = result.item[0]
+                yield result
+
+    def _create_compiled(
+        self, from_envelope_template: bool, body: str, files: list
+    ) -> NormalizedResponse:
+        """Post a payload produced by compile_bundle_helper()"""
+        if from_envelope_template:
+            url = self.build_url(endpoints.BUNDLES.CREATE_FROM_ENVELOPE_TEMPLATE)
+        else:
+            url = self.build_url(endpoints.BUNDLES.CREATE)
+
+        if not files:
+            return self._requests.post(url, data=body, content_type="application/json")
+
+        return self._requests.post(
+            url, data={"bundle_request": body}, files=self._prepare_files(files)
+        )
+
     def create_from_envelope_template(self, data: dict) -> NormalizedResponse:
         """Create a Bundle from an envelope template.
 
@@ -207,6 +298,38 @@ class BundleSubClient(SubClient):
         )
         return iterator
 
+    def iter_packets(
+        self,
+        packet_statuses: Iterable[str] = (PACKET_STATUS.SENT, PACKET_STATUS.STARTED),
+        per_page: int = 100,
+        **query_params,
+    ) -> Iterator[Munch]:
+        """Yield the Packets of Bundles, filtered by Packet status
+
+        Walks the Bundles list lazily, page by page; a failed page raises rather
+        than ending the iteration early. Unless a status filter is given in
+        query_params, only Bundles that are sent or started are listed.
+
+        Args:
+            packet_statuses: PACKET_STATUS values to yield, eg. the Packets still
+                awaiting their signer (the default)
+            per_page: number of Bundles per page
+            query_params: filters for the Bundles, see list()
+
+        Returns:
+            iterator of Packets (Munch)
+        """
+        if "status" not in query_params and "status__in" not in query_params:
+            query_params["status__in"] = ",".join(
+                [BUNDLE_STATUS.SENT, BUNDLE_STATUS.STARTED]
+            )
+        packet_statuses = set(packet_statuses)
+        for response in iter_pages(self.list, per_page=per_page, **query_params):
+            for bundle in response.data:
+                for packet in bundle.get("packets") or []:
+                    if packet.get("status") in packet_statuses:
+                        yield packet
+
     def list(
         self,
         page: int = None,
@@ -236,19 +359,24 @@ class BundleSubClient(SubClient):
 
         return response
 
-    def _attach_additional_data(self, bundle):
+    def _attach_additional_data(self, bundle, check: bool = False):
+        # With check, error responses raise rather than being skipped
         if type(bundle) == Munch and bundle.id is not None:
             bundle_id = bundle.id
 
             events_response = self.list_events(bundle_id)
+            if check:
+                check_response(events_response)
             if events_response.status == 200:
                 bundle.events = events_response.data
 
             if bundle.status == BUNDLE_STATUS.COMPLETE:
                 files_response = self.list_files(bundle_id)
-                bundle.files = files_response.data
-
                 data_response = self.list_data(bundle_id)
+                if check:
+                    check_response(files_response)
+                    check_response(data_response)
+                bundle.files = files_response.data
                 bundle.data = data_response.data
 
     def retrieve(
@@ -283,7 +411,67 @@ class BundleSubClient(SubClient):
 
         """
         url = self.build_url(endpoints.BUNDLES.CANCEL, bundle_id=bundle_id)
-        return self._request.put(url)
+        return self._requests.put(url)
+
+    def cancel_many(
+        self,
+        bundle_ids: Iterable[str] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_pending: int = None,
+        retries: int = 3,
+        backoff: float = DEFAULT_BACKOFF,
+        rate_limit: float = None,
+        **query_params,
+    ) -> Iterator[BatchResult]:
+        """Cancel many Bundles, concurrently
+
+        Bundles are given by ID, or selected with list() filters. With filters, the
+        matching IDs are all listed before the first Bundle is cancelled, since
+        cancelling changes which Bundles the filters match and would shift the
+        pages. A failed page raises, and nothing is cancelled.
+
+        Requests failing with a connection error, a timeout, a 429 or a 5xx status
+        are retried with exponential backoff. Error responses fail their Bundle
+        whether or not the Client raises exceptions.
+
+        Typical Usage:
+            results = client.bundles.cancel_many(
+                status=BUNDLE_STATUS.SENT, created__lt="2023-01-01"
+            )
+            failed = [result for result in results if not result.ok]
+
+        Args:
+            bundle_ids: any iterable of Bundle IDs, consumed lazily
+            max_workers: number of concurrent requests
+            max_pending: bound on in-flight Bundles (default: 2 * max_workers)
+            retries: number of times a Bundle is retried after a transient error
+            backoff: seconds before the first retry, doubled for each further one
+            rate_limit: Optional maximum number of requests started per second
+            query_params: filters selecting the Bundles, see list(), if no
+                bundle_ids are given
+
+        Returns:
+            iterator of BatchResult, in input order (item: the Bundle ID,
+            response: the NormalizedResponse)
+        """
+        if (bundle_ids is None) == (not query_params):
+            raise ValueError("Pass either bundle_ids or filters, but not both")
+        if bundle_ids is None:
+            bundle_ids = [
+                bundle.id
+                for response in iter_pages(self.list, per_page=100, **query_params)
+                for bundle in response.data
+            ]
+
+        return run_batch(
+            lambda bundle_id: check_response(self.cancel(bundle_id)),
+            bundle_ids,
+            max_workers=max_workers,
+            max_pending=max_pending,
+            rate_limiter=RateLimiter(rate_limit) if rate_limit else None,
+            retries=retries,
+            backoff=backoff,
+        )
 
     def list_events(self, bundle_id: str) -> NormalizedResponse:
         """Return a list of events for the supplied bundle corresponding to the id
@@ -1,4 +1,14 @@
+from typing import Callable, Iterable, Iterator, Union
+
 from blueink import endpoints
+from blueink.batch import (
+    DEFAULT_BACKOFF,
+    DEFAULT_MAX_WORKERS,
+    BatchResult,
+    RateLimiter,
+    check_response,
+    run_batch,
+)
 from blueink.request_helper import NormalizedResponse
 from blueink.subclients.subclient import SubClient
 
@@ -7,24 +17,75 @@ class PacketSubClient(SubClient):
     def update(self, packet_id: str, data: dict) -> NormalizedResponse:
         """Update a Packet
 
-                Note: this always performs a partial update (PATCH) because that is
-                the only method supported by the Blueink API for this endpoint
+        Note: this always performs a partial update (PATCH) because that is
+        the only method supported by the Blueink API for this endpoint
 
-                Args:
-                    packet_id: the ID of the Packet
-                    data: the updated field values for the Packet
-        * Update via ```client.webhooks.update(...)```
+        Args:
+            packet_id: the ID of the Packet
+            data: the updated field values for the Packet
 
-                Returns:
-                    A NormalizedResponse, with the updated packet as `data`
+        Returns:
+            A NormalizedResponse, with the updated packet as `data`
 
-                Raises:
-                     exceptions.RequestException (or a more specific exception class)
-                     if an error occured
+        Raises:
+             exceptions.RequestException (or a more specific exception class)
+             if an error occured
         """
         url = self.build_url(endpoints.PACKETS.UPDATE, packet_id=packet_id)
         return self._requests.patch(url, json=data)
 
+    def update_many(
+        self,
+        packet_ids: Iterable[str],
+        data: Union[dict, Callable[[str], dict]],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_pending: int = None,
+        retries: int = 3,
+        backoff: float = DEFAULT_BACKOFF,
+        rate_limit: float = None,
+    ) -> Iterator[BatchResult]:
+        """Update many Packets, concurrently
+
+        Requests failing with a connection error, a timeout, a 429 or a 5xx status
+        are retried with exponential backoff. Error responses fail their Packet
+        whether or not the Client raises exceptions.
+
+        Typical Usage:
+            packets = client.bundles.iter_packets(custom_key="onboarding")
+            for result in client.packets.update_many(
+                (p.id for p in packets), {"deliver_via": "embed"}
+            ):
+                if not result.ok:
+                    print(f"Updating {result.item} failed: {result.error}")
+
+        Args:
+            packet_ids: any iterable of Packet IDs, consumed lazily. Use
+                client.bundles.iter_packets() to select Packets by filter.
+            data: the updated field values, the same for every Packet, or a
+                function returning them given a Packet ID
+            max_workers: number of concurrent requests
+            max_pending: bound on in-flight Packets (default: 2 * max_workers)
+            retries: number of times a Packet is retried after a transient error
+            backoff: seconds before the first retry, doubled for each further one
+            rate_limit: Optional maximum number of requests started per second
+
+        Returns:
+            iterator of BatchResult, in input order (item: the Packet ID,
+            response: the NormalizedResponse)
+        """
+        get_data = data if callable(data) else (lambda packet_id: data)
+        return run_batch(
+            lambda packet_id: check_response(
+                self.update(packet_id, get_data(packet_id))
+            ),
+            packet_ids,
+            max_workers=max_workers,
+            max_pending=max_pending,
+            rate_limiter=RateLimiter(rate_limit) if rate_limit else None,
+            retries=retries,
+            backoff=backoff,
+        )
+
     def embed_url(self, packet_id: str) -> NormalizedResponse:
         """Create an embedded signing URL
 
@@ -54,4 +115,49 @@ class PacketSubClient(SubClient):
             A NormalizedResponse
         """
         url = self.build_url(endpoints.PACKETS.REMIND, packet_id=packet_id)
-        self._requests.put(url)
+        return self._requests.put(url)
+
+    def remind_many(
+        self,
+        packet_ids: Iterable[str],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        rate_limit: float = None,
+        max_pending: int = None,
+        retries: int = 3,
+        backoff: float = DEFAULT_BACKOFF,
+    ) -> Iterator[BatchResult]:
+        """Send reminders to many Packets, concurrently
+
+        Requests failing with a connection error, a timeout, a 429 or a 5xx status
+        are retried with exponential backoff. Error responses fail their Packet
+        whether or not the Client raises exceptions.
+
+        Typical Usage:
+            packets = client.bundles.iter_packets()  # Packets awaiting signature
+            for result in client.packets.remind_many(
+                (p.id for p in packets), rate_limit=5
+            ):
+                if not result.ok:
+                    print(f"Reminding {result.item} failed: {result.error}")
+
+        Args:
+            packet_ids: any iterable of Packet IDs, consumed lazily
+            max_workers: number of concurrent requests
+            rate_limit: Optional maximum number of reminders sent per second
+            max_pending: bound on in-flight Packets (default: 2 * max_workers)
+            retries: number of times a Packet is retried after a transient error
+            backoff: seconds before the first retry, doubled for each further one
+
+        Returns:
+            iterator of BatchResult, in input order (item: the Packet ID)
+        """
+        rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        return run_batch(
+            lambda packet_id: check_response(self.remind(packet_id)),
+            packet_ids,
+            max_workers=max_workers,
+            max_pending=max_pending,
+            rate_limiter=rate_limiter,
+            retries=retries,
+            backoff=backoff,
+        )
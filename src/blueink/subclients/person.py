@@ -1,5 +1,11 @@
+from typing import Iterable, Iterator
+
+from munch import Munch
+
 from blueink import endpoints
-from blueink.paginator import PaginatedIterator
+from blueink.batch import DEFAULT_MAX_WORKERS, BatchResult, check_response, run_batch
+from blueink.index import PersonIndex, channel_values
+from blueink.paginator import PaginatedIterator, iter_pages
 from blueink.person_helper import PersonHelper
 from blueink.request_helper import NormalizedResponse
 from blueink.subclients.subclient import SubClient
@@ -37,6 +43,105 @@ class PersonSubClient(SubClient):
         """
         return self.create(person_helper.as_dict(**kwargs))
 
+    def upsert_many(
+        self,
+        person_helpers: Iterable[PersonHelper],
+        index: PersonIndex = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_pending: int = None,
+    ) -> Iterator[BatchResult]:
+        """Create or update many Persons, matched to existing ones by email or phone
+
+        Each PersonHelper is diffed against an index of the existing Persons, and
+        only the needed creates and updates are sent, concurrently. The index is
+        updated as results come in, so it can be reused for the next sync.
+
+        Typical Usage:
+            index = PersonIndex()
+            index.sync(client)
+            for result in client.persons.upsert_many(helpers, index=index):
+                print(result.index, result.action, result.ok)
+
+        Args:
+            person_helpers: any iterable of PersonHelper, consumed lazily
+            index: Optional PersonIndex of the existing Persons. If not given, one
+                is built by listing every Person; a failed page raises, rather
+                than leading to duplicate Persons.
+            max_workers: number of concurrent requests
+            max_pending: bound on in-flight Persons (default: 2 * max_workers)
+
+        Returns:
+            iterator of BatchResult, in input order. item is the PersonHelper,
+            action one of "created", "updated" or "unchanged", and response the
+            NormalizedResponse (None if unchanged). A record matching several
+            existing Persons, or sharing an email or phone with an earlier record of
+            the same batch, fails with a ValueError.
+        """
+        if index is None:
+            index = PersonIndex()
+            index.upsert(
+                person
+                for response in iter_pages(self.list, per_page=100)
+                for person in response.data
+            )
+
+        def plans():
+            # Contact values claimed by earlier records of this batch
+            claimed = {}
+            for position, helper in enumerate(person_helpers):
+                plan = Munch(helper=helper, action=None, person_id=None, error=None)
+                try:
+                    plan.data = helper.as_dict()
+                    emails, phones = channel_values(plan.data)
+                    duplicates = {claimed.get(v) for v in emails + phones}
+                    duplicates.discard(None)
+                    if duplicates:
+                        raise ValueError(
+                            f"Shares contact details with record {min(duplicates)}"
+                        )
+                    claimed.update((v, position) for v in emails + phones)
+
+                    matches = index.match(plan.data)
+                    if len(matches) > 1:
+                        raise ValueError(
+                            f"Matches several existing Persons: {sorted(matches)}"
+                        )
+                    if not matches:
+                        plan.action = "created"
+                    else:
+                        plan.person_id = matches.pop()
+                        current = index.is_current(plan.person_id, plan.data)
+                        plan.action = "unchanged" if current else "updated"
+                except Exception as e:
+                    plan.error = e
+                yield plan
+
+        def send(plan):
+            if plan.error is not None:
+                raise plan.error
+            if plan.action == "created":
+                return check_response(self.create(plan.data))
+            if plan.action == "updated":
+                return check_response(self.update(plan.person_id, plan.data))
+            return None
+
+        results = run_batch(
+            send, plans(), max_workers=max_workers, max_pending=max_pending
+        )
+        for result in results:
+            plan = result.item
+            if result.ok and result.response is not None:
+                person = result.response.data
+                if isinstance(person, dict) and person.get("id"):
+                    index.upsert([person])
+            yield BatchResult(
+                result.index,
+                plan.helper,
+                response=result.response,
+                error=result.error,
+                action=plan.action,
+            )
+
     def paged_list(
         self, page: int = 1, per_page: int = 50, **query_params
     ) -> PaginatedIterator:
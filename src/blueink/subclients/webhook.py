@@ -1,4 +1,11 @@
+from typing import Iterable, List, Union
+
+from munch import Munch
+
 from blueink import endpoints
+from blueink.batch import DEFAULT_MAX_WORKERS, BatchResult, check_response, run_batch
+from blueink.model.webhook import WebhookExtraHeaderSchema, WebhookSchema
+from blueink.paginator import iter_pages
 from blueink.request_helper import NormalizedResponse
 from blueink.subclients.subclient import SubClient
 
@@ -15,9 +22,7 @@ class WebhookSubClient(SubClient):
     def list(self, **query_params) -> NormalizedResponse:
         url = self.build_url(endpoint=endpoints.WEBHOOKS.LIST)
 
-        return self._requests.get(
-            url, params=self.build_params(query_params=query_params)
-        )
+        return self._requests.get(url, params=self.build_params(**query_params))
 
     def retrieve(self, webhook_id: str) -> NormalizedResponse:
         url = self.build_url(
@@ -36,6 +41,186 @@ class WebhookSubClient(SubClient):
 
         return self._requests.patch(url, data=data)
 
+    def apply(
+        self,
+        desired_state: Iterable[Union[WebhookSchema, dict]],
+        delete_missing: bool = False,
+        dry_run: bool = False,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> List[BatchResult]:
+        """Bring webhooks and their extra headers to a desired state
+
+        Webhooks are matched by url, and extra headers by name and order. The
+        current webhooks and headers are fetched once, every page of them, and
+        only the differences are sent, concurrently. A new webhook is created
+        before its headers. Error responses fail their change, whether or not the
+        Client raises exceptions.
+
+        Typical Usage:
+            results = client.webhooks.apply([
+                {
+                    "url": "https://www.example.com/hooks/",
+                    "event_types": [EVENT_TYPE.EVENT_BUNDLE_COMPLETE],
+                    "extra_headers": [
+                        {"name": "Authorization", "value": "Token abc", "order": 0}
+                    ],
+                },
+            ])
+
+        Args:
+            desired_state: WebhookSchema objects, or dicts in the same shape. The
+                "webhook" of extra headers can be omitted.
+            delete_missing: also delete webhooks (and headers of webhooks in the
+                desired state) that are not in the desired state. Headers of
+                desired webhooks are always brought in line.
+            dry_run: only compute the changes, without applying them
+            max_workers: number of concurrent requests
+
+        Returns:
+            list of BatchResult, one per change. item is the webhook url, or
+            (url, header name, order) for headers; action is one of
+            "create_webhook", "update_webhook", "delete_webhook", "create_header",
+            "update_header" or "delete_header".
+        """
+        desired = [self._desired_webhook(webhook) for webhook in desired_state]
+        current = {
+            webhook.url: webhook
+            for response in iter_pages(self.list)
+            for webhook in response.data
+        }
+        headers = {}
+        for response in iter_pages(self.list_headers):
+            for header in response.data:
+                headers.setdefault(header.webhook, []).append(header)
+
+        changes = []
+        for webhook in desired:
+            data = webhook.dict(by_alias=True, exclude={"id", "extra_headers"})
+            wanted = {(h.name, h.order): h for h in webhook.extra_headers or []}
+            existing = current.get(webhook.url)
+
+            if existing is None:
+                changes.append(
+                    Munch(
+                        action="create_webhook",
+                        item=webhook.url,
+                        apply=self._create_with_headers(data, list(wanted.values())),
+                    )
+                )
+                continue
+
+            updates = {
+                key: value
+                for key, value in data.items()
+                if not self._same_value(key, existing.get(key), value)
+            }
+            if updates:
+                changes.append(
+                    Munch(
+                        action="update_webhook",
+                        item=webhook.url,
+                        apply=self._call(self.update, existing.id, updates),
+                    )
+                )
+
+            have = {(h.name, h.order): h for h in headers.get(existing.id, [])}
+            for key, header in wanted.items():
+                item = (webhook.url, *key)
+                header_data = header.dict(include={"name", "value", "order"})
+                if key not in have:
+                    header_data["webhook"] = existing.id
+                    changes.append(
+                        Munch(
+                            action="create_header",
+                            item=item,
+                            apply=self._call(self.create_header, header_data),
+                        )
+                    )
+                elif have[key].value != header.value:
+                    changes.append(
+                        Munch(
+                            action="update_header",
+                            item=item,
+                            apply=self._call(
+                                self.update_header, have[key].id, header_data
+                            ),
+                        )
+                    )
+            for key, header in have.items():
+                if key not in wanted:
+                    changes.append(
+                        Munch(
+                            action="delete_header",
+                            item=(webhook.url, *key),
+                            apply=self._call(self.delete_header, header.id),
+                        )
+                    )
+
+        if delete_missing:
+            desired_urls = {webhook.url for webhook in desired}
+            for url, webhook in current.items():
+                if url not in desired_urls:
+                    changes.append(
+                        Munch(
+                            action="delete_webhook",
+                            item=url,
+                            apply=self._call(self.delete, webhook.id),
+                        )
+                    )
+
+        if dry_run:
+            return [
+                BatchResult(i, change.item, action=change.action)
+                for i, change in enumerate(changes)
+            ]
+
+        results = run_batch(
+            lambda change: change.apply(), changes, max_workers=max_workers
+        )
+        return [
+            BatchResult(
+                result.index,
+                result.item.item,
+                response=result.response,
+                error=result.error,
+                action=result.item.action,
+            )
+            for result in results
+        ]
+
+    @staticmethod
+    def _desired_webhook(webhook: Union[WebhookSchema, dict]) -> WebhookSchema:
+        if isinstance(webhook, WebhookSchema):
+            return webhook
+        webhook = dict(webhook)
+        # The webhook of a desired header is its parent, whatever its id
+        webhook["extra_headers"] = [
+            {"webhook": "", **header} for header in webhook.get("extra_headers") or []
+        ]
+        return WebhookSchema.parse_obj(webhook)
+
+    @staticmethod
+    def _same_value(key: str, current, desired) -> bool:
+        if key == "event_types":
+            return set(current or []) == set(desired or [])
+        return current == desired
+
+    @staticmethod
+    def _call(func, *args):
+        return lambda: check_response(func(*args))
+
+    def _create_with_headers(self, data: dict, headers: List[WebhookExtraHeaderSchema]):
+        def create():
+            response = check_response(self.create(data))
+            for header in headers:
+                header_data = header.dict(include={"name", "value", "order"})
+                check_response(
+                    self.create_header({"webhook": response.data.id, **header_data})
+                )
+            return response
+
+        return create
+
     # ----------
     # Extra Header
     # ----------
@@ -58,16 +243,20 @@ class WebhookSubClient(SubClient):
 
     def delete_header(self, header_id: str) -> NormalizedResponse:
         url = self.build_url(
-            endpoint=endpoints.WEBHOOKS.DELETE_HEADERE, webhook_header_id=header_id
+            endpoint=endpoints.WEBHOOKS.DELETE_HEADER, webhook_header_id=header_id
         )
 
         return self._requests.delete(url)
 
-    def update_header(self, header_id: str, **data) -> NormalizedResponse:
+    def update_header(
+        self, header_id: str, data: dict = None, **kwargs
+    ) -> NormalizedResponse:
         url = self.build_url(
             endpoint=endpoints.WEBHOOKS.UPDATE_HEADER, webhook_header_id=header_id
         )
 
+        # Fields can also be given as kwargs, as in earlier versions
+        data = {**(data or {}), **kwargs}
         return self._requests.patch(url, data=data)
 
     # ----------
@@ -76,13 +265,11 @@ class WebhookSubClient(SubClient):
     def list_events(self, **query_params) -> NormalizedResponse:
         url = self.build_url(endpoint=endpoints.WEBHOOKS.LIST_EVENTS)
 
-        return self._requests.get(
-            url, params=self.build_params(query_params=query_params)
-        )
+        return self._requests.get(url, params=self.build_params(**query_params))
 
     def retrieve_event(self, event_id: str) -> NormalizedResponse:
         url = self.build_url(
-            endpoint=endpoints.WEBHOOKS.RETRIEVE_EVENT, wehook_event_id=event_id
+            endpoint=endpoints.WEBHOOKS.RETRIEVE_EVENT, webhook_event_id=event_id
         )
 
         return self._requests.get(url)
@@ -93,9 +280,7 @@ class WebhookSubClient(SubClient):
     def list_deliveries(self, **query_params) -> NormalizedResponse:
         url = self.build_url(endpoint=endpoints.WEBHOOKS.LIST_DELIVERIES)
 
-        return self._requests.get(
-            url, params=self.build_params(query_params=query_params)
-        )
+        return self._requests.get(url, params=self.build_params(**query_params))
 
     def retrieve_delivery(self, delivery_id: str) -> NormalizedResponse:
         url = self.build_url(
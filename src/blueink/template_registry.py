@@ -0,0 +1,293 @@
+import logging
+import threading
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional
+
+import requests
+from munch import Munch
+
+from blueink.batch import DEFAULT_MAX_WORKERS, check_response, run_batch
+
+logger = logging.getLogger(__name__)
+
+# Kinds of entries in a TemplateRegistry
+TEMPLATE = "template"
+ENVELOPE_TEMPLATE = "envelope_template"
+
+
+def template_roles(template: dict) -> FrozenSet[str]:
+    """Return the signer roles of a Template or Envelope Template
+
+    Roles are read from "roles" (keys, or dicts with a "key") and from the
+    "editors" of fields, including the fields of an Envelope Template's documents.
+    """
+    roles = set()
+    for source in [template] + list(template.get("documents") or []):
+        for role in source.get("roles") or []:
+            roles.add(role.get("key") if isinstance(role, dict) else role)
+        for field in source.get("fields") or []:
+            roles.update(field.get("editors") or [])
+    roles.discard(None)
+    return frozenset(roles)
+
+
+def template_field_keys(template: dict) -> FrozenSet[str]:
+    """Return the field keys of a Template or Envelope Template, including the
+    fields of an Envelope Template's documents"""
+    keys = set()
+    for source in [template] + list(template.get("documents") or []):
+        keys.update(field.get("key") for field in source.get("fields") or [])
+    keys.discard(None)
+    return frozenset(keys)
+
+
+class TemplateEntry:
+    def __init__(self, kind: str, template: Munch):
+        """A Template or Envelope Template held by a TemplateRegistry, with its
+        roles and field keys indexed for O(1) lookups
+
+        Args:
+            kind: TEMPLATE or ENVELOPE_TEMPLATE
+            template: as returned by the API
+        """
+        self.kind = kind
+        self.template = template
+        self.roles = template_roles(template)
+        self.field_keys = template_field_keys(template)
+
+    @property
+    def id(self) -> str:
+        return self.template.id
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.template.get("name")
+
+    def problems(
+        self, roles: Iterable[str] = (), field_keys: Iterable[str] = ()
+    ) -> List[str]:
+        """Describe the roles and field keys this template doesn't have
+
+        Templates whose definition lists no roles (or no fields) accept any.
+
+        Args:
+            roles: roles to be assigned
+            field_keys: keys of fields to be given values
+
+        Returns:
+            list of messages, empty if everything is known
+        """
+        problems = []
+        for kind, given, known in (
+            ("role", roles, self.roles),
+            ("field key", field_keys, self.field_keys),
+        ):
+            unknown = [value for value in given if value not in known]
+            if known and unknown:
+                problems.append(
+                    f"Template {self.id} has no {kind} {', '.join(unknown)}"
+                    f" (expected one of: {', '.join(sorted(known))})"
+                )
+        return problems
+
+
+class TemplateRegistry:
+    def __init__(
+        self,
+        client,
+        per_page: int = 100,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        retrieve_details: bool = True,
+    ):
+        """In-memory cache of Template and Envelope Template definitions
+
+        warm_up() lists every Template and Envelope Template, fetching the pages
+        after the first concurrently, and retrieves the ones listed without their
+        fields. Lookups by id and by name, and of roles and field keys, are then
+        answered without calling the API, so validating a BundleHelper makes no
+        template round trips. start_refresh() reloads the registry periodically,
+        in a background thread; a new snapshot replaces the old one at once, so
+        readers never see a partial registry.
+
+        Typical Usage:
+            registry = TemplateRegistry(client)
+            registry.warm_up()
+            registry.start_refresh(interval=600)
+            if "signer-1" not in registry.roles(template_id):
+                ...
+
+        Args:
+            client: a blueink Client
+            per_page: number of templates per page
+            max_workers: number of concurrent requests
+            retrieve_details: retrieve templates listed without their "fields"
+        """
+        self._client = client
+        self._per_page = per_page
+        self._max_workers = max_workers
+        self._retrieve_details = retrieve_details
+        self._lock = threading.Lock()
+        self._entries: Dict[str, TemplateEntry] = {}
+        self._by_name: Dict[str, List[str]] = {}
+        # Ids the API answered 404 for, until the next warm_up()
+        self._missing: FrozenSet[str] = frozenset()
+        self._refresh_thread = None
+        self._stop_refresh = threading.Event()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, template_id: str):
+        return template_id in self._entries
+
+    def __iter__(self) -> Iterator[TemplateEntry]:
+        return iter(list(self._entries.values()))
+
+    def warm_up(self) -> int:
+        """Load every Template and Envelope Template, replacing the registry
+
+        Returns:
+            number of templates loaded
+        """
+        entries = {}
+        for kind, subclient in (
+            (TEMPLATE, self._client.templates),
+            (ENVELOPE_TEMPLATE, self._client.envelope_templates),
+        ):
+            for template in self._load(subclient):
+                entries[template.id] = TemplateEntry(kind, template)
+
+        by_name = {}
+        for entry in entries.values():
+            if entry.name is not None:
+                by_name.setdefault(entry.name, []).append(entry.id)
+
+        with self._lock:
+            self._entries = entries
+            self._by_name = by_name
+            self._missing = frozenset()
+        return len(entries)
+
+    def start_refresh(self, interval: float):
+        """Reload the registry every interval seconds, in a daemon thread
+
+        A failed reload is logged and the registry kept as it was.
+        """
+        if self._refresh_thread is not None:
+            raise RuntimeError("The registry is already refreshing")
+        self._stop_refresh.clear()
+        self._refresh_thread = threading.Thread(
+            target=self._refresh_loop,
+            args=(interval,),
+            name="blueink-template-registry",
+            daemon=True,
+        )
+        self._refresh_thread.start()
+
+    def stop_refresh(self):
+        if self._refresh_thread is not None:
+            self._stop_refresh.set()
+            self._refresh_thread.join()
+            self._refresh_thread = None
+
+    def get(self, template_id: str, fetch: bool = False) -> Optional[TemplateEntry]:
+        """Return a Template or Envelope Template by id
+
+        Args:
+            template_id:
+            fetch: retrieve and add the template if it isn't in the registry, eg.
+                one created since the last refresh. Envelope Template ids start
+                with "T-". Ids the API doesn't know are not retrieved again until
+                the next warm_up().
+
+        Returns:
+            the TemplateEntry, or None
+
+        Raises:
+            requests.HTTPError: when fetching fails other than with a 404
+        """
+        entry = self._entries.get(template_id)
+        if entry is None and fetch and template_id not in self._missing:
+            entry = self._fetch(template_id)
+        return entry
+
+    def find_by_name(self, name: str) -> List[TemplateEntry]:
+        """Return the templates with a name; names need not be unique"""
+        with self._lock:
+            ids = list(self._by_name.get(name, ()))
+            return [self._entries[template_id] for template_id in ids]
+
+    def roles(self, template_id: str) -> FrozenSet[str]:
+        """Return the roles of a template, empty if it isn't in the registry"""
+        entry = self._entries.get(template_id)
+        return entry.roles if entry else frozenset()
+
+    def field_keys(self, template_id: str) -> FrozenSet[str]:
+        """Return the field keys of a template, empty if it isn't in the registry"""
+        entry = self._entries.get(template_id)
+        return entry.field_keys if entry else frozenset()
+
+    def _load(self, subclient) -> List[Munch]:
+        # Error responses are raised as well (a Client may be created with
+        # raise_exceptions=False), so a failed page never leaves the registry
+        # incomplete
+        first = check_response(subclient.list(page=1, per_page=self._per_page))
+        templates = list(first.data)
+        total_pages = first.pagination.total_pages if first.pagination else 1
+
+        pages = run_batch(
+            lambda page: check_response(
+                subclient.list(page=page, per_page=self._per_page)
+            ),
+            range(2, total_pages + 1),
+            max_workers=self._max_workers,
+        )
+        for result in pages:
+            if not result.ok:
+                raise result.error
+            templates.extend(result.response.data)
+
+        if self._retrieve_details:
+            summaries = [t for t in templates if "fields" not in t]
+            details = run_batch(
+                lambda template: check_response(subclient.retrieve(template.id)),
+                summaries,
+                max_workers=self._max_workers,
+            )
+            retrieved = {}
+            for result in details:
+                if not result.ok:
+                    raise result.error
+                retrieved[result.item.id] = result.response.data
+            templates = [retrieved.get(t.id, t) for t in templates]
+        return templates
+
+    def _fetch(self, template_id: str) -> Optional[TemplateEntry]:
+        if template_id.startswith("T-"):
+            kind, subclient = ENVELOPE_TEMPLATE, self._client.envelope_templates
+        else:
+            kind, subclient = TEMPLATE, self._client.templates
+        try:
+            response = check_response(subclient.retrieve(template_id))
+        except requests.HTTPError as error:
+            if error.response is None or error.response.status_code != 404:
+                raise
+            with self._lock:
+                self._missing = self._missing | {template_id}
+            return None
+
+        entry = TemplateEntry(kind, response.data)
+        with self._lock:
+            # Copied, as readers may be iterating over the current snapshot
+            self._entries = {**self._entries, entry.id: entry}
+            if entry.name is not None:
+                by_name = dict(self._by_name)
+                by_name[entry.name] = by_name.get(entry.name, []) + [entry.id]
+                self._by_name = by_name
+        return entry
+
+    def _refresh_loop(self, interval: float):
+        while not self._stop_refresh.wait(interval):
+            try:
+                self.warm_up()
+            except Exception:
+                logger.exception("Refreshing the template registry failed")
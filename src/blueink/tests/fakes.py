@@ -0,0 +1,43 @@
+import threading
+
+from munch import Munch
+
+
+class FakeRequestHelper:
+    """Stands in for RequestHelper, recording requests instead of sending them"""
+
+    def __init__(self, fail_urls=(), error_urls=None):
+        self.calls = []
+        self._fail_urls = set(fail_urls)
+        self._error_urls = dict(error_urls or {})
+        self._lock = threading.Lock()
+
+    def _record(self, method, url, **kwargs):
+        with self._lock:
+            self.calls.append(Munch(method=method, url=url, **kwargs))
+        if url in self._fail_urls:
+            raise RuntimeError(f"{method} {url} failed")
+        if url in self._error_urls:
+            status = self._error_urls[url]
+            return Munch(
+                status=status,
+                data=Munch(),
+                pagination=None,
+                original_response=Munch(status_code=status, headers={}),
+            )
+        return Munch(status=200, data=Munch(url=url), pagination=None)
+
+    def get(self, url, **kwargs):
+        return self._record("get", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._record("post", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self._record("put", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self._record("patch", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self._record("delete", url, **kwargs)
@@ -0,0 +1,81 @@
+import requests
+from munch import Munch
+
+from blueink.batch import RateLimiter, is_transient, run_batch
+from blueink.utils.testcase import TestCase
+
+
+class TestRunBatch(TestCase):
+    def test_results_in_input_order_with_errors(self):
+        def func(item):
+            if item == 3:
+                raise ValueError("three")
+            return item * 10
+
+        results = list(run_batch(func, iter(range(10)), max_workers=4, max_pending=3))
+
+        self.assert_equal([r.index for r in results], list(range(10)))
+        self.assert_equal([r.item for r in results], list(range(10)))
+        self.assert_false(results[3].ok)
+        self.assert_equal(str(results[3].error), "three")
+        self.assert_equal(results[9].response, 90)
+
+    def test_items_consumed_lazily(self):
+        consumed = []
+
+        def items():
+            for i in range(100):
+                consumed.append(i)
+                yield i
+
+        results = run_batch(lambda item: item, items(), max_workers=2, max_pending=4)
+        next(results)
+
+        self.assert_true(len(consumed) <= 5)
+        results.close()
+
+    def test_retries(self):
+        attempts = {}
+
+        def func(item):
+            attempts[item] = attempts.get(item, 0) + 1
+            if item == "flaky" and attempts[item] < 3:
+                raise requests.ConnectionError("reset")
+            if item == "bad":
+                raise ValueError("bad")
+            return item
+
+        results = list(run_batch(func, ["ok", "flaky", "bad"], retries=3, backoff=0))
+
+        self.assert_equal([r.ok for r in results], [True, True, False])
+        self.assert_equal([r.attempts for r in results], [1, 3, 1])
+        self.assert_equal(attempts["bad"], 1)
+
+    def test_is_transient(self):
+        def http_error(status):
+            return requests.HTTPError(response=Munch(status_code=status))
+
+        self.assert_true(is_transient(requests.Timeout()))
+        self.assert_true(is_transient(http_error(429)))
+        self.assert_true(is_transient(http_error(503)))
+        self.assert_false(is_transient(http_error(404)))
+        self.assert_false(is_transient(ValueError()))
+
+    def test_rate_limiter(self):
+        now = [100.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(round(seconds, 6))
+            now[0] += seconds
+
+        limiter = RateLimiter(10, burst=2, clock=lambda: now[0], sleep=sleep)
+        for _ in range(4):
+            limiter.acquire()
+
+        # The burst starts at once, then operations are spaced at the rate
+        self.assert_equal(sleeps, [0.1, 0.1])
+
+        now[0] += 5
+        limiter.acquire()
+        self.assert_len(sleeps, 2)
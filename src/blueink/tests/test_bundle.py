@@ -0,0 +1,162 @@
+import base64
+import json
+
+import pytest
+from munch import Munch, munchify
+from requests import HTTPError
+
+from blueink.bundle_helper import BundleHelper
+from blueink.constants import PACKET_STATUS
+from blueink.request_helper import RequestHelper
+from blueink.subclients.bundle import BundleSubClient
+from blueink.tests.fakes import FakeRequestHelper
+from blueink.transport import Transport, TransportResponse
+from blueink.utils.testcase import TestCase
+
+
+class FakePacketsRequestHelper(FakeRequestHelper):
+    def __init__(self, fail_urls=(), fail_page=None):
+        super().__init__(fail_urls)
+        self.fail_page = fail_page
+
+    def get(self, url, **kwargs):
+        self._record("get", url, **kwargs)
+        page = kwargs["params"]["page"]
+        if page == self.fail_page:
+            return Munch(status=503, data=Munch(), pagination=None)
+        bundles = [
+            {"id": "B1", "packets": [{"id": "P1", "status": PACKET_STATUS.SENT}]},
+            {
+                "id": "B2",
+                "packets": [
+                    {"id": "P2", "status": PACKET_STATUS.COMPLETE},
+                    {"id": "P3", "status": PACKET_STATUS.STARTED},
+                ],
+            },
+        ]
+        return munchify(
+            {
+                "status": 200,
+                "data": [bundles[page - 1]],
+                "pagination": {"total_pages": 2},
+            }
+        )
+
+
+class CapturingTransport(Transport):
+    """Keeps the requests sent, answering each with a created Bundle"""
+
+    def __init__(self):
+        self.requests = []
+
+    def send(self, request):
+        self.requests.append(request)
+        return TransportResponse(201, {}, [b'{"id": "B1"}'])
+
+
+class TestBundleSubClient(TestCase):
+    BASE_URL = "https://api.example.com"
+
+    def test_create_uploads_deduplicated_documents_decoded(self):
+        transport = CapturingTransport()
+        bundles = BundleSubClient(
+            self.BASE_URL, RequestHelper("secret", transport=transport)
+        )
+
+        bh = BundleHelper(label="Bundle", dedupe_documents=True)
+        bh.add_document_by_b64("test.pdf", base64.b64encode(b"%PDF-test").decode())
+        bh.add_document_by_b64("copy.pdf", base64.b64encode(b"%PDF-test").decode())
+        bh.add_signer(name="Signer", email="signer@example.com")
+        response = bundles.create_from_bundle_helper(bh)
+
+        self.assert_equal(response.data.id, "B1")
+        body = transport.requests[0].body
+        self.assert_in(b'name="files[0]"; filename="test.pdf"', body)
+        self.assert_not_in(b'name="files[1]"', body)
+        self.assert_in(b"\r\n\r\n%PDF-test\r\n", body)
+        self.assert_not_in(base64.b64encode(b"%PDF-test"), body)
+
+    def test_create_many_compiles_and_posts(self):
+        requests = FakeRequestHelper()
+        bundles = BundleSubClient(self.BASE_URL, requests)
+
+        helpers = []
+        for i in range(5):
+            bh = BundleHelper(label=f"Bundle {i}")
+            bh.add_document_by_url("https://www.example.com/example.pdf")
+            bh.add_signer(name=f"Signer {i}", email=f"signer{i}@example.com")
+            helpers.append(bh)
+        envelope_bh = BundleHelper(label="Envelope")
+        envelope_bh.add_signer(name="Signer", email="signer@example.com")
+        envelope_bh.set_envelope_template("T-abc123")
+        helpers.append(envelope_bh)
+
+        results = list(bundles.create_many(helpers, compile_workers=2))
+
+        self.assert_len(results, 6)
+        self.assert_true(all(r.ok for r in results))
+        self.assert_true(results[0].item is helpers[0])
+        self.assert_len(requests.calls, 6)
+
+        labels = {json.loads(call.data)["label"]: call.url for call in requests.calls}
+        self.assert_equal(labels["Bundle 3"], f"{self.BASE_URL}/bundles/")
+        self.assert_equal(
+            labels["Envelope"],
+            f"{self.BASE_URL}/bundles/create_from_envelope_template/",
+        )
+
+    def test_create_many_error_responses(self):
+        url = f"{self.BASE_URL}/bundles/create_from_envelope_template/"
+        requests = FakeRequestHelper(error_urls={url: 400})
+        bundles = BundleSubClient(self.BASE_URL, requests)
+
+        bh = BundleHelper(label="Envelope")
+        bh.add_signer(name="Signer", email="signer@example.com")
+        bh.set_envelope_template("T-abc123")
+        results = list(bundles.create_many([bh], compile_workers=1))
+
+        self.assert_false(results[0].ok)
+        self.assert_equal(results[0].error.response.status_code, 400)
+
+    def test_iter_packets(self):
+        requests = FakePacketsRequestHelper()
+        bundles = BundleSubClient(self.BASE_URL, requests)
+
+        packets = list(bundles.iter_packets(per_page=1))
+
+        self.assert_equal([p.id for p in packets], ["P1", "P3"])
+        self.assert_len(requests.calls, 2)
+        self.assert_equal(requests.calls[0].params["status__in"], "se,st")
+
+        requests = FakePacketsRequestHelper(fail_page=2)
+        bundles = BundleSubClient(self.BASE_URL, requests)
+        with pytest.raises(HTTPError):
+            list(bundles.iter_packets(per_page=1))
+
+    def test_cancel_many(self):
+        fail_url = f"{self.BASE_URL}/bundles/B2/cancel/"
+        requests = FakePacketsRequestHelper(fail_urls=[fail_url])
+        bundles = BundleSubClient(self.BASE_URL, requests)
+
+        results = list(bundles.cancel_many(status="se", retries=0))
+
+        self.assert_equal([r.item for r in results], ["B1", "B2"])
+        self.assert_equal([r.ok for r in results], [True, False])
+        puts = [call.url for call in requests.calls if call.method == "put"]
+        self.assert_len(puts, 2)
+
+        results = list(bundles.cancel_many(["B3"]))
+        self.assert_true(results[0].ok)
+        self.assert_equal(requests.calls[-1].url, f"{self.BASE_URL}/bundles/B3/cancel/")
+
+        # A failed page cancels nothing, rather than part of the Bundles
+        requests = FakePacketsRequestHelper(fail_page=2)
+        bundles = BundleSubClient(self.BASE_URL, requests)
+        with pytest.raises(HTTPError):
+            bundles.cancel_many(status="se")
+        self.assert_true(all(call.method == "get" for call in requests.calls))
+
+        with pytest.raises(ValueError):
+            bundles.cancel_many(["B1"], status="se")
+        with pytest.raises(ValueError):
+            bundles.cancel_many()
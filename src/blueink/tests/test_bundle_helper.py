@@ -1,11 +1,22 @@
 import copy
-from datetime import datetime, timezone, timedelta
+import json
+import os
+from base64 import b64decode, b64encode
+from datetime import datetime, timedelta, timezone
+from os.path import basename
 
 import pytest
 from munch import Munch
+from pydantic import ValidationError as PydanticValidationError
 
 from blueink.bundle_helper import BundleHelper
-from blueink.model.bundles import ImportedDocument
+from blueink.model.bundles import ImportedDocument, KeyGenerator, ValidationError
+from blueink.utils.files import (
+    EncodedFileCache,
+    b64_content_digest,
+    content_digest,
+    encode_file,
+)
 from blueink.utils.testcase import TestCase
 
 
@@ -73,7 +84,7 @@ class TestBundleHelper(TestCase):
     DOCUMENT_01_URL = "https://www.example.com/example1.pdf"
     DOCUMENT_02_URL = "https://www.example.com/example2.pdf"
 
-    REAL_DOCUMENT_PATH = "w4.pdf"
+    REAL_DOCUMENT_PATH = os.path.join(os.path.dirname(__file__), "w4.pdf")
     REAL_DOCUMENT_URL = "https://www.irs.gov/pub/irs-pdf/fw4.pdf"
 
     def test_base_bundle(self):
@@ -506,6 +517,297 @@ class TestBundleHelper(TestCase):
         self.assert_equal(field["v_regex"], "^[A-Z]+$")
         self.assert_equal(field["v_regex_msg"], "Uppercase letters only")
 
+    def test_trusted_mode_matches_validated_output(self):
+        """Test that trusted construction compiles to the same Bundle data"""
+        outputs = []
+        for trusted in (False, True):
+            bh = BundleHelper(**self.BUNDLE_INIT_DATA, trusted=trusted)
+            doc01_key = bh.add_document_by_url(self.DOCUMENT_01_URL, key="doc-01")
+            signer01_key = bh.add_signer(**self.SIGNER_01_DATA, key="signer-01")
+            bh.add_field(
+                document_key=doc01_key,
+                key="field-01",
+                editors=[signer01_key],
+                **{k: v for k, v in self.FIELD_01_DATA.items() if k != "editors"},
+            )
+            outputs.append(bh.as_data())
+
+        self.assert_equal(outputs[0], outputs[1])
+
+    def test_trusted_mode_skips_validation_until_validate(self):
+        """Test that trusted mode defers validation to an explicit validate() call"""
+        bh = BundleHelper(**self.BUNDLE_INIT_DATA, trusted=True)
+        doc01_key = bh.add_document_by_url(self.DOCUMENT_01_URL)
+        signer01_key = bh.add_signer(name="Eli Vance", email="not-an-email")
+        bh.add_field(doc01_key, 1, 2, 3, 4, 1, "bogus", editors=[signer01_key])
+
+        with pytest.raises(PydanticValidationError) as exc_info:
+            bh.validate()
+        self.assert_in("email", str(exc_info.value))
+        self.assert_in("bogus", str(exc_info.value))
+
+    def test_validate_passes_for_valid_bundle(self):
+        bh = BundleHelper(**self.BUNDLE_INIT_DATA, trusted=True)
+        doc01_key = bh.add_document_by_url(self.DOCUMENT_01_URL)
+        signer01_key = bh.add_signer(**self.SIGNER_01_DATA)
+        bh.add_field(doc01_key, 1, 2, 3, 4, 1, "inp", editors=[signer01_key])
+
+        bh.validate()
+
+    def test_fields_serialized_from_field_store(self):
+        """Test that stored fields expand to the same wire format in data and json"""
+        bh = BundleHelper(**self.BUNDLE_INIT_DATA)
+        doc01_key = bh.add_document_by_url(self.DOCUMENT_01_URL)
+        signer01_key = bh.add_signer(**self.SIGNER_01_DATA)
+        bh.add_field(doc01_key, 1, 2, 3, 4, 1, "inp", editors=[signer01_key])
+        bh.add_field(doc01_key, 5, 6, 7, 8, 2, "chk", v_min=1, custom_attr="custom")
+
+        compiled_bundle = bh.as_data()
+        fields = compiled_bundle["documents"][0]["fields"]
+
+        self.assert_len(fields, 2)
+        self.assert_equal(fields[0]["editors"], [signer01_key])
+        self.assert_not_in("label", fields[0])
+        self.assert_not_in("editors", fields[1])
+        self.assert_equal(fields[1]["v_min"], 1)
+        self.assert_equal(fields[1]["custom_attr"], "custom")
+        self.assert_equal(json.loads(bh.as_json()), compiled_bundle)
+
+    def test_add_fields_from_tuples_and_columns(self):
+        """Test bulk field placement from tuple rows and from a dict of columns"""
+        bh = BundleHelper(**self.BUNDLE_INIT_DATA)
+        doc01_key = bh.add_document_by_url(self.DOCUMENT_01_URL)
+        signer01_key = bh.add_signer(**self.SIGNER_01_DATA)
+        signer02_key = bh.add_signer(**self.SIGNER_02_DATA)
+
+        tuple_keys = bh.add_fields(
+            doc01_key,
+            [
+                (1, 2, 3, 4, 1, "inp"),
+                (5, 6, 7, 8, 2, "sig", [signer02_key], "Sign Here", "my-sig"),
+            ],
+            editors=[signer01_key],
+        )
+        column_keys = bh.add_fields(
+            doc01_key,
+            {
+                "x": [10, 20],
+                "y": [11, 21],
+                "w": [12, 22],
+                "h": [13, 23],
+                "p": [1, 1],
+                "kind": ["chk", "dat"],
+                "v_min": [None, 2],
+            },
+        )
+
+        self.assert_len(tuple_keys, 2)
+        self.assert_equal(tuple_keys[1], "my-sig")
+        self.assert_len(column_keys, 2)
+
+        fields = bh.as_data()["documents"][0]["fields"]
+        self.assert_equal([f["key"] for f in fields], tuple_keys + column_keys)
+        self.assert_equal(fields[0]["editors"], [signer01_key])
+        self.assert_equal(fields[1]["editors"], [signer02_key])
+        self.assert_equal(fields[1]["label"], "Sign Here")
+        self.assert_equal(fields[2]["x"], 10)
+        self.assert_not_in("v_min", fields[2])
+        self.assert_equal(fields[3]["v_min"], 2)
+
+    def test_add_fields_validates_all_rows_first(self):
+        bh = BundleHelper(**self.BUNDLE_INIT_DATA)
+        doc01_key = bh.add_document_by_url(self.DOCUMENT_01_URL)
+        signer01_key = bh.add_signer(**self.SIGNER_01_DATA)
+
+        bad_rows = [
+            [(1, 2, 3, 4, 1, "inp"), (1, 2, 3, 4, 1, "bogus")],
+            [(1, 2, 3, 4, 1, "inp", ["unknown-signer"])],
+            [(1, "two", 3, 4, 1, "inp", [signer01_key])],
+        ]
+        for rows in bad_rows:
+            with pytest.raises(ValidationError):
+                bh.add_fields(doc01_key, rows)
+
+        self.assert_not_in("fields", bh.as_data()["documents"][0])
+
+    def test_add_auto_placements(self):
+        bh = BundleHelper(**self.BUNDLE_INIT_DATA)
+        doc01_key = bh.add_document_by_url(self.DOCUMENT_01_URL)
+        signer01_key = bh.add_signer(**self.SIGNER_01_DATA)
+
+        bh.add_auto_placements(
+            doc01_key,
+            [("sig", "Signature", 20, 5, -5, 2), ("inp", "Address", 20, 2)],
+            editors=[signer01_key],
+        )
+
+        auto_placements = bh.as_data()["documents"][0]["auto_placements"]
+        self.assert_len(auto_placements, 2)
+        self.assert_equal(auto_placements[0]["offset_x"], -5)
+        self.assert_equal(auto_placements[1]["search"], "Address")
+        self.assert_equal(auto_placements[1]["editors"], [signer01_key])
+
+    def test_seeded_keys_are_reproducible(self):
+        """Test that helpers with the same seed generate the same keys"""
+        keys = []
+        for _ in range(2):
+            bh = BundleHelper(**self.BUNDLE_INIT_DATA, seed=42)
+            doc01_key = bh.add_document_by_url(self.DOCUMENT_01_URL)
+            signer01_key = bh.add_signer(**self.SIGNER_01_DATA)
+            field_keys = bh.add_fields(doc01_key, [(1, 2, 3, 4, 1, "inp")] * 10)
+            keys.append([doc01_key, signer01_key] + field_keys)
+
+        self.assert_equal(keys[0], keys[1])
+        self.assert_len(set(keys[0]), len(keys[0]))
+
+    def test_frozen_helper_rejects_changes(self):
+        bh = BundleHelper(**self.BUNDLE_INIT_DATA).freeze()
+
+        with pytest.raises(RuntimeError):
+            bh.add_document_by_url(self.DOCUMENT_01_URL)
+        with pytest.raises(RuntimeError):
+            bh.add_signer(**self.SIGNER_01_DATA)
+
+    def test_clone_copies_on_write(self):
+        """Test that clones share the prototype's data until they modify it"""
+        proto = BundleHelper(**self.BUNDLE_INIT_DATA)
+        doc01_key = proto.add_document_by_b64("doc.pdf", "dGVzdA==")
+        tmpl01_key = proto.add_document_template("template-01", {}, {})
+        proto.add_fields(doc01_key, [(1, 2, 3, 4, 1, "inp")])
+        proto.freeze()
+        proto_data = proto.as_data()
+
+        clone01 = proto.clone()
+        clone01_signer = clone01.add_signer(**self.SIGNER_01_DATA)
+        clone01.assign_role(tmpl01_key, clone01_signer, "signer")
+        clone01.set_value(tmpl01_key, "name", "Eli")
+        clone01.add_fields(doc01_key, [(5, 6, 7, 8, 1, "sig", [clone01_signer])])
+
+        clone02 = proto.clone()
+        clone02.add_signer(**self.SIGNER_02_DATA)
+
+        self.assert_equal(proto.as_data(), proto_data)
+        self.assert_true(
+            clone01._documents[doc01_key].file_b64
+            is proto._documents[doc01_key].file_b64
+        )
+        self.assert_true(clone02._documents[tmpl01_key] is proto._documents[tmpl01_key])
+
+        clone01_data = clone01.as_data()
+        self.assert_len(clone01_data["packets"], 1)
+        self.assert_len(clone01_data["documents"][0]["fields"], 2)
+        self.assert_len(clone01_data["documents"][1]["field_values"], 1)
+        self.assert_len(clone01_data["documents"][1]["assignments"], 1)
+
+        clone02_data = clone02.as_data()
+        self.assert_len(clone02_data["packets"], 1)
+        self.assert_len(clone02_data["documents"][0]["fields"], 1)
+        self.assert_len(clone02_data["documents"][1]["field_values"], 0)
+
+    def test_clone_requires_frozen_helper(self):
+        bh = BundleHelper(**self.BUNDLE_INIT_DATA)
+
+        with pytest.raises(RuntimeError):
+            bh.clone()
+
+    def test_identical_documents_share_one_payload(self):
+        """Test that the same content added twice is only encoded and held once"""
+        with open(self.REAL_DOCUMENT_PATH, "rb") as file:
+            b64str = b64encode(file.read()).decode("utf-8")
+
+        bh = BundleHelper(**self.BUNDLE_INIT_DATA, file_cache=None)
+        doc01_key = bh.add_document_by_path(self.REAL_DOCUMENT_PATH)
+        doc02_key = bh.add_document_by_b64("copy.pdf", b64str)
+
+        self.assert_true(
+            bh._documents[doc01_key].file_b64 is bh._documents[doc02_key].file_b64
+        )
+        documents = bh.as_data()["documents"]
+        self.assert_equal(documents[0]["file_b64"], b64str)
+        self.assert_len(bh.files, 0)
+
+    def test_dedupe_documents_references_files_by_index(self):
+        with open(self.REAL_DOCUMENT_PATH, "rb") as file:
+            byte_array = bytearray(file.read())
+
+        bh = BundleHelper(**self.BUNDLE_INIT_DATA, dedupe_documents=True)
+        bh.add_document_by_path(self.REAL_DOCUMENT_PATH)
+        bh.add_document_by_bytearray("copy.pdf", byte_array)
+        bh.add_document_by_b64("other.pdf", "dGVzdA==")
+
+        documents = bh.as_data()["documents"]
+        self.assert_len(bh.files, 2)
+        self.assert_equal(bh.files[0]["filename"], basename(self.REAL_DOCUMENT_PATH))
+        self.assert_equal(bh.files[1]["file_b64"], "dGVzdA==")
+        self.assert_equal([d["file_index"] for d in documents], [0, 0, 1])
+        for document in documents:
+            self.assert_not_in("file_b64", document)
+
+
+class TestEncodedFileCache(TestCase):
+    def test_encode_path_uses_cache_until_file_changes(self, tmp_path):
+        file_path = tmp_path / "doc.pdf"
+        file_path.write_bytes(b"first")
+        cache = EncodedFileCache()
+
+        digest01, b64_01 = cache.encode_path(str(file_path))
+        digest02, b64_02 = cache.encode_path(str(file_path))
+        self.assert_equal(digest01, digest02)
+        self.assert_true(b64_01 is b64_02)
+
+        file_path.write_bytes(b"second")
+        os.utime(file_path, ns=(0, 0))
+        digest03, b64_03 = cache.encode_path(str(file_path))
+        self.assert_not_equal(digest01, digest03)
+        self.assert_equal(b64decode(b64_03), b"second")
+        self.assert_equal(digest03, b64_content_digest(b64_03))
+
+    def test_b64_content_digest_in_chunks(self):
+        for size in (0, 1, 2, 3, 10, 1000):
+            data = os.urandom(size)
+            b64str = b64encode(data).decode("utf-8")
+
+            self.assert_equal(
+                b64_content_digest(b64str, chunk_size=8), content_digest(data)
+            )
+            # Line breaks shift the chunks
+            wrapped = "\n".join(b64str[i : i + 7] for i in range(0, len(b64str), 7))
+            self.assert_equal(
+                b64_content_digest(wrapped, chunk_size=8), content_digest(data)
+            )
+
+    def test_encode_file_in_chunks(self, tmp_path):
+        """Test that chunked, memory-mapped encoding matches plain b64encode"""
+        for size in (0, 1, 2, 3, 10, 1000):
+            file_path = tmp_path / f"doc-{size}.bin"
+            data = os.urandom(size)
+            file_path.write_bytes(data)
+
+            digest, b64str = encode_file(str(file_path), chunk_size=9)
+
+            self.assert_equal(b64str, b64encode(data).decode("utf-8"))
+            self.assert_equal(digest, content_digest(data))
+
+    def test_cache_is_bounded(self):
+        cache = EncodedFileCache(max_bytes=16)
+        cache.encode_bytes(b"0123456789")
+        cache.encode_bytes(b"abcdefghij")
+
+        self.assert_len(cache, 1)
+
+
+class TestKeyGenerator(TestCase):
+    def test_keys_are_unique(self):
+        """Test that keys never repeat, even once the slug space is exhausted"""
+        generator = KeyGenerator(seed=1, length=1)
+        generator.reserve("field_a")
+
+        keys = [generator.generate("field") for _ in range(200)]
+
+        self.assert_len(set(keys), 200)
+        self.assert_not_in("field_a", keys)
+        self.assert_len(generator, 201)
+
 
 class TestImportedDocument(TestCase):
     def test_create_with_file_b64(self):
@@ -0,0 +1,200 @@
+import threading
+from datetime import datetime, timezone
+
+from munch import Munch
+
+from blueink.constants import EVENT_TYPE
+from blueink.embed_pool import EmbedUrlPool, parse_expires
+from blueink.model.webhook import WebhookEvent
+from blueink.utils.testcase import TestCase
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeEmbedClient:
+    """Returns numbered URLs, valid for ttl seconds of the given clock"""
+
+    def __init__(self, clock, ttl=None):
+        self.calls = []
+        self._clock = clock
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self.packets = Munch(embed_url=self._embed_url)
+        self.bundles = Munch(create_preparation_session=self._create_session)
+
+    def _response(self, name):
+        with self._lock:
+            self.calls.append(name)
+            url = f"https://embed.example.com/{name}/{len(self.calls)}"
+        data = Munch(url=url)
+        if self._ttl is not None:
+            expires = datetime.fromtimestamp(self._clock() + self._ttl, timezone.utc)
+            data.expires = expires.isoformat().replace("+00:00", "Z")
+        return Munch(status=200, data=data)
+
+    def _embed_url(self, packet_id):
+        return self._response(packet_id)
+
+    def _create_session(self, data):
+        return self._response(data["redirect_url"])
+
+
+class TestEmbedUrlPool(TestCase):
+    def _pool(self, ttl=None):
+        clock = FakeClock()
+        client = FakeEmbedClient(clock, ttl)
+        pool = EmbedUrlPool(client, expiry_margin=30, default_ttl=300, clock=clock)
+        return pool, client, clock
+
+    def test_parse_expires(self):
+        self.assert_equal(parse_expires("1970-01-01T00:01:40Z"), 100)
+        self.assert_equal(parse_expires("1970-01-01T00:01:40+00:00"), 100)
+        self.assert_equal(parse_expires(None), None)
+
+    def test_prefetch_and_get(self):
+        pool, client, clock = self._pool()
+        pool.prefetch(["p1", "p2"], wait=True)
+        pool.prefetch(["p1"], wait=True)  # already pooled
+
+        self.assert_len(pool, 2)
+        self.assert_len(client.calls, 2)
+        url = pool.get("p1")
+        self.assert_true(url.startswith("https://embed.example.com/p1/"))
+
+        # Served once, then generated on demand
+        self.assert_len(pool, 1)
+        self.assert_true(pool.get("p1") != url)
+        self.assert_len(client.calls, 3)
+        pool.shutdown()
+
+    def test_expiry(self):
+        pool, client, clock = self._pool()
+        pool.prefetch(["p1"], wait=True)
+
+        clock.now += 300 - 29  # within the expiry margin
+        pool.get("p1")
+        self.assert_equal(client.calls, ["p1", "p1"])
+        pool.shutdown()
+
+    def test_invalidate_on_events(self):
+        pool, client, clock = self._pool()
+        pool.prefetch(["p1", "p2"], bundle_id="b1", wait=True)
+        pool.prefetch(["p3"], wait=True)
+
+        pool.handle_event(
+            WebhookEvent(event_type=EVENT_TYPE.EVENT_PACKET_VIEWED, packet_id="p3")
+        )
+        self.assert_len(pool, 3)
+        pool.handle_event(
+            WebhookEvent(event_type=EVENT_TYPE.EVENT_PACKET_COMPLETE, packet_id="p3")
+        )
+        self.assert_len(pool, 2)
+        pool.handle_event(
+            WebhookEvent(event_type=EVENT_TYPE.EVENT_BUNDLE_CANCELLED, bundle_id="b1")
+        )
+        self.assert_len(pool, 0)
+        pool.shutdown()
+
+    def test_invalidate_while_generating(self):
+        pool, client, clock = self._pool()
+        release = threading.Event()
+        embed_url = client.packets.embed_url
+
+        def slow_embed_url(packet_id):
+            release.wait(5)
+            return embed_url(packet_id)
+
+        client.packets.embed_url = slow_embed_url
+        futures = pool.prefetch(["p1"])
+        pool.invalidate("p1")
+        release.set()
+        futures[0].result()
+
+        self.assert_len(pool, 0)
+        pool.shutdown()
+
+    def test_concurrent_gets_share_one_call(self):
+        pool, client, clock = self._pool()
+        started = threading.Event()
+        release = threading.Event()
+        embed_url = client.packets.embed_url
+
+        def slow_embed_url(packet_id):
+            started.set()
+            release.wait(5)
+            return embed_url(packet_id)
+
+        client.packets.embed_url = slow_embed_url
+        # Counts the callers that reached on-demand generation
+        entered = threading.Semaphore(0)
+        generate_on_demand = pool._generate_on_demand
+
+        def counting_generate_on_demand(*args):
+            entered.release()
+            return generate_on_demand(*args)
+
+        pool._generate_on_demand = counting_generate_on_demand
+        urls = []
+        threads = [
+            threading.Thread(target=lambda: urls.append(pool.get("p1")))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        # The first call is in flight until every caller joined it
+        for _ in threads:
+            entered.acquire(timeout=5)
+        threading.Event().wait(0.05)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assert_len(client.calls, 1)
+        self.assert_len(urls, 4)
+        self.assert_len(set(urls), 1)
+
+        # The next call makes a new request
+        pool.get("p1")
+        self.assert_len(client.calls, 2)
+        pool.shutdown()
+
+    def test_bundles_of_served_packets_are_forgotten(self):
+        pool, client, clock = self._pool()
+        for i in range(100):
+            pool.prefetch([f"p{i}"], bundle_id=f"b{i}", wait=True)
+            pool.get(f"p{i}")
+
+        self.assert_len(pool, 0)
+        self.assert_true(len(pool._bundles) <= 65)
+        pool.shutdown()
+
+    def test_expired_urls_are_swept(self):
+        pool, client, clock = self._pool()
+        pool.prefetch([f"old{i}" for i in range(100)], wait=True)
+        self.assert_len(pool, 100)
+
+        # URLs never taken are dropped once they have expired
+        clock.now += 300
+        for i in range(100):
+            pool.prefetch([f"new{i}"], wait=True)
+        self.assert_len(pool, 100)
+        self.assert_true(all(key[1].startswith("new") for key in pool._urls))
+        pool.shutdown()
+
+    def test_preparation_sessions(self):
+        pool, client, clock = self._pool(ttl=600)
+        data = {"upload_pdf": True, "redirect_url": "https://www.example.com/done"}
+        pool.prefetch_preparation_session("user-1", data).result()
+        self.assert_true(pool.prefetch_preparation_session("user-1", data) is None)
+
+        url = pool.get_preparation_session("user-1", data)
+        self.assert_len(client.calls, 1)
+        self.assert_in("www.example.com/done", url)
+        pool.shutdown()
@@ -0,0 +1,144 @@
+import json
+
+import pytest
+from munch import Munch
+from requests import HTTPError
+
+from blueink.constants import BUNDLE_STATUS
+from blueink.export import BundleExporter, flatten_bundle, parquet_row
+from blueink.subclients.bundle import BundleSubClient
+from blueink.tests.fakes import FakeRequestHelper
+from blueink.utils.testcase import TestCase
+
+BASE_URL = "https://api.example.com"
+
+
+class FakeBundlesRequestHelper(FakeRequestHelper):
+    """Serves pages of Bundles, and their events, files and data"""
+
+    def __init__(self, total_pages=3, per_page=4, fail_page=None, error_urls=None):
+        super().__init__(error_urls=error_urls)
+        self.total_pages = total_pages
+        self.per_page = per_page
+        self.fail_page = fail_page
+
+    def get(self, url, **kwargs):
+        response = super().get(url, **kwargs)
+        if response.status >= 400:
+            return response
+        if url == f"{BASE_URL}/bundles/":
+            page = kwargs["params"]["page"]
+            if page == self.fail_page:
+                raise RuntimeError(f"page {page} failed")
+            bundles = [
+                Munch(id=f"b{page}-{i}", status=BUNDLE_STATUS.COMPLETE, packets=[])
+                for i in range(self.per_page)
+            ]
+            # Keys that only some Bundles have
+            bundles[-1].label = f"Bundle {page}"
+            bundles[-1].new_key = page
+            pagination = Munch(page_number=page, total_pages=self.total_pages)
+            return Munch(status=200, data=bundles, pagination=pagination)
+
+        bundle_id, kind = url.split("/")[-3:-1]
+        return Munch(status=200, data=[Munch(kind=kind, bundle=bundle_id)])
+
+
+def read_ndjson(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestBundleExporter(TestCase):
+    def _exporter(self, requests):
+        return BundleExporter(Munch(bundles=BundleSubClient(BASE_URL, requests)))
+
+    def test_to_ndjson(self, tmp_path):
+        path = tmp_path / "bundles.ndjson"
+        count = self._exporter(FakeBundlesRequestHelper()).to_ndjson(str(path))
+
+        bundles = read_ndjson(path)
+        self.assert_equal(count, 12)
+        self.assert_equal(
+            [b["id"] for b in bundles[:5]],
+            [
+                "b1-0",
+                "b1-1",
+                "b1-2",
+                "b1-3",
+                "b2-0",
+            ],
+        )
+        self.assert_equal(bundles[0]["events"], [{"kind": "events", "bundle": "b1-0"}])
+        self.assert_equal(bundles[11]["data"], [{"kind": "data", "bundle": "b3-3"}])
+
+    def test_to_ndjson_resumes_after_failure(self, tmp_path):
+        path = tmp_path / "bundles.ndjson"
+        with pytest.raises(RuntimeError):
+            self._exporter(FakeBundlesRequestHelper(fail_page=3)).to_ndjson(str(path))
+        self.assert_len(read_ndjson(path), 8)
+
+        # A partial write after the last checkpoint is discarded on resume
+        with open(path, "a") as file:
+            file.write('{"id": "partial"')
+
+        requests = FakeBundlesRequestHelper()
+        count = self._exporter(requests).to_ndjson(str(path))
+
+        self.assert_equal(count, 4)
+        self.assert_equal(requests.calls[0].params["page"], 3)
+        bundles = read_ndjson(path)
+        self.assert_equal(
+            [b["id"] for b in bundles],
+            [f"b{page}-{i}" for page in range(1, 4) for i in range(4)],
+        )
+
+    def test_related_data_errors_raise(self, tmp_path):
+        path = tmp_path / "bundles.ndjson"
+        requests = FakeBundlesRequestHelper(
+            error_urls={f"{BASE_URL}/bundles/b2-1/data/": 503}
+        )
+        with pytest.raises(HTTPError):
+            self._exporter(requests).to_ndjson(str(path))
+        self.assert_len(read_ndjson(path), 4)
+
+    def test_error_pages_raise(self):
+        requests = FakeBundlesRequestHelper(error_urls={f"{BASE_URL}/bundles/": 503})
+        with pytest.raises(HTTPError):
+            list(self._exporter(requests).iter_pages())
+
+    def test_flatten_bundle(self):
+        row = flatten_bundle(Munch(id="b1", packets=[Munch(id="p1")], is_test=True))
+        self.assert_equal(
+            row, {"id": "b1", "packets": '[{"id": "p1"}]', "is_test": True}
+        )
+
+    def test_to_parquet(self, tmp_path):
+        pq = pytest.importorskip("pyarrow.parquet")
+
+        exporter = self._exporter(FakeBundlesRequestHelper())
+        count = exporter.to_parquet(str(tmp_path), row_group_size=5)
+
+        self.assert_equal(count, 12)
+        self.assert_equal(
+            sorted(p.name for p in tmp_path.glob("*.parquet")),
+            [
+                "part-000001.parquet",
+                "part-000003.parquet",
+            ],
+        )
+        table = pq.read_table(tmp_path / "part-000001.parquet")
+        self.assert_equal(table.num_rows, 8)
+        rows = table.to_pylist()
+        self.assert_equal(rows[3]["label"], "Bundle 1")
+        self.assert_equal(json.loads(rows[3]["extra"]), {"new_key": 1})
+        self.assert_true(rows[0]["extra"] is None)
+        self.assert_equal(
+            pq.read_schema(tmp_path / "part-000003.parquet"), table.schema
+        )
+
+    def test_parquet_row(self):
+        row = parquet_row(Munch(id="b1", packets=[], is_test=True, other={"a": 1}))
+        self.assert_equal(row["id"], "b1")
+        self.assert_equal(row["packets"], "[]")
+        self.assert_equal(row["extra"], '{"other": {"a": 1}}')
+        self.assert_true(row["label"] is None)
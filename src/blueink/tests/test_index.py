@@ -0,0 +1,211 @@
+import pytest
+import requests
+from munch import Munch, munchify
+
+from blueink.constants import BUNDLE_STATUS, EVENT_TYPE
+from blueink.index import BundleIndex, PersonIndex
+from blueink.utils.testcase import TestCase
+
+
+def make_bundle(bundle_id, status, created, emails=(), **kwargs):
+    packets = [{"id": f"{bundle_id}-{i}", "email": e} for i, e in enumerate(emails)]
+    return munchify(
+        dict(id=bundle_id, status=status, created=created, packets=packets, **kwargs)
+    )
+
+
+BUNDLES = [
+    make_bundle(
+        "b1",
+        BUNDLE_STATUS.SENT,
+        "2024-01-01T10:00:00Z",
+        ["Alice@example.com"],
+        custom_key="crm-1",
+        team="sales",
+        label="NDA",
+    ),
+    make_bundle(
+        "b2",
+        BUNDLE_STATUS.COMPLETE,
+        "2024-02-01T10:00:00Z",
+        ["bob@example.com", "alice@example.com"],
+        team="sales",
+        label="Contract",
+        completed_at="2024-02-03T10:00:00Z",
+    ),
+    make_bundle(
+        "b3",
+        BUNDLE_STATUS.SENT,
+        "2024-03-01T10:00:00Z",
+        ["carol@example.com"],
+        team="legal",
+        label="NDA",
+    ),
+]
+
+
+class FakePagedBundles:
+    def __init__(self, pages, fail_page=None):
+        self.pages = pages
+        self.fail_page = fail_page
+
+    def list(self, page=None, per_page=None, **query_params):
+        if page == self.fail_page:
+            return Munch(status=503, data=Munch(), pagination=None)
+        return Munch(
+            status=200,
+            data=self.pages[page - 1],
+            pagination=Munch(total_pages=len(self.pages)),
+        )
+
+
+class TestBundleIndex(TestCase):
+    def _index(self):
+        index = BundleIndex()
+        index.upsert(BUNDLES)
+        return index
+
+    def _ids(self, bundles):
+        return [b.id for b in bundles]
+
+    def test_find(self):
+        index = self._index()
+
+        self.assert_len(index, 3)
+        self.assert_equal(self._ids(index.find()), ["b3", "b2", "b1"])
+        self.assert_equal(
+            self._ids(index.find(status=BUNDLE_STATUS.SENT, team="sales")), ["b1"]
+        )
+        self.assert_equal(
+            self._ids(index.find(status=[BUNDLE_STATUS.SENT, BUNDLE_STATUS.COMPLETE])),
+            ["b3", "b2", "b1"],
+        )
+        self.assert_equal(self._ids(index.find(custom_key="crm-1")), ["b1"])
+        self.assert_equal(self._ids(index.find(label="NDA", limit=1)), ["b3"])
+        self.assert_equal(
+            self._ids(index.find(signer_email="ALICE@example.com")), ["b2", "b1"]
+        )
+        self.assert_equal(
+            self._ids(
+                index.find(
+                    created_after="2024-01-15T00:00:00Z",
+                    created_before="2024-03-01T10:00:00Z",
+                )
+            ),
+            ["b2"],
+        )
+        self.assert_equal(
+            self._ids(index.find(completed_after="2024-02-01T00:00:00Z")), ["b2"]
+        )
+        self.assert_equal(index.get("b2").packets[0].email, "bob@example.com")
+        self.assert_equal(index.get("missing"), None)
+
+    def test_upsert_replaces_signers(self):
+        index = self._index()
+        index.upsert([make_bundle("b1", BUNDLE_STATUS.SENT, "2024-01-01", ["d@x.com"])])
+
+        self.assert_len(index, 3)
+        self.assert_equal(
+            self._ids(index.find(signer_email="alice@example.com")), ["b2"]
+        )
+        self.assert_equal(self._ids(index.find(signer_email="d@x.com")), ["b1"])
+
+    def test_sync(self):
+        index = BundleIndex()
+        client = Munch(bundles=FakePagedBundles([BUNDLES[:2], BUNDLES[2:]]))
+
+        self.assert_equal(index.sync(client), 3)
+        self.assert_len(index, 3)
+
+    def test_sync_raises_on_failed_page(self):
+        index = BundleIndex()
+        client = Munch(bundles=FakePagedBundles([BUNDLES[:2], BUNDLES[2:]], 2))
+
+        with pytest.raises(requests.HTTPError):
+            index.sync(client)
+
+    def test_apply_webhook_event(self):
+        index = self._index()
+
+        changed = index.apply_webhook_event(
+            {
+                "event_type": EVENT_TYPE.EVENT_BUNDLE_COMPLETE,
+                "bundle_id": "b1",
+                "created": "2024-05-01T12:00:00Z",
+            }
+        )
+        self.assert_true(changed)
+        self.assert_equal(index.get("b1").status, BUNDLE_STATUS.COMPLETE)
+        self.assert_equal(index.get("b1").completed_at, "2024-05-01T12:00:00Z")
+        self.assert_equal(self._ids(index.find(completed_after="2024-05-01")), ["b1"])
+        self.assert_equal(self._ids(index.find(status=BUNDLE_STATUS.SENT)), ["b3"])
+
+        bundle = make_bundle("b4", BUNDLE_STATUS.SENT, "2024-04-01", ["e@x.com"])
+        self.assert_true(
+            index.apply_webhook_event(
+                {"event_type": EVENT_TYPE.EVENT_BUNDLE_LAUNCHED, "bundle": bundle}
+            )
+        )
+        self.assert_equal(self._ids(index.find(signer_email="e@x.com")), ["b4"])
+
+        self.assert_false(
+            index.apply_webhook_event(
+                {"event_type": EVENT_TYPE.EVENT_PACKET_VIEWED, "bundle_id": "b3"}
+            )
+        )
+        self.assert_false(
+            index.apply_webhook_event(
+                {"event_type": EVENT_TYPE.EVENT_BUNDLE_COMPLETE, "bundle_id": "nope"}
+            )
+        )
+
+
+class TestPersonIndex(TestCase):
+    def test_upsert_replaces_channels(self):
+        index = PersonIndex()
+        index.upsert(
+            [
+                {
+                    "id": "p1",
+                    "name": "Alice",
+                    "channels": [
+                        {"email": "alice@example.com", "kind": "em"},
+                        {"phone": "5055551212", "kind": "mp"},
+                    ],
+                },
+                {
+                    "id": "p2",
+                    "name": "Bob",
+                    "channels": [{"email": "bob@example.com", "kind": "em"}],
+                },
+            ]
+        )
+        index.upsert(
+            [
+                {
+                    "id": "p1",
+                    "name": "Alice",
+                    "channels": [{"email": "alice@new.example.com", "kind": "em"}],
+                },
+                # Bob now holds Alice's old phone number
+                {
+                    "id": "p2",
+                    "name": "Bob",
+                    "channels": [
+                        {"email": "bob@example.com", "kind": "em"},
+                        {"phone": "5055551212", "kind": "mp"},
+                    ],
+                },
+            ]
+        )
+
+        def match(email=None, phone=None):
+            return index.match(
+                {"channels": [{"email": email, "phone": phone, "kind": "em"}]}
+            )
+
+        self.assert_len(index, 2)
+        self.assert_equal(match(email="alice@example.com"), set())
+        self.assert_equal(match(email="ALICE@new.example.com"), {"p1"})
+        self.assert_equal(match(phone="5055551212"), {"p2"})
+        self.assert_equal(match(email="bob@example.com"), {"p2"})
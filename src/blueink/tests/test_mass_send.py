@@ -0,0 +1,111 @@
+import json
+
+from munch import Munch
+
+from blueink.bundle_helper import BundleHelper
+from blueink.mass_send import MassSender, RowMapper, read_rows
+from blueink.subclients.bundle import BundleSubClient
+from blueink.tests.fakes import FakeRequestHelper
+from blueink.utils.testcase import TestCase
+
+
+class TestMassSend(TestCase):
+    BASE_URL = "https://api.example.com"
+
+    def _write_csv(self, path, count):
+        lines = ["name,email,company"]
+        lines += [f"Signer {i},signer{i}@example.com,ACME {i}" for i in range(count)]
+        path.write_text("\n".join(lines) + "\n")
+
+    def _client(self, error_urls=None):
+        requests = FakeRequestHelper(error_urls=error_urls)
+        return Munch(bundles=BundleSubClient(self.BASE_URL, requests)), requests
+
+    def test_read_rows(self, tmp_path):
+        csv_path = tmp_path / "rows.csv"
+        self._write_csv(csv_path, 2)
+        ndjson_path = tmp_path / "rows.ndjson"
+        ndjson_path.write_text('{"name": "A"}\n\n{"name": "B"}\n')
+
+        rows = list(read_rows(str(csv_path)))
+        self.assert_equal(rows[1]["email"], "signer1@example.com")
+        self.assert_equal(
+            list(read_rows(str(ndjson_path))), [{"name": "A"}, {"name": "B"}]
+        )
+
+    def test_envelope_template_rows(self, tmp_path):
+        input_path = tmp_path / "rows.csv"
+        output_path = tmp_path / "results.ndjson"
+        self._write_csv(input_path, 5)
+        client, requests = self._client()
+
+        mapper = RowMapper(
+            {"name": "name", "email": "email"},
+            envelope_template_id="T-abc123",
+            value_columns={"company_name": "company"},
+            label="Agreement",
+        )
+        summary = MassSender(client, mapper, max_workers=2).run(
+            str(input_path), str(output_path)
+        )
+
+        self.assert_equal(summary, {"skipped": 0, "succeeded": 5, "failed": 0})
+        self.assert_len(requests.calls, 5)
+        templates = [call.json["envelope_template"] for call in requests.calls]
+        self.assert_equal({t["template_id"] for t in templates}, {"T-abc123"})
+        self.assert_equal(
+            sorted(t["field_values"][0]["initial_value"] for t in templates),
+            [f"ACME {i}" for i in range(5)],
+        )
+
+        records = [json.loads(line) for line in output_path.read_text().splitlines()]
+        self.assert_equal([r["row"] for r in records], list(range(5)))
+        self.assert_true(all(r["ok"] for r in records))
+
+    def test_failed_rows_and_resume(self, tmp_path):
+        input_path = tmp_path / "rows.ndjson"
+        output_path = tmp_path / "results.ndjson"
+        rows = [{"name": f"Signer {i}", "email": f"s{i}@example.com"} for i in range(6)]
+        del rows[4]["email"]
+        input_path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+
+        prototype = BundleHelper(label="Prototype")
+        prototype.add_document_by_url("https://www.example.com/example.pdf")
+        prototype.freeze()
+        mapper = RowMapper({"name": "name", "email": "email"}, prototype=prototype)
+
+        # A previous run got through the first two rows
+        with open(MassSender.checkpoint_path(str(output_path)), "w") as file:
+            json.dump({"next_row": 2}, file)
+
+        client, requests = self._client()
+        summary = MassSender(client, mapper).run(str(input_path), str(output_path))
+
+        self.assert_equal(summary, {"skipped": 2, "succeeded": 3, "failed": 1})
+        self.assert_len(requests.calls, 3)
+        records = [json.loads(line) for line in output_path.read_text().splitlines()]
+        self.assert_equal([r["row"] for r in records], [2, 3, 4, 5])
+        self.assert_false(records[2]["ok"])
+        self.assert_in("email", records[2]["error"])
+
+        # Nothing is left to send
+        summary = MassSender(client, mapper).run(str(input_path), str(output_path))
+        self.assert_equal(summary, {"skipped": 6, "succeeded": 0, "failed": 0})
+        self.assert_len(requests.calls, 3)
+
+    def test_error_responses_fail_rows(self, tmp_path):
+        input_path = tmp_path / "rows.csv"
+        output_path = tmp_path / "results.ndjson"
+        self._write_csv(input_path, 2)
+        url = f"{self.BASE_URL}/bundles/create_from_envelope_template/"
+        client, requests = self._client(error_urls={url: 400})
+
+        mapper = RowMapper(
+            {"name": "name", "email": "email"}, envelope_template_id="T-abc123"
+        )
+        summary = MassSender(client, mapper).run(str(input_path), str(output_path))
+
+        self.assert_equal(summary, {"skipped": 0, "succeeded": 0, "failed": 2})
+        records = [json.loads(line) for line in output_path.read_text().splitlines()]
+        self.assert_false(any(r["ok"] for r in records))
+        self.assert_in("400", records[0]["error"])
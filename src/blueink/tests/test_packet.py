@@ -0,0 +1,77 @@
+from munch import Munch
+
+from blueink.subclients.packet import PacketSubClient
+from blueink.tests.fakes import FakeRequestHelper
+from blueink.utils.testcase import TestCase
+
+
+class TestPacketSubClient(TestCase):
+    BASE_URL = "https://api.example.com"
+
+    def test_remind_many(self):
+        fail_url = f"{self.BASE_URL}/packets/P2/remind/"
+        requests = FakeRequestHelper(fail_urls=[fail_url])
+        packets = PacketSubClient(self.BASE_URL, requests)
+
+        results = list(packets.remind_many(["P1", "P2", "P3"], rate_limit=1000))
+
+        self.assert_equal([r.item for r in results], ["P1", "P2", "P3"])
+        self.assert_equal([r.ok for r in results], [True, False, True])
+        self.assert_true(all(call.method == "put" for call in requests.calls))
+        self.assert_equal(
+            sorted(call.url for call in requests.calls),
+            [f"{self.BASE_URL}/packets/P{i}/remind/" for i in (1, 2, 3)],
+        )
+
+    def test_remind_many_checks_responses(self):
+        statuses = {"P1": [503, 200], "P2": [404]}
+
+        class FlakyRequestHelper(FakeRequestHelper):
+            def put(self, url, **kwargs):
+                self._record("put", url, **kwargs)
+                packet_id = url.rstrip("/").split("/")[-2]
+                status = statuses[packet_id].pop(0)
+                return Munch(
+                    status=status,
+                    data=Munch(),
+                    original_response=Munch(status_code=status, headers={}),
+                )
+
+        requests = FlakyRequestHelper()
+        packets = PacketSubClient(self.BASE_URL, requests)
+
+        results = list(packets.remind_many(["P1", "P2"], backoff=0))
+
+        self.assert_equal([r.ok for r in results], [True, False])
+        self.assert_equal([r.attempts for r in results], [2, 1])
+        self.assert_equal(results[1].error.response.status_code, 404)
+
+    def test_update_many_retries_error_responses(self):
+        statuses = {"P1": [503, 200], "P2": [400]}
+
+        class FlakyRequestHelper(FakeRequestHelper):
+            def patch(self, url, **kwargs):
+                self._record("patch", url, **kwargs)
+                packet_id = url.rstrip("/").split("/")[-1]
+                status = statuses[packet_id].pop(0)
+                return Munch(
+                    status=status,
+                    data=Munch(),
+                    original_response=Munch(status_code=status, headers={}),
+                )
+
+        requests = FlakyRequestHelper()
+        packets = PacketSubClient(self.BASE_URL, requests)
+
+        results = list(
+            packets.update_many(
+                ["P1", "P2"], lambda packet_id: {"name": packet_id}, backoff=0
+            )
+        )
+
+        self.assert_equal([r.ok for r in results], [True, False])
+        self.assert_equal(results[0].attempts, 2)
+        self.assert_equal(results[1].attempts, 1)
+        self.assert_equal(
+            sorted(call.json["name"] for call in requests.calls), ["P1", "P1", "P2"]
+        )
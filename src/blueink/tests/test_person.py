@@ -0,0 +1,156 @@
+import pytest
+import requests
+from munch import Munch
+
+from blueink.index import PersonIndex
+from blueink.person_helper import PersonHelper
+from blueink.subclients.person import PersonSubClient
+from blueink.tests.fakes import FakeRequestHelper
+from blueink.utils.testcase import TestCase
+
+
+class FakePersonsRequestHelper(FakeRequestHelper):
+    """Echoes the person sent, giving created persons a new id"""
+
+    def _record(self, method, url, **kwargs):
+        super()._record(method, url, **kwargs)
+        person = Munch(kwargs.get("json") or {})
+        person.setdefault("id", url.rstrip("/").split("/")[-1])
+        if method == "post":
+            person.id = f"new-{person.name}"
+        return Munch(status=201 if method == "post" else 200, data=person)
+
+
+class FakeListedPersonsRequestHelper(FakePersonsRequestHelper):
+    """Lists one Person per page, page fail_page failing"""
+
+    def __init__(self, persons, fail_page=None):
+        super().__init__()
+        self.persons = persons
+        self.fail_page = fail_page
+
+    def get(self, url, **kwargs):
+        FakeRequestHelper._record(self, "get", url, **kwargs)
+        page = kwargs["params"]["page"]
+        if page == self.fail_page:
+            return Munch(status=503, data=Munch(), pagination=None)
+        return Munch(
+            status=200,
+            data=[self.persons[page - 1]],
+            pagination=Munch(total_pages=len(self.persons)),
+        )
+
+
+class TestPersonUpsertMany(TestCase):
+    BASE_URL = "https://api.example.com"
+
+    def _index(self):
+        index = PersonIndex()
+        index.upsert(
+            [
+                {
+                    "id": "p1",
+                    "name": "Alice",
+                    "metadata": {},
+                    "channels": [{"email": "alice@example.com", "kind": "em"}],
+                },
+                {
+                    "id": "p2",
+                    "name": "Bob",
+                    "channels": [
+                        {"email": "bob@example.com", "kind": "em"},
+                        {"phone": "5055551212", "kind": "mp"},
+                    ],
+                },
+            ]
+        )
+        return index
+
+    def test_upsert_many(self):
+        requests = FakePersonsRequestHelper()
+        persons = PersonSubClient(self.BASE_URL, requests)
+        index = self._index()
+
+        helpers = [
+            PersonHelper("Alice", {}, [], ["ALICE@example.com"]),
+            PersonHelper("Robert", {}, ["5055551212"], ["bob@example.com"]),
+            PersonHelper("Carol", {}, [], ["carol@example.com"]),
+            PersonHelper("Carol 2", {}, [], ["carol@example.com"]),
+        ]
+        results = list(persons.upsert_many(helpers, index=index, max_workers=2))
+
+        self.assert_equal(
+            [r.action for r in results],
+            ["unchanged", "updated", "created", None],
+        )
+        self.assert_equal([r.ok for r in results], [True, True, True, False])
+        self.assert_true(results[1].item is helpers[1])
+        self.assert_in("record 2", str(results[3].error))
+
+        self.assert_equal(
+            sorted((c.method, c.url) for c in requests.calls),
+            [
+                ("post", f"{self.BASE_URL}/persons/"),
+                ("put", f"{self.BASE_URL}/persons/p2/"),
+            ],
+        )
+        # The index reflects the changes
+        self.assert_len(index, 3)
+        self.assert_true(index.is_current("p2", helpers[1].as_dict()))
+        self.assert_equal(index.match(helpers[2].as_dict()), {"new-Carol"})
+
+    def test_upsert_many_error_responses(self):
+        class RejectingRequestHelper(FakePersonsRequestHelper):
+            def post(self, url, **kwargs):
+                self._record("post", url, **kwargs)
+                return Munch(status=400, data=Munch(error="invalid"))
+
+        requests_helper = RejectingRequestHelper()
+        persons = PersonSubClient(self.BASE_URL, requests_helper)
+        index = self._index()
+
+        helper = PersonHelper("Carol", {}, [], ["carol@example.com"])
+        results = list(persons.upsert_many([helper], index=index))
+
+        self.assert_false(results[0].ok)
+        self.assert_in("400", str(results[0].error))
+        self.assert_len(index, 2)
+
+    def test_upsert_many_ambiguous_match(self):
+        requests = FakePersonsRequestHelper()
+        persons = PersonSubClient(self.BASE_URL, requests)
+
+        helper = PersonHelper("Mix", {}, ["5055551212"], ["alice@example.com"])
+        results = list(persons.upsert_many([helper], index=self._index()))
+
+        self.assert_false(results[0].ok)
+        self.assert_in("several existing Persons", str(results[0].error))
+        self.assert_len(requests.calls, 0)
+
+    def test_upsert_many_lists_existing_persons(self):
+        existing = [
+            {
+                "id": "p1",
+                "name": "Alice",
+                "channels": [{"email": "alice@example.com", "kind": "em"}],
+            },
+            {
+                "id": "p2",
+                "name": "Bob",
+                "channels": [{"email": "bob@example.com", "kind": "em"}],
+            },
+        ]
+        helper = PersonHelper("Bob", {}, [], ["bob@example.com"])
+
+        requests_helper = FakeListedPersonsRequestHelper(existing)
+        persons = PersonSubClient(self.BASE_URL, requests_helper)
+        results = list(persons.upsert_many([helper]))
+        self.assert_equal(results[0].action, "unchanged")
+        self.assert_len(requests_helper.calls, 2)
+
+        # A failed page raises, rather than creating Bob again
+        requests_helper = FakeListedPersonsRequestHelper(existing, fail_page=2)
+        persons = PersonSubClient(self.BASE_URL, requests_helper)
+        with pytest.raises(requests.HTTPError):
+            list(persons.upsert_many([helper]))
+        self.assert_true(all(c.method == "get" for c in requests_helper.calls))
@@ -1,3 +1,6 @@
+import pytest
+from pydantic import ValidationError
+
 from blueink.person_helper import PersonHelper
 from blueink.utils.testcase import TestCase
 
@@ -63,3 +66,53 @@ class TestPersonHelper(TestCase):
         )
 
         self._check_values(ph.as_dict())
+
+    def test_instances_do_not_share_state(self):
+        ph1 = PersonHelper(name="One")
+        ph1.add_phone(self.PHONES[0])
+        ph1.add_email(self.EMAILS[0])
+        ph2 = PersonHelper(name="Two")
+
+        self.assert_len(ph2.get_phones(), 0)
+        self.assert_len(ph2.get_emails(), 0)
+        self.assert_equal(ph2.as_dict()["channels"], [])
+
+    def test_inputs_are_copied(self):
+        phones = list(self.PHONES)
+        metadata = dict(self.METADATA)
+        ph = PersonHelper(name=self.NAME, metadata=metadata, phones=phones)
+        ph.add_phone("505 555 0000")
+        ph.get_phones().append("505 555 1111")
+        metadata["KEY03"] = 3
+
+        self.assert_equal(phones, self.PHONES)
+        self.assert_len(ph.get_phones(), 2)
+        self.assert_len(ph.as_dict()["metadata"], 2)
+
+    def test_as_dicts(self):
+        helpers = [
+            PersonHelper(
+                name=self.NAME,
+                metadata=self.METADATA,
+                phones=self.PHONES,
+                emails=self.EMAILS,
+            )
+            for _ in range(3)
+        ]
+        data = PersonHelper.as_dicts(helpers, external_id="X")
+
+        self.assert_len(data, 3)
+        for person in data:
+            self._check_values(person)
+            self.assert_equal(person["external_id"], "X")
+
+    def test_invalid_email(self):
+        ph = PersonHelper(name=self.NAME, emails=["not an email"])
+        with pytest.raises(ValidationError):
+            ph.as_dict()
+
+    def test_invalid_name(self):
+        ph = PersonHelper(name={"first": "Joe"})
+        with pytest.raises(ValidationError):
+            ph.as_dict()
+        self.assert_equal(PersonHelper(name=123).as_dict()["name"], "123")
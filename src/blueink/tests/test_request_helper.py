@@ -0,0 +1,158 @@
+import gzip
+import json
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from blueink.constants import BLUEINK_PAGINATION_HEADER
+from blueink.request_helper import RequestHelper
+from blueink.transport import ReplayTransport, compress_chunks
+from blueink.utils.testcase import TestCase
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    """Echoes requests as JSON, gzipped if the client accepts it; paths ending in
+    /missing/ are 404s"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are sent separately; don't let them wait for an ACK
+    disable_nagle_algorithm = True
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding") != "chunked":
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        body = b""
+        while True:
+            size = int(self.rfile.readline().strip(), 16)
+            body += self.rfile.read(size)
+            self.rfile.readline()
+            if size == 0:
+                return body
+
+    def _respond(self):
+        body = self._read_body()
+        encoding = self.headers.get("Content-Encoding")
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        elif encoding == "deflate":
+            body = zlib.decompress(body)
+        body = body.decode("utf-8")
+        status = 404 if self.path.rstrip("/").endswith("missing") else 200
+        payload = json.dumps(
+            {
+                "method": self.command,
+                "path": self.path,
+                "authorization": self.headers.get("Authorization"),
+                "content_type": self.headers.get("Content-Type"),
+                "content_encoding": encoding,
+                "transfer_encoding": self.headers.get("Transfer-Encoding"),
+                "body": body,
+            }
+        ).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            payload = gzip.compress(payload)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header(BLUEINK_PAGINATION_HEADER, "1,3,50,120")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fake_api():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeApiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+class TestRequestHelper(TestCase):
+    def _check_helper(self, helper, base_url):
+        response = helper.post(f"{base_url}/bundles/", json={"label": "Contract"})
+        self.assert_equal(response.status, 200)
+        self.assert_equal(response.data.method, "POST")
+        self.assert_equal(response.data.authorization, "Token secret")
+        self.assert_equal(json.loads(response.data.body), {"label": "Contract"})
+        self.assert_equal(response.pagination.total_results, 120)
+
+        response = helper.get(f"{base_url}/bundles/", params={"page": 2})
+        self.assert_equal(response.data.path, "/bundles/?page=2")
+
+        response = helper.post(
+            f"{base_url}/bundles/",
+            data={"bundle_request": "{}"},
+            files=[("files[0]", ("a.pdf", b"%PDF", "application/pdf"))],
+        )
+        self.assert_true(response.data.content_type.startswith("multipart/form-data"))
+        self.assert_in('filename="a.pdf"', response.data.body)
+
+        with pytest.raises(requests.HTTPError) as exc_info:
+            helper.get(f"{base_url}/bundles/missing/")
+        self.assert_equal(exc_info.value.response.status_code, 404)
+
+    def test_requests_transport(self, fake_api):
+        self._check_helper(RequestHelper("secret", raise_exceptions=True), fake_api)
+
+    def test_http2_with_transport_is_rejected(self):
+        with pytest.raises(ValueError):
+            RequestHelper("secret", http2=True, transport=ReplayTransport([]))
+
+    def test_http2_transport(self, fake_api):
+        pytest.importorskip("h2")
+        pytest.importorskip("httpx")
+
+        helper = RequestHelper("secret", raise_exceptions=True, http2=True)
+        try:
+            self._check_helper(helper, fake_api)
+
+            with pytest.raises(requests.ConnectionError):
+                helper.get("http://127.0.0.1:1/bundles/")
+        finally:
+            helper.close()
+
+    def _check_compression(self, base_url, http2=False):
+        helper = RequestHelper(
+            "secret", compression="gzip", compression_threshold=1000, http2=http2
+        )
+        try:
+            small = helper.post(f"{base_url}/bundles/", json={"label": "Contract"})
+            self.assert_true(small.data.content_encoding is None)
+
+            html = "<p>Hello</p>" * 10000
+            large = helper.post(f"{base_url}/bundles/", json={"file_html": html})
+            self.assert_equal(large.data.content_encoding, "gzip")
+            self.assert_equal(large.data.transfer_encoding, "chunked")
+            self.assert_equal(json.loads(large.data.body)["file_html"], html)
+        finally:
+            helper.close()
+
+    def test_compression(self, fake_api):
+        self._check_compression(fake_api)
+
+    def test_compression_http2_transport(self, fake_api):
+        pytest.importorskip("h2")
+        pytest.importorskip("httpx")
+        self._check_compression(fake_api, http2=True)
+
+    def test_compress_chunks(self):
+        data = b"file_b64" * 100000
+        chunks = list(compress_chunks(data, "gzip", chunk_size=4096))
+        self.assert_true(len(chunks) > 1)
+        self.assert_equal(gzip.decompress(b"".join(chunks)), data)
+        deflated = b"".join(compress_chunks(data, "deflate"))
+        self.assert_equal(zlib.decompress(deflated), data)
+
+        with pytest.raises(ValueError):
+            RequestHelper("secret", compression="br")
@@ -0,0 +1,247 @@
+import pickle
+import threading
+
+import pytest
+import requests
+from munch import Munch, munchify
+
+from blueink.bundle_helper import BundleHelper
+from blueink.model.bundles import ValidationError
+from blueink.request_helper import RequestHelper
+from blueink.subclients.template import TemplateSubClient
+from blueink.template_registry import (
+    ENVELOPE_TEMPLATE,
+    TEMPLATE,
+    TemplateRegistry,
+    template_field_keys,
+    template_roles,
+)
+from blueink.transport import ReplayTransport
+from blueink.utils.testcase import TestCase
+
+
+class FakeTemplateSubClient:
+    """Serves templates page by page, listed without their fields"""
+
+    def __init__(self, templates, per_page):
+        self.templates = {t["id"]: t for t in templates}
+        self.pages = [
+            templates[i : i + per_page] for i in range(0, len(templates), per_page)
+        ]
+        self.list_calls = []
+        self.retrieve_calls = []
+        self.fail_page = None
+        self._lock = threading.Lock()
+
+    def list(self, page=None, per_page=None):
+        with self._lock:
+            self.list_calls.append(page)
+        if page == self.fail_page:
+            return munchify({"status": 503, "data": {}, "pagination": None})
+        summaries = [
+            {k: v for k, v in t.items() if k != "fields"} for t in self.pages[page - 1]
+        ]
+        return munchify(
+            {
+                "status": 200,
+                "data": summaries,
+                "pagination": {"total_pages": len(self.pages)},
+            }
+        )
+
+    def retrieve(self, template_id):
+        with self._lock:
+            self.retrieve_calls.append(template_id)
+        if template_id not in self.templates:
+            response = munchify({"status": 404, "data": {}})
+            response.original_response = Munch(status_code=404)
+            return response
+        return munchify({"status": 200, "data": self.templates[template_id]})
+
+
+def make_template(i):
+    return {
+        "id": f"tmpl-{i}",
+        "name": "NDA" if i % 2 else f"Template {i}",
+        "roles": [{"key": "signer-1"}, "signer-2"],
+        "fields": [
+            {"key": f"name-{i}", "editors": ["signer-1"]},
+            {"key": "date", "editors": ["signer-3"]},
+        ],
+    }
+
+
+class TestTemplateRegistry(TestCase):
+    def _client(self):
+        templates = [make_template(i) for i in range(7)]
+        envelope_templates = [
+            {
+                "id": "T-abc123",
+                "name": "Onboarding",
+                "documents": [{"fields": [{"key": "company", "editors": ["hr"]}]}],
+            }
+        ]
+        return Munch(
+            templates=FakeTemplateSubClient(templates, per_page=3),
+            envelope_templates=FakeTemplateSubClient(envelope_templates, per_page=3),
+        )
+
+    def test_template_roles_and_field_keys(self):
+        template = make_template(1)
+        self.assert_equal(
+            template_roles(template), {"signer-1", "signer-2", "signer-3"}
+        )
+        self.assert_equal(template_field_keys(template), {"name-1", "date"})
+
+    def test_warm_up(self):
+        client = self._client()
+        registry = TemplateRegistry(client, per_page=3, max_workers=2)
+
+        self.assert_equal(registry.warm_up(), 8)
+
+        self.assert_equal(sorted(client.templates.list_calls), [1, 2, 3])
+        self.assert_len(client.templates.retrieve_calls, 7)
+        self.assert_in("tmpl-6", registry)
+        self.assert_equal(registry.get("tmpl-6").kind, TEMPLATE)
+        self.assert_equal(registry.field_keys("tmpl-6"), {"name-6", "date"})
+        self.assert_in("signer-2", registry.roles("tmpl-6"))
+        self.assert_equal(registry.get("T-abc123").kind, ENVELOPE_TEMPLATE)
+        self.assert_equal(registry.field_keys("T-abc123"), {"company"})
+        self.assert_equal(
+            sorted(e.id for e in registry.find_by_name("NDA")),
+            ["tmpl-1", "tmpl-3", "tmpl-5"],
+        )
+        self.assert_equal(registry.roles("unknown"), frozenset())
+
+    def test_warm_up_raises_on_error_responses(self):
+        client = self._client()
+        registry = TemplateRegistry(client, per_page=3)
+        registry.warm_up()
+
+        for fail_page in (1, 3):
+            client.templates.fail_page = fail_page
+            with pytest.raises(requests.HTTPError):
+                registry.warm_up()
+            self.assert_len(registry, 8)
+
+    def test_get_fetches_missing_templates(self):
+        client = self._client()
+        registry = TemplateRegistry(client, per_page=3)
+
+        self.assert_true(registry.get("tmpl-2") is None)
+        entry = registry.get("tmpl-2", fetch=True)
+        self.assert_equal(entry.field_keys, {"name-2", "date"})
+        self.assert_in("tmpl-2", registry)
+        self.assert_equal(registry.get("T-abc123", fetch=True).kind, ENVELOPE_TEMPLATE)
+        self.assert_true(registry.get("tmpl-99", fetch=True) is None)
+
+    def test_get_caches_missing_templates(self):
+        """Test 404s from a real RequestHelper, raising or not, and that a missing
+        template is only retrieved once"""
+        url = "https://api.example.com/templates/tmpl-99/"
+        for raise_exceptions in (True, False):
+            transport = ReplayTransport(
+                [{"method": "GET", "url": url, "status": 404, "body": "{}"}]
+            )
+            helper = RequestHelper("secret", raise_exceptions, transport=transport)
+            client = Munch(
+                templates=TemplateSubClient("https://api.example.com", helper)
+            )
+            registry = TemplateRegistry(client)
+
+            bh = BundleHelper(template_registry=registry)
+            for _ in range(2):
+                with pytest.raises(ValidationError) as exc_info:
+                    bh.add_document_template("tmpl-99", {}, {})
+                self.assert_in("Template tmpl-99 not found", str(exc_info.value))
+
+    def test_get_raises_other_errors(self):
+        url = "https://api.example.com/templates/tmpl-1/"
+        transport = ReplayTransport(
+            [{"method": "GET", "url": url, "status": 503, "body": "{}"}]
+        )
+        helper = RequestHelper("secret", transport=transport)
+        client = Munch(templates=TemplateSubClient("https://api.example.com", helper))
+
+        with pytest.raises(requests.HTTPError):
+            TemplateRegistry(client).get("tmpl-1", fetch=True)
+
+    def test_refresh(self):
+        client = self._client()
+        registry = TemplateRegistry(client, per_page=3)
+        registry.start_refresh(interval=0.01)
+        try:
+            for _ in range(500):
+                if len(registry) == 8:
+                    break
+                threading.Event().wait(0.01)
+        finally:
+            registry.stop_refresh()
+        self.assert_len(registry, 8)
+
+
+class TestBundleHelperTemplateChecks(TestCase):
+    def _registry(self):
+        registry = TemplateRegistry(TestTemplateRegistry()._client(), per_page=3)
+        registry.warm_up()
+        return registry
+
+    def test_add_document_template_checks_roles_and_field_keys(self):
+        bh = BundleHelper(template_registry=self._registry())
+        bh.add_signer(name="Signer", email="signer@example.com", key="signer-1")
+
+        key = bh.add_document_template(
+            "tmpl-1", {"signer-1": "signer-1"}, {"name-1": "ACME", "date": "today"}
+        )
+        bh.set_value(key, "date", "tomorrow")
+
+        with pytest.raises(ValidationError) as exc_info:
+            bh.add_document_template("tmpl-2", {"witness": "signer-1"}, {"date": "x"})
+        self.assert_in("no role witness", str(exc_info.value))
+        self.assert_len(bh._documents, 1)
+
+        with pytest.raises(ValidationError):
+            bh.set_value(key, "name-2", "value")
+        with pytest.raises(ValidationError):
+            bh.assign_role(key, "signer-1", "witness")
+        with pytest.raises(ValidationError) as exc_info:
+            bh.add_document_template("tmpl-99", {}, {})
+        self.assert_in("not found", str(exc_info.value))
+
+    def test_envelope_template_field_keys(self):
+        bh = BundleHelper(template_registry=self._registry())
+        bh.set_envelope_template("T-abc123", {"company": "ACME"})
+        with pytest.raises(ValidationError):
+            bh.add_envelope_template_field_value("start_date", "today")
+        with pytest.raises(ValidationError):
+            bh.set_envelope_template("T-abc123", {"start_date": "today"})
+
+    def test_validate_with_registry(self):
+        bh = BundleHelper(trusted=True)
+        bh.add_signer(name="Signer", email="signer@example.com", key="signer-1")
+        bh.add_document_template("tmpl-1", {"witness": "signer-1"}, {"nope": "x"})
+
+        bh.validate()
+        with pytest.raises(ValidationError) as exc_info:
+            bh.validate(template_registry=self._registry())
+        self.assert_in("no role witness", str(exc_info.value))
+        self.assert_in("no field key nope", str(exc_info.value))
+
+    def test_validate_with_cold_registry(self):
+        """Test that a registry that isn't warmed up (and so is empty) is used"""
+        bh = BundleHelper(trusted=True)
+        bh.add_signer(name="Signer", email="signer@example.com", key="signer-1")
+        bh.add_document_template("tmpl-1", {"witness": "signer-1"}, {})
+
+        registry = TemplateRegistry(TestTemplateRegistry()._client(), per_page=3)
+        self.assert_len(registry, 0)
+        with pytest.raises(ValidationError) as exc_info:
+            bh.validate(template_registry=registry)
+        self.assert_in("no role witness", str(exc_info.value))
+
+    def test_helper_with_registry_pickles(self):
+        bh = BundleHelper(template_registry=self._registry())
+        bh.add_signer(name="Signer", email="signer@example.com", key="signer-1")
+        clone = pickle.loads(pickle.dumps(bh))
+        self.assert_true(clone._template_registry is None)
+        self.assert_len(clone._packets, 1)
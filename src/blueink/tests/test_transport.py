@@ -0,0 +1,182 @@
+import gzip
+import json
+
+import pytest
+import requests
+
+from blueink.request_helper import RequestHelper
+from blueink.tests.test_request_helper import fake_api  # noqa: F401
+from blueink.transport import (
+    CacheMiddleware,
+    CompressionMiddleware,
+    HttpxTransport,
+    MetricsMiddleware,
+    RateLimitMiddleware,
+    RecordingMiddleware,
+    ReplayTransport,
+    RequestsTransport,
+    RetryMiddleware,
+    Transport,
+    TransportResponse,
+    Urllib3Transport,
+)
+from blueink.utils.testcase import TestCase
+
+
+class ScriptedTransport(Transport):
+    """Answers with the given statuses in turn, or raises the given exceptions"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.requests = []
+
+    def send(self, request):
+        self.requests.append(request)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        body = json.dumps({"status": outcome}).encode("utf-8")
+        return TransportResponse(outcome, {"Retry-After": "0"}, [body])
+
+
+def prepare(method="GET", url="https://api.example.com/bundles/", **kwargs):
+    return requests.Request(method, url, **kwargs).prepare()
+
+
+def make_urllib3_transport():
+    return Urllib3Transport()
+
+
+def make_httpx_transport():
+    pytest.importorskip("h2")
+    pytest.importorskip("httpx")
+    return HttpxTransport()
+
+
+class TestTransports(TestCase):
+    @pytest.mark.parametrize(
+        "make_transport",
+        [RequestsTransport, make_urllib3_transport, make_httpx_transport],
+    )
+    def test_transport(self, fake_api, make_transport):  # noqa: F811
+        helper = RequestHelper(
+            "secret",
+            raise_exceptions=True,
+            compression="gzip",
+            compression_threshold=1000,
+            transport=make_transport(),
+        )
+        try:
+            response = helper.post(f"{fake_api}/bundles/", json={"label": "x"})
+            self.assert_equal(json.loads(response.data.body), {"label": "x"})
+            self.assert_equal(response.pagination.total_pages, 3)
+
+            html = "<p>Hello</p>" * 10000
+            response = helper.post(f"{fake_api}/bundles/", json={"file_html": html})
+            self.assert_equal(response.data.content_encoding, "gzip")
+            self.assert_equal(json.loads(response.data.body)["file_html"], html)
+
+            with pytest.raises(requests.HTTPError):
+                helper.get(f"{fake_api}/bundles/missing/")
+            with pytest.raises(requests.ConnectionError):
+                helper.get("http://127.0.0.1:1/bundles/")
+        finally:
+            helper.close()
+
+    def test_record_and_replay(self, fake_api, tmp_path):  # noqa: F811
+        recorder = RecordingMiddleware(RequestsTransport())
+        helper = RequestHelper("secret", transport=recorder)
+        recorded = helper.get(f"{fake_api}/bundles/", params={"page": 1})
+        helper.close()
+
+        path = str(tmp_path / "cassette.json")
+        recorder.save(path)
+        helper = RequestHelper("secret", transport=ReplayTransport.load(path))
+        replayed = helper.get(f"{fake_api}/bundles/", params={"page": 1})
+
+        self.assert_equal(replayed.data, recorded.data)
+        self.assert_equal(replayed.pagination.total_results, 120)
+        with pytest.raises(RuntimeError):
+            helper.get(f"{fake_api}/bundles/", params={"page": 1})
+
+
+class TestMiddleware(TestCase):
+    def test_retry(self):
+        sleeps = []
+        transport = ScriptedTransport(requests.ConnectionError("reset"), 503, 200)
+        retry = RetryMiddleware(transport, retries=3, backoff=1, sleep=sleeps.append)
+
+        self.assert_equal(retry.send(prepare()).status, 200)
+        self.assert_equal(sleeps, [1, 2])
+
+        transport.outcomes = [503, 503]
+        retry = RetryMiddleware(transport, retries=1, sleep=sleeps.append)
+        self.assert_equal(retry.send(prepare()).status, 503)
+
+    def test_retry_skips_non_idempotent_methods(self):
+        transport = ScriptedTransport(503, 200)
+        retry = RetryMiddleware(transport, sleep=lambda seconds: None)
+        self.assert_equal(retry.send(prepare("POST", json={})).status, 503)
+        self.assert_len(transport.requests, 1)
+
+    def test_retry_inside_compression_resends_the_whole_body(self):
+        class BodyReadingTransport(ScriptedTransport):
+            def send(self, request):
+                self.bodies.append(b"".join(request.body))
+                return super().send(request)
+
+        transport = BodyReadingTransport(503, 200)
+        transport.bodies = []
+        compression = CompressionMiddleware(
+            RetryMiddleware(transport, sleep=lambda seconds: None), threshold=10
+        )
+        payload = {"file_html": "<p>Hello</p>" * 100}
+
+        response = compression.send(prepare("PUT", json=payload))
+
+        self.assert_equal(response.status, 200)
+        self.assert_len(transport.bodies, 2)
+        for body in transport.bodies:
+            self.assert_equal(json.loads(gzip.decompress(body)), payload)
+        for request in transport.requests:
+            self.assert_equal(request.headers["Content-Encoding"], "gzip")
+
+    def test_rate_limit(self):
+        transport = ScriptedTransport(200, 200)
+        limited = RateLimitMiddleware(transport, rate=10)
+        now = [0.0]
+        sleeps = []
+        limited.rate_limiter._clock = lambda: now[0]
+        limited.rate_limiter._next_at = 0.0
+        limited.rate_limiter._sleep = sleeps.append
+
+        limited.send(prepare())
+        limited.send(prepare())
+        self.assert_equal(sleeps, [0.1])
+
+    def test_cache(self):
+        now = [0.0]
+        transport = ScriptedTransport(200, 404, 200)
+        cache = CacheMiddleware(transport, ttl=10, clock=lambda: now[0])
+
+        first = cache.send(prepare()).read()
+        self.assert_equal(cache.send(prepare()).read(), first)
+        self.assert_len(transport.requests, 1)
+
+        now[0] = 11
+        self.assert_equal(cache.send(prepare()).status, 404)
+        self.assert_equal(cache.send(prepare()).status, 200)
+        self.assert_len(transport.requests, 3)
+
+    def test_metrics(self):
+        transport = ScriptedTransport(200, 404, requests.Timeout("slow"))
+        metrics = MetricsMiddleware(transport)
+        metrics.send(prepare())
+        metrics.send(prepare("DELETE"))
+        with pytest.raises(requests.Timeout):
+            metrics.send(prepare())
+
+        snapshot = metrics.snapshot()
+        self.assert_equal(snapshot["requests"], {("GET", 200): 1, ("DELETE", 404): 1})
+        self.assert_equal(snapshot["errors"], {("GET", "Timeout"): 1})
+        self.assert_in(("GET", 200), snapshot["seconds"])
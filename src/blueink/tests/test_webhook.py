@@ -0,0 +1,175 @@
+from munch import Munch, munchify
+
+from blueink.constants import EVENT_TYPE
+from blueink.subclients.webhook import WebhookSubClient
+from blueink.tests.fakes import FakeRequestHelper
+from blueink.utils.testcase import TestCase
+
+
+class FakeWebhooksRequestHelper(FakeRequestHelper):
+    """Serves existing webhooks and headers, and ids for created webhooks"""
+
+    BASE_URL = "https://api.example.com"
+
+    def __init__(self, webhooks, headers, page_size=None, error_urls=None):
+        super().__init__(error_urls=error_urls)
+        self.webhooks = munchify(webhooks)
+        self.headers = munchify(headers)
+        self.page_size = page_size
+
+    def get(self, url, **kwargs):
+        super().get(url, **kwargs)
+        if url == f"{self.BASE_URL}/webhooks/headers/":
+            items = self.headers
+        else:
+            items = self.webhooks
+        if self.page_size is None:
+            return Munch(status=200, data=items, pagination=None)
+
+        page = kwargs["params"]["page"]
+        start = (page - 1) * self.page_size
+        total_pages = -(-len(items) // self.page_size)
+        return Munch(
+            status=200,
+            data=items[start : start + self.page_size],
+            pagination=Munch(total_pages=total_pages),
+        )
+
+    def post(self, url, **kwargs):
+        response = super().post(url, **kwargs)
+        if response.status >= 400:
+            return response
+        return Munch(status=201, data=Munch(id="wh-new"), pagination=None)
+
+
+class TestWebhooksApply(TestCase):
+    BASE_URL = FakeWebhooksRequestHelper.BASE_URL
+
+    WEBHOOKS = [
+        {
+            "id": "wh1",
+            "url": "https://www.example.com/01/",
+            "enabled": True,
+            "json": True,
+            "event_types": [
+                EVENT_TYPE.EVENT_BUNDLE_COMPLETE,
+                EVENT_TYPE.EVENT_BUNDLE_LAUNCHED,
+            ],
+        },
+        {
+            "id": "wh2",
+            "url": "https://www.example.com/02/",
+            "enabled": True,
+            "json": True,
+            "event_types": [EVENT_TYPE.EVENT_BUNDLE_DOCS_READY],
+        },
+    ]
+    HEADERS = [
+        {"id": "h1", "webhook": "wh1", "name": "X-A", "value": "a", "order": 0},
+        {"id": "h2", "webhook": "wh1", "name": "X-B", "value": "b", "order": 0},
+        {"id": "h3", "webhook": "wh1", "name": "X-C", "value": "c", "order": 0},
+    ]
+    DESIRED = [
+        {
+            "url": "https://www.example.com/01/",
+            "event_types": [
+                EVENT_TYPE.EVENT_BUNDLE_LAUNCHED,
+                EVENT_TYPE.EVENT_BUNDLE_COMPLETE,
+            ],
+            "extra_headers": [
+                {"name": "X-A", "value": "a", "order": 0},
+                {"name": "X-B", "value": "changed", "order": 0},
+                {"name": "X-D", "value": "d", "order": 0},
+            ],
+        },
+        {
+            "url": "https://www.example.com/03/",
+            "enabled": False,
+            "event_types": [EVENT_TYPE.EVENT_PACKET_COMPLETE],
+            "extra_headers": [{"name": "X-E", "value": "e", "order": 0}],
+        },
+    ]
+
+    def _webhooks(self, page_size=None, error_urls=None):
+        requests = FakeWebhooksRequestHelper(
+            self.WEBHOOKS, self.HEADERS, page_size, error_urls
+        )
+        return WebhookSubClient(self.BASE_URL, requests), requests
+
+    def test_apply(self):
+        webhooks, requests = self._webhooks()
+        results = webhooks.apply(self.DESIRED, delete_missing=True)
+
+        self.assert_true(all(r.ok for r in results))
+        self.assert_equal(
+            sorted((r.action, str(r.item)) for r in results),
+            [
+                ("create_header", "('https://www.example.com/01/', 'X-D', 0)"),
+                ("create_webhook", "https://www.example.com/03/"),
+                ("delete_header", "('https://www.example.com/01/', 'X-C', 0)"),
+                ("delete_webhook", "https://www.example.com/02/"),
+                ("update_header", "('https://www.example.com/01/', 'X-B', 0)"),
+            ],
+        )
+
+        # Current state is fetched once; one request per change, plus the header
+        # of the new webhook
+        gets = [c.url for c in requests.calls if c.method == "get"]
+        self.assert_len(gets, 2)
+        changes = sorted((c.method, c.url) for c in requests.calls if c.method != "get")
+        self.assert_equal(
+            changes,
+            [
+                ("delete", f"{self.BASE_URL}/webhooks/headers/h3/"),
+                ("delete", f"{self.BASE_URL}/webhooks/wh2/"),
+                ("patch", f"{self.BASE_URL}/webhooks/headers/h2/"),
+                ("post", f"{self.BASE_URL}/webhooks/"),
+                ("post", f"{self.BASE_URL}/webhooks/headers/"),
+                ("post", f"{self.BASE_URL}/webhooks/headers/"),
+            ],
+        )
+        new_header = [
+            c.data for c in requests.calls if c.get("data", {}).get("name") == "X-E"
+        ]
+        self.assert_equal(new_header[0]["webhook"], "wh-new")
+
+    def test_apply_error_responses(self):
+        webhooks, requests = self._webhooks(
+            error_urls={
+                f"{self.BASE_URL}/webhooks/headers/": 400,
+                f"{self.BASE_URL}/webhooks/wh2/": 404,
+            }
+        )
+        results = webhooks.apply(self.DESIRED, delete_missing=True)
+
+        failed = sorted(r.action for r in results if not r.ok)
+        self.assert_equal(failed, ["create_header", "create_webhook", "delete_webhook"])
+        self.assert_true(all(r.error is not None for r in results if not r.ok))
+
+    def test_apply_reads_every_page(self):
+        webhooks, requests = self._webhooks(page_size=1)
+        results = webhooks.apply(self.DESIRED, delete_missing=True, dry_run=True)
+
+        self.assert_equal(
+            sorted(r.action for r in results),
+            [
+                "create_header",
+                "create_webhook",
+                "delete_header",
+                "delete_webhook",
+                "update_header",
+            ],
+        )
+        gets = [c.url for c in requests.calls if c.method == "get"]
+        self.assert_len(gets, 5)
+
+    def test_apply_dry_run(self):
+        webhooks, requests = self._webhooks()
+        results = webhooks.apply(self.DESIRED[:1], dry_run=True)
+
+        self.assert_equal(
+            sorted(r.action for r in results),
+            ["create_header", "delete_header", "update_header"],
+        )
+        self.assert_true(all(r.response is None for r in results))
+        self.assert_true(all(c.method == "get" for c in requests.calls))
@@ -0,0 +1,317 @@
+import asyncio
+import io
+import json
+import threading
+
+import pytest
+from munch import Munch
+
+from blueink.constants import BLUEINK_WEBHOOK_SIGNATURE_HEADER, EVENT_TYPE
+from blueink.utils.testcase import TestCase
+from blueink.webhook_receiver import (
+    ALL_EVENTS,
+    LAST_EVENT_CHECKPOINT,
+    WebhookReceiver,
+    compute_signature,
+    verify_signature,
+)
+from blueink.webhook_store import RecentEventIds, SQLiteEventStore
+
+SECRET = "s3cret"
+
+
+def make_body(event_type=EVENT_TYPE.EVENT_BUNDLE_COMPLETE, **kwargs):
+    return json.dumps({"id": "ev1", "event_type": event_type, **kwargs}).encode()
+
+
+def wsgi_request(receiver, body, signature, method="POST"):
+    environ = {
+        "REQUEST_METHOD": method,
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body),
+        "HTTP_X_BLUEINK_SIGNATURE": signature,
+    }
+    statuses = []
+    response = receiver.wsgi(environ, lambda status, headers: statuses.append(status))
+    return statuses[0], b"".join(response)
+
+
+class TestWebhookReceiver(TestCase):
+    def _receiver(self):
+        received = []
+        receiver = WebhookReceiver(secret=SECRET)
+        receiver.on(EVENT_TYPE.EVENT_BUNDLE_COMPLETE, received.append)
+        return receiver, received
+
+    def test_verify_signature(self):
+        body = make_body()
+        signature = compute_signature(SECRET, body)
+
+        self.assert_true(verify_signature(SECRET, body, signature))
+        self.assert_true(verify_signature(SECRET, body, f"sha256={signature.upper()}"))
+        self.assert_false(verify_signature(SECRET, body + b" ", signature))
+        self.assert_false(verify_signature("other", body, signature))
+        self.assert_false(verify_signature(SECRET, body, None))
+
+    def test_wsgi(self):
+        receiver, received = self._receiver()
+        everything = []
+        receiver.on(ALL_EVENTS)(everything.append)
+
+        body = make_body(bundle={"id": "b1"})
+        status, _ = wsgi_request(receiver, body, compute_signature(SECRET, body))
+        receiver.shutdown()
+
+        self.assert_equal(status, "200 OK")
+        self.assert_len(received, 1)
+        self.assert_equal(received[0].bundle_id, "b1")
+        self.assert_len(everything, 1)
+
+    def test_wsgi_rejects(self):
+        receiver, received = self._receiver()
+        body = make_body()
+        signature = compute_signature(SECRET, body)
+
+        self.assert_equal(wsgi_request(receiver, body, "bad")[0], "401 Unauthorized")
+        self.assert_equal(
+            wsgi_request(receiver, body, signature, method="GET")[0],
+            "405 Method Not Allowed",
+        )
+        not_json = b"not json"
+        self.assert_equal(
+            wsgi_request(receiver, not_json, compute_signature(SECRET, not_json))[0],
+            "400 Bad Request",
+        )
+        receiver.shutdown()
+        self.assert_len(received, 0)
+
+    def test_handler_error_does_not_fail_delivery(self):
+        receiver = WebhookReceiver(secret=SECRET)
+
+        @receiver.on(EVENT_TYPE.EVENT_BUNDLE_COMPLETE)
+        def failing(event):
+            raise RuntimeError("handler failed")
+
+        body = make_body()
+        status, event = receiver.receive(
+            body, {BLUEINK_WEBHOOK_SIGNATURE_HEADER: compute_signature(SECRET, body)}
+        )
+        futures = receiver.dispatch(event)
+        receiver.shutdown()
+
+        self.assert_equal(status, 200)
+        with pytest.raises(RuntimeError):
+            futures[0].result()
+
+    def _asgi(self, receiver, body):
+        signature = compute_signature(SECRET, body).encode()
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "headers": [(b"x-blueink-signature", signature)],
+        }
+        messages = [
+            {"type": "http.request", "body": body[:10], "more_body": True},
+            {"type": "http.request", "body": body[10:]},
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(receiver.asgi(scope, receive, send))
+        receiver.shutdown()
+        return sent
+
+    def test_asgi(self):
+        receiver, received = self._receiver()
+        sent = self._asgi(receiver, make_body(bundle_id="b2"))
+
+        self.assert_equal(sent[0]["status"], 200)
+        self.assert_equal(received[0].bundle_id, "b2")
+
+    def test_asgi_retrieves_secret_off_the_event_loop(self):
+        threads = []
+
+        def retrieve_secret():
+            threads.append(threading.get_ident())
+            return Munch(data=Munch(secret=SECRET))
+
+        client = Munch(webhooks=Munch(retrieve_secret=retrieve_secret))
+        sent = self._asgi(WebhookReceiver(client=client), make_body())
+
+        self.assert_equal(sent[0]["status"], 200)
+        self.assert_len(threads, 1)
+        self.assert_not_equal(threads[0], threading.get_ident())
+
+    def test_secret_from_client(self):
+        calls = []
+
+        def retrieve_secret():
+            calls.append(1)
+            return Munch(data=Munch(secret=SECRET))
+
+        client = Munch(webhooks=Munch(retrieve_secret=retrieve_secret))
+        receiver = WebhookReceiver(client=client)
+        body = make_body()
+        for _ in range(2):
+            status, _ = receiver.receive(
+                body, {"x-blueink-signature": compute_signature(SECRET, body)}
+            )
+            self.assert_equal(status, 200)
+        receiver.shutdown()
+        self.assert_len(calls, 1)
+
+    def test_duplicate_deliveries_dispatched_once(self):
+        receiver, received = self._receiver()
+        body = make_body()
+        headers = {"x-blueink-signature": compute_signature(SECRET, body)}
+
+        first = receiver.receive(body, headers)
+        second = receiver.receive(body, headers)
+        receiver.shutdown()
+
+        self.assert_equal(first[0], 200)
+        self.assert_equal(second, (200, None))
+        self.assert_len(received, 1)
+
+    def test_reconcile(self):
+        events = {
+            "ev2": {"id": "ev2", "event_type": EVENT_TYPE.EVENT_BUNDLE_COMPLETE},
+            "ev3": {"id": "ev3", "event_type": EVENT_TYPE.EVENT_BUNDLE_COMPLETE},
+        }
+        pages = {
+            1: [{"id": "d1", "event": "ev1"}, {"id": "d2", "event": events["ev2"]}],
+            2: [{"id": "d3", "event": "ev3"}, {"id": "d4"}],
+        }
+        requests = []
+
+        def list_deliveries(page, per_page, **query_params):
+            requests.append(("list", page))
+            pagination = Munch(page_number=page, total_pages=2)
+            return Munch(data=pages[page], pagination=pagination)
+
+        def retrieve_event(event_id):
+            requests.append(("event", event_id))
+            return Munch(data=events[event_id])
+
+        def retrieve_delivery(delivery_id):
+            requests.append(("delivery", delivery_id))
+            return Munch(data={"id": delivery_id, "event": events["ev2"]})
+
+        client = Munch(
+            webhooks=Munch(
+                list_deliveries=list_deliveries,
+                retrieve_event=retrieve_event,
+                retrieve_delivery=retrieve_delivery,
+            )
+        )
+        receiver = WebhookReceiver(secret=SECRET, client=client)
+        received = []
+        receiver.on(EVENT_TYPE.EVENT_BUNDLE_COMPLETE, received.append)
+
+        # ev1 was received before
+        body = make_body()
+        receiver.receive(body, {"x-blueink-signature": compute_signature(SECRET, body)})
+        dispatched = receiver.reconcile()
+        receiver.shutdown()
+
+        self.assert_equal([e.id for e in dispatched], ["ev2", "ev3"])
+        self.assert_equal(sorted(e.id for e in received), ["ev1", "ev2", "ev3"])
+        self.assert_equal(
+            requests,
+            [("list", 1), ("list", 2), ("event", "ev3"), ("delivery", "d4")],
+        )
+
+    def test_catch_up(self):
+        # Newest first, three per page
+        listed = []
+
+        def add_events(ids):
+            for i in ids:
+                event = {
+                    "id": f"e{i}",
+                    "event_type": EVENT_TYPE.EVENT_PACKET_VIEWED,
+                    "created": f"2024-01-01T10:00:0{i}Z",
+                }
+                listed.insert(0, event)
+
+        pages_listed = []
+
+        def list_events(page, per_page, **query_params):
+            pages_listed.append(page)
+            total_pages = -(-len(listed) // per_page)
+            pagination = Munch(page_number=page, total_pages=total_pages)
+            start = (page - 1) * per_page
+            return Munch(data=listed[start : start + per_page], pagination=pagination)
+
+        client = Munch(webhooks=Munch(list_events=list_events))
+        store = RecentEventIds()
+        receiver = WebhookReceiver(secret=SECRET, client=client, event_store=store)
+        replayed = []
+        receiver.on(EVENT_TYPE.EVENT_PACKET_VIEWED, lambda e: replayed.append(e.id))
+
+        # The first run only records where to start from
+        add_events(range(1, 4))
+        self.assert_equal(receiver.catch_up(per_page=3), [])
+        self.assert_equal(store.get_checkpoint(LAST_EVENT_CHECKPOINT), "e3")
+
+        # e4 .. e9 happen during an outage; only e6 and e9 are delivered after it
+        add_events(range(4, 10))
+        for event_id in ("e6", "e9"):
+            body = json.dumps({"id": event_id, "event_type": "other"}).encode()
+            receiver.receive(
+                body, {"x-blueink-signature": compute_signature(SECRET, body)}
+            )
+        self.assert_equal(store.get_checkpoint(LAST_EVENT_CHECKPOINT), "e3")
+
+        pages_listed.clear()
+        events = receiver.catch_up(per_page=3, max_workers=2)
+        receiver.shutdown()
+
+        self.assert_equal([e.id for e in events], ["e4", "e5", "e7", "e8"])
+        self.assert_equal(replayed, ["e4", "e5", "e7", "e8"])
+        self.assert_equal(sorted(pages_listed), [1, 2, 3])
+        self.assert_equal(store.get_checkpoint(LAST_EVENT_CHECKPOINT), "e9")
+
+
+class TestEventStores(TestCase):
+    def test_recent_event_ids(self):
+        ids = RecentEventIds(max_size=2)
+
+        self.assert_true(ids.add("a"))
+        self.assert_false(ids.add("a"))
+        self.assert_true(ids.add("b"))
+        self.assert_true(ids.add("c"))
+        self.assert_len(ids, 2)
+        self.assert_false("a" in ids)
+        self.assert_true(ids.add("a"))
+        ids.discard("a")
+        self.assert_false("a" in ids)
+
+    def test_sqlite_event_store(self, tmp_path):
+        path = str(tmp_path / "events.sqlite3")
+        store = SQLiteEventStore(path, recent_size=1)
+        self.assert_true(store.add("a"))
+        self.assert_true(store.add("b"))
+        self.assert_false(store.add("a"))
+        store.close()
+
+        # A new process still knows them
+        store = SQLiteEventStore(path)
+        self.assert_true("a" in store)
+        self.assert_false(store.add("b"))
+        self.assert_len(store, 2)
+        # Pruned ids are forgotten in memory too
+        self.assert_equal(store.prune(max_age=-1), 2)
+        self.assert_false("b" in store)
+        self.assert_true(store.add("b"))
+        self.assert_true(store.add("a"))
+
+        store.set_checkpoint("last_event", "a")
+        store.set_checkpoint("last_event", "b")
+        self.assert_equal(store.get_checkpoint("last_event"), "b")
+        self.assert_equal(store.get_checkpoint("other"), None)
@@ -0,0 +1,617 @@
+import base64
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict, defaultdict, deque
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping
+
+import requests
+import urllib3
+from requests.structures import CaseInsensitiveDict
+
+from blueink.batch import DEFAULT_BACKOFF, RateLimiter, is_transient, retry_after
+
+# Bytes read at a time from response bodies
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Content encodings supported for request bodies, see CompressionMiddleware
+REQUEST_COMPRESSIONS = ("gzip", "deflate")
+
+# Request bodies smaller than this are sent uncompressed
+DEFAULT_COMPRESSION_THRESHOLD = 16 * 1024
+
+# Size of the slices of a request body fed to the compressor
+COMPRESSION_CHUNK_SIZE = 64 * 1024
+
+# Responses retried by RetryMiddleware: rate limiting and transient server errors
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Methods retried by RetryMiddleware. POST and PATCH are not idempotent; retrying
+# them could eg. create a Bundle twice.
+RETRY_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class TransportResponse:
+    def __init__(
+        self,
+        status: int,
+        headers: Mapping[str, str],
+        stream: Iterable[bytes],
+        reason: str = None,
+        url: str = None,
+        close: Callable[[], None] = None,
+    ):
+        """What a Transport returns for a request
+
+        Args:
+            status: HTTP status code
+            headers: response headers
+            stream: the body, decoded (eg. from gzip), as an iterable of chunks
+            reason: HTTP reason phrase
+            url: final URL of the response
+            close: releases the connection, if the body is not read to the end
+        """
+        self.status = status
+        self.headers = CaseInsensitiveDict(headers)
+        self.stream = stream
+        self.reason = reason
+        self.url = url
+        self._close = close
+
+    def read(self) -> bytes:
+        """Read the whole body, then release the connection"""
+        try:
+            return b"".join(self.stream)
+        finally:
+            self.close()
+
+    def close(self):
+        if self._close is not None:
+            self._close()
+
+
+def to_requests_response(
+    response: TransportResponse, request: requests.PreparedRequest
+) -> requests.Response:
+    """Read a TransportResponse into a requests.Response, as used by
+    NormalizedResponse, whatever the transport"""
+    adapted = requests.Response()
+    adapted.status_code = response.status
+    adapted.reason = response.reason
+    adapted.headers = response.headers
+    adapted._content = response.read()
+    adapted.url = response.url or request.url
+    adapted.request = request
+    return adapted
+
+
+class Transport:
+    """Sends prepared requests; the interface of every transport and middleware
+
+    A transport receives a requests.PreparedRequest (method, url, headers and an
+    encoded body) and returns a TransportResponse. Connection failures must be
+    raised as requests.ConnectionError, and timeouts as requests.Timeout, so
+    callers handle them the same way whatever the transport.
+    """
+
+    def send(self, request: requests.PreparedRequest) -> TransportResponse:
+        raise NotImplementedError
+
+    def close(self):
+        """Release the connections held by the transport"""
+
+
+class RequestsTransport(Transport):
+    def __init__(self, session: requests.Session = None, pool_maxsize: int = 32):
+        """Sends requests with a requests.Session, reusing its connections
+
+        Args:
+            session: Optional session to use, eg. with custom certificates
+            pool_maxsize: connections kept open per host, for a new session
+        """
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_maxsize)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+    def send(self, request: requests.PreparedRequest) -> TransportResponse:
+        # Proxy and certificate settings from the environment, as requests.request(),
+        # and a streamed body
+        settings = self.session.merge_environment_settings(
+            request.url, {}, True, None, None
+        )
+        response = self.session.send(request, **settings)
+        return TransportResponse(
+            response.status_code,
+            response.headers,
+            response.iter_content(STREAM_CHUNK_SIZE),
+            reason=response.reason,
+            url=response.url,
+            close=response.close,
+        )
+
+    def close(self):
+        self.session.close()
+
+
+class Urllib3Transport(Transport):
+    def __init__(self, pool_manager=None, maxsize: int = 32):
+        """Sends requests with a urllib3 PoolManager
+
+        Redirects are not followed, and failed requests not retried; see
+        RetryMiddleware.
+
+        Args:
+            pool_manager: Optional urllib3.PoolManager to use
+            maxsize: connections kept open per host, for a new pool manager
+        """
+        if pool_manager is None:
+            pool_manager = urllib3.PoolManager(maxsize=maxsize, retries=False)
+        self.pool_manager = pool_manager
+
+    def send(self, request: requests.PreparedRequest) -> TransportResponse:
+        try:
+            response = self.pool_manager.request(
+                request.method,
+                request.url,
+                body=request.body,
+                headers=dict(request.headers),
+                preload_content=False,
+                decode_content=True,
+                chunked="Content-Length" not in request.headers
+                and request.body is not None,
+            )
+        except urllib3.exceptions.NewConnectionError as e:
+            # A subclass of TimeoutError, for historical reasons
+            raise requests.ConnectionError(str(e), request=request) from e
+        except urllib3.exceptions.TimeoutError as e:
+            raise requests.Timeout(str(e), request=request) from e
+        except urllib3.exceptions.HTTPError as e:
+            raise requests.ConnectionError(str(e), request=request) from e
+        return TransportResponse(
+            response.status,
+            response.headers,
+            response.stream(STREAM_CHUNK_SIZE),
+            reason=response.reason,
+            url=request.url,
+            close=response.release_conn,
+        )
+
+    def close(self):
+        self.pool_manager.clear()
+
+
+class HttpxTransport(Transport):
+    def __init__(self, client=None, http2: bool = True, max_connections: int = 100):
+        """Sends requests with httpx, over HTTP/2 by default, multiplexing
+        concurrent requests to the API on a single connection
+
+        Requires httpx, with HTTP/2 support: pip install httpx[http2]
+
+        Args:
+            client: Optional httpx.Client to use
+            http2: negotiate HTTP/2, for a new client
+            max_connections: connections kept open, should the server only speak
+                HTTP/1.1, for a new client
+        """
+        try:
+            import httpx
+
+            if http2:
+                import h2  # noqa: F401
+        except ImportError:
+            raise RuntimeError(
+                "HTTP/2 requires httpx with HTTP/2 support, install it with"
+                " 'pip install httpx[http2]'"
+            )
+
+        self._httpx = httpx
+        if client is None:
+            # Thread-safe, and keeps one multiplexed connection per host
+            client = httpx.Client(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                ),
+            )
+        self.client = client
+
+    def send(self, request: requests.PreparedRequest) -> TransportResponse:
+        # The body was encoded by requests (JSON, form or multipart), so it is
+        # byte for byte the same whatever the transport
+        httpx = self._httpx
+        try:
+            response = self.client.send(
+                self.client.build_request(
+                    request.method,
+                    request.url,
+                    headers=dict(request.headers),
+                    content=request.body,
+                ),
+                stream=True,
+            )
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(str(e), request=request) from e
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(str(e), request=request) from e
+        return TransportResponse(
+            response.status_code,
+            response.headers,
+            response.iter_bytes(STREAM_CHUNK_SIZE),
+            reason=response.reason_phrase,
+            url=str(response.url),
+            close=response.close,
+        )
+
+    def close(self):
+        self.client.close()
+
+
+class ReplayTransport(Transport):
+    def __init__(self, records: List[dict]):
+        """Answers requests with recorded responses, without any network access
+
+        Each request is answered with the next unused record for its method and URL,
+        in order. Use RecordingMiddleware to record them.
+
+        Typical Usage:
+            transport = ReplayTransport.load("cassette.json")
+            client = Client("key", transport=transport)
+
+        Args:
+            records: dicts with method, url, status, headers and body (text), or
+                body_b64 for binary bodies
+        """
+        self._records = defaultdict(deque)
+        for record in records:
+            self._records[(record["method"].upper(), record["url"])].append(record)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> "ReplayTransport":
+        with open(path, encoding="utf-8") as file:
+            return cls(json.load(file))
+
+    def send(self, request: requests.PreparedRequest) -> TransportResponse:
+        with self._lock:
+            queue = self._records.get((request.method, request.url))
+            if not queue:
+                raise RuntimeError(
+                    f"No recorded response for {request.method} {request.url}"
+                )
+            record = queue.popleft()
+        if "body_b64" in record:
+            body = base64.b64decode(record["body_b64"])
+        else:
+            body = record.get("body", "").encode("utf-8")
+        return TransportResponse(
+            record["status"], record.get("headers") or {}, [body], url=request.url
+        )
+
+
+class Middleware(Transport):
+    def __init__(self, transport: Transport):
+        """A Transport adding behavior to another one, which it sends requests with
+
+        Middlewares are composed by wrapping, the outermost running first, eg.
+        MetricsMiddleware(RetryMiddleware(RequestsTransport()))
+        """
+        self.transport = transport
+
+    def send(self, request: requests.PreparedRequest) -> TransportResponse:
+        return self.transport.send(request)
+
+    def close(self):
+        self.transport.close()
+
+
+class RetryMiddleware(Middleware):
+    def __init__(
+        self,
+        transport: Transport,
+        retries: int = 3,
+        backoff: float = DEFAULT_BACKOFF,
+        statuses: Iterable[int] = RETRY_STATUSES,
+        methods: Iterable[str] = RETRY_METHODS,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """Retries requests failing with a connection error, a timeout, or a
+        retryable status, with exponential backoff
+
+        Args:
+            transport:
+            retries: number of times a request is retried
+            backoff: seconds before the first retry, doubled for each further one.
+                A longer Retry-After sent by the server is honored.
+            statuses: response statuses retried
+            methods: methods retried; by default only idempotent ones
+            sleep: waits for a number of seconds
+        """
+        super().__init__(transport)
+        self._retries = retries
+        self._backoff = backoff
+        self._statuses = frozenset(statuses)
+        self._methods = frozenset(method.upper() for method in methods)
+        self._sleep = sleep
+
+    def send(self, request: requests.PreparedRequest) -> TransportResponse:
+        if request.method not in self._methods:
+            return self.transport.send(request)
+
+        attempt = 1
+        while True:
+            try:
+                response = self.transport.send(request)
+            except Exception as e:
+                if attempt > self._retries or not is_transient(e):
+                    raise
+                delay = retry_after(getattr(e.response, "headers", None))
+            else:
+                if attempt > self._retries or response.status not in self._statuses:
+                    return response
+                delay = retry_after(response.headers)
+                response.close()
+            self._sleep(max(self._backoff * 2 ** (attempt - 1), delay))
+            attempt += 1
+
+
+class RateLimitMiddleware(Middleware):
+    def __init__(self, transport: Transport, rate: float, burst: int = 1):
+        """Limits how many requests are started per second, across threads
+
+        Args:
+            transport:
+            rate: sustained number of requests per second
+            burst: number of requests that can start at once after idling
+        """
+        super().__init__(transport)
+        self.rate_limiter = RateLimiter(rate, burst=burst)
+
+    def send(self, request: requests.PreparedRequest) -> TransportResponse:
+        self.rate_limiter.acquire()
+        return self.transport.send(request)
+
+
+class CacheMiddleware(Middleware):
+    def __init__(
+        self,
+        transport: Transport,
+        ttl: float = 60,
+        max_entries: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Serves repeated GET requests from memory, for responses that rarely
+        change, eg. Templates
+
+        Only successful (200) responses are cached, keyed by URL and credentials.
+
+        Args:
+            transport:
+            ttl: seconds a response is served from the cache
+            max_entries: number of responses kept; the least recently used go first
+            clock: returns the current time in seconds
+        """
+        super().__init__(transport)
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def send(self, request: requests.PreparedRequest) -> TransportResponse:
+        if request.method != "GET":
+            return self.transport.send(request)
+
+        key = (request.url, request.headers.get("Authorization"))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(key)
+                return self._response(entry)
+
+        response = self.transport.send(request)
+        if response.status != 200:
+            return response
+        entry = (
+            self._clock() + self._ttl,
+            response.status,
+            response.headers,
+            response.read(),
+            response.url,
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return self._response(entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def _response(entry) -> TransportResponse:
+        _, status, headers, body, url = entry
+        return TransportResponse(status, headers, [body], url=url)
+
+
+class MetricsMiddleware(Middleware):
+    def __init__(self, transport: Transport):
+        """Counts requests and their latency, by method and status
+
+        Typical Usage:
+            metrics = MetricsMiddleware(RequestsTransport())
+            client = Client(transport=metrics)
+            ...
+            print(metrics.snapshot())
+        """
+        super().__init__(transport)
+        self._lock = threading.Lock()
+        self._counts = defaultdict(int)
+        self._seconds = defaultdict(float)
+        self._errors = defaultdict(int)
+
+    def send(self, request: requests.PreparedRequest) -> TransportResponse:
+        start = time.perf_counter()
+        try:
+            response = self.transport.send(request)
+        except Exception as e:
+            with self._lock:
+                self._errors[(request.method, type(e).__name__)] += 1
+            raise
+        # Time to the response headers; the body is read by the caller
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._counts[(request.method, response.status)] += 1
+            self._seconds[(request.method, response.status)] += elapsed
+        return response
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Return the metrics so far
+
+        Returns:
+            {"requests": {(method, status): count},
+             "seconds": {(method, status): total seconds},
+             "errors": {(method, exception class name): count}}
+        """
+        with self._lock:
+            return {
+                "requests": dict(self._counts),
+                "seconds": dict(self._seconds),
+                "errors": dict(self._errors),
+            }
+
+
+class RecordingMiddleware(Middleware):
+    def __init__(self, transport: Transport):
+        """Records requests and their responses, to be replayed by a
+        ReplayTransport, eg. in tests"""
+        super().__init__(transport)
+        self.records = []
+        self._lock = threading.Lock()
+
+    def send(self, request: requests.PreparedRequest) -> TransportResponse:
+        response = self.transport.send(request)
+        body = response.read()
+        # The body is stored decoded
+        headers = {
+            name: value
+            for name, value in response.headers.items()
+            if name.lower() not in ("content-encoding", "content-length")
+        }
+        record = {
+            "method": request.method,
+            "url": request.url,
+            "status": response.status,
+            "headers": headers,
+        }
+        try:
+            record["body"] = body.decode("utf-8")
+        except UnicodeDecodeError:
+            record["body_b64"] = base64.b64encode(body).decode("ascii")
+        with self._lock:
+            self.records.append(record)
+        return TransportResponse(
+            response.status, response.headers, [body], response.reason, response.url
+        )
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.records, file, indent=2)
+
+
+def compress_chunks(
+    data: bytes, encoding: str = "gzip", chunk_size: int = COMPRESSION_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Compress data incrementally, yielding compressed chunks as they are produced
+
+    The input is read through a memoryview, so no copy of it is made, and the
+    compressed body never has to be held in memory as a whole.
+
+    Args:
+        data: the body to compress
+        encoding: "gzip" or "deflate" (zlib format, as HTTP's "deflate")
+        chunk_size: bytes of input compressed at a time
+    """
+    wbits = zlib.MAX_WBITS | 16 if encoding == "gzip" else zlib.MAX_WBITS
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, wbits)
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        chunk = compressor.compress(view[start : start + chunk_size])
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+class CompressedBody:
+    def __init__(
+        self,
+        data: bytes,
+        encoding: str = "gzip",
+        chunk_size: int = COMPRESSION_CHUNK_SIZE,
+    ):
+        """A request body compressed by compress_chunks() as it is sent
+
+        Unlike a generator, it compresses the data anew each time it is iterated,
+        so a request retried by a RetryMiddleware between the
+        CompressionMiddleware and the transport sends the whole body again.
+
+        Args:
+            data: the body to compress
+            encoding: "gzip" or "deflate"
+            chunk_size: bytes of input compressed at a time
+        """
+        self._data = data
+        self._encoding = encoding
+        self._chunk_size = chunk_size
+
+    def __iter__(self) -> Iterator[bytes]:
+        return compress_chunks(self._data, self._encoding, self._chunk_size)
+
+
+class CompressionMiddleware(Middleware):
+    def __init__(
+        self,
+        transport: Transport,
+        encoding: str = "gzip",
+        threshold: int = DEFAULT_COMPRESSION_THRESHOLD,
+    ):
+        """Compresses request bodies of at least threshold bytes as they are sent,
+        with chunked transfer encoding
+
+        The request passed on is a copy, so an outer RetryMiddleware sends the
+        original body again, and its body a CompressedBody, so an inner one sends
+        the whole compressed body again.
+
+        Args:
+            transport:
+            encoding: "gzip" or "deflate"
+            threshold: size in bytes from which bodies are compressed
+        """
+        if encoding not in REQUEST_COMPRESSIONS:
+            raise ValueError(
+                f"Unsupported compression {encoding!r}, use one of"
+                f" {', '.join(REQUEST_COMPRESSIONS)}"
+            )
+        super().__init__(transport)
+        self._encoding = encoding
+        self._threshold = threshold
+
+    def send(self, request: requests.PreparedRequest) -> TransportResponse:
+        body = request.body
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        if not isinstance(body, bytes) or len(body) < self._threshold:
+            return self.transport.send(request)
+
+        compressed = request.copy()
+        compressed.body = CompressedBody(body, self._encoding)
+        compressed.headers["Content-Encoding"] = self._encoding
+        # Without a Content-Length, the body is sent chunked
+        compressed.headers.pop("Content-Length", None)
+        return self.transport.send(compressed)
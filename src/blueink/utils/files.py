@@ -0,0 +1,224 @@
+import binascii
+import hashlib
+import io
+import mmap
+import os
+import threading
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# Default upper bound for the memory held by the process-wide EncodedFileCache
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Read size for incremental encoding. A multiple of 3, so that every chunk but the
+# last encodes to base64 without padding
+ENCODE_CHUNK_SIZE = 3 * 1024 * 1024
+
+# Characters decoded at a time when hashing base64 content. A multiple of 4, so
+# that every chunk of a well-formed payload decodes on its own
+DECODE_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def content_digest(data: bytes) -> str:
+    """Return the content address (sha256 hex digest) of raw file content"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def b64_content_digest(b64str: str, chunk_size: int = DECODE_CHUNK_SIZE) -> str:
+    """Return the content address of base64 encoded file content
+
+    The digest is computed over the decoded content, so it matches content_digest()
+    of the same file. The content is decoded and hashed chunk by chunk, so it is
+    never copied into memory as a whole.
+
+    Args:
+        b64str:
+        chunk_size: characters decoded at a time, must be a multiple of 4
+
+    Returns:
+        sha256 hex digest
+    """
+    if chunk_size <= 0 or chunk_size % 4:
+        raise ValueError("chunk_size must be a positive multiple of 4")
+
+    digest = hashlib.sha256()
+    try:
+        for start in range(0, len(b64str), chunk_size):
+            digest.update(binascii.a2b_base64(b64str[start : start + chunk_size]))
+    except binascii.Error:
+        # Line breaks or other ignored characters shifted the chunks off the 4
+        # character boundaries; decode as a whole
+        return content_digest(b64decode(b64str))
+    return digest.hexdigest()
+
+
+def encode_file(file_path: str, chunk_size: int = ENCODE_CHUNK_SIZE) -> Tuple[str, str]:
+    """Return the content digest and base64 encoding of a file
+
+    See encode_file_object()
+
+    Args:
+        file_path:
+        chunk_size:
+
+    Returns:
+        (digest, b64str)
+    """
+    with open(file_path, "rb") as file:
+        return encode_file_object(file, chunk_size)
+
+
+def encode_file_object(file, chunk_size: int = ENCODE_CHUNK_SIZE) -> Tuple[str, str]:
+    """Return the content digest and base64 encoding of an open binary file
+
+    Regular files are memory-mapped and hashed / encoded chunk by chunk, so the raw
+    content is never copied into memory as a whole, and peak memory stays close to
+    the size of the encoded output. Other file objects are read in one go. The whole
+    file is encoded, regardless of its current position.
+
+    Args:
+        file: binary file object
+        chunk_size: bytes encoded at a time, must be a multiple of 3
+
+    Returns:
+        (digest, b64str)
+    """
+    if chunk_size <= 0 or chunk_size % 3:
+        raise ValueError("chunk_size must be a positive multiple of 3")
+
+    try:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        # Not a regular file, or empty (which can't be mapped)
+        file.seek(0)
+        data = file.read()
+        return content_digest(data), b64encode(data).decode("utf-8")
+
+    digest = hashlib.sha256()
+    b64str = ""
+    with mapped:
+        for start in range(0, len(mapped), chunk_size):
+            chunk = mapped[start : start + chunk_size]
+            digest.update(chunk)
+            # As b64str is the only reference to the string, CPython resizes it in
+            # place rather than copying it, keeping a single growing buffer
+            b64str += binascii.b2a_base64(chunk, newline=False).decode("ascii")
+    return digest.hexdigest(), b64str
+
+
+class EncodedFileCache:
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        """Thread-safe LRU cache of base64 encoded file contents
+
+        Payloads are keyed by content digest, so the same content is only encoded
+        and held once. Files read by path are additionally indexed by path, size
+        and modification time, so an unchanged file is not even re-read.
+
+        Args:
+            max_bytes: upper bound for the size of the cached payloads. Payloads
+                larger than this are encoded, but not cached.
+        """
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._payloads = OrderedDict()  # digest -> b64 str
+        self._paths = OrderedDict()  # (path, size, mtime_ns) -> digest
+        self._size = 0
+
+    def __len__(self):
+        return len(self._payloads)
+
+    def __reduce__(self):
+        # Helpers holding a cache must be picklable, eg. to be compiled in another
+        # process. The shared cache pickles by reference, any other cache as a new,
+        # empty one.
+        if self is encoded_file_cache:
+            return "encoded_file_cache"
+        return EncodedFileCache, (self._max_bytes,)
+
+    def clear(self):
+        with self._lock:
+            self._payloads.clear()
+            self._paths.clear()
+            self._size = 0
+
+    def encode_path(self, file_path: str) -> Tuple[str, str]:
+        """Return the content digest and base64 encoding of a file
+
+        Args:
+            file_path:
+
+        Returns:
+            (digest, b64str)
+        """
+        stat = os.stat(file_path)
+        path_key = (os.path.realpath(file_path), stat.st_size, stat.st_mtime_ns)
+
+        with self._lock:
+            digest = self._paths.get(path_key)
+            b64str = self._get(digest) if digest else None
+        if b64str is not None:
+            return digest, b64str
+
+        digest, b64str = encode_file(file_path)
+        b64str = self.put(digest, b64str)
+
+        with self._lock:
+            if digest in self._payloads:
+                self._paths[path_key] = digest
+                self._trim_paths()
+        return digest, b64str
+
+    def encode_bytes(self, data: bytes) -> Tuple[str, str]:
+        """Return the content digest and base64 encoding of raw file content
+
+        Args:
+            data:
+
+        Returns:
+            (digest, b64str)
+        """
+        digest = content_digest(data)
+        with self._lock:
+            b64str = self._get(digest)
+        if b64str is None:
+            b64str = self.put(digest, b64encode(data).decode("utf-8"))
+        return digest, b64str
+
+    def put(self, digest: str, b64str: str) -> str:
+        """Cache an encoded payload under its content digest
+
+        Returns:
+            the cached payload, which is an already cached copy if there is one
+        """
+        if len(b64str) > self._max_bytes:
+            return b64str
+
+        with self._lock:
+            cached = self._get(digest)
+            if cached is not None:
+                return cached
+
+            self._payloads[digest] = b64str
+            self._size += len(b64str)
+            while self._size > self._max_bytes:
+                _, evicted = self._payloads.popitem(last=False)
+                self._size -= len(evicted)
+        return b64str
+
+    def _get(self, digest: str) -> Optional[str]:
+        # Must be called with the lock held
+        b64str = self._payloads.get(digest)
+        if b64str is not None:
+            self._payloads.move_to_end(digest)
+        return b64str
+
+    def _trim_paths(self):
+        # Must be called with the lock held. Stale path entries are harmless, just
+        # keep their number in proportion to the payloads
+        while len(self._paths) > 4 * len(self._payloads) + 16:
+            self._paths.popitem(last=False)
+
+
+# Shared by all BundleHelpers in this process, unless they are given another cache
+encoded_file_cache = EncodedFileCache()
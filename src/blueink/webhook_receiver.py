@@ -0,0 +1,427 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Mapping, Optional
+
+from pydantic import ValidationError
+
+from blueink.batch import run_batch
+from blueink.constants import BLUEINK_WEBHOOK_SIGNATURE_HEADER
+from blueink.model.webhook import WebhookEvent
+from blueink.webhook_store import RecentEventIds
+
+logger = logging.getLogger(__name__)
+
+# Registering a handler for this event type receives every event
+ALL_EVENTS = "*"
+
+# Name of the event store checkpoint holding the id of the newest event catch_up()
+# went through
+LAST_EVENT_CHECKPOINT = "last_event"
+
+# Requests with larger bodies are rejected without being read
+DEFAULT_MAX_BODY_SIZE = 1024 * 1024
+
+_STATUS_TEXT = {
+    200: "200 OK",
+    400: "400 Bad Request",
+    401: "401 Unauthorized",
+    405: "405 Method Not Allowed",
+    413: "413 Payload Too Large",
+}
+
+
+def compute_signature(secret: str, body: bytes) -> str:
+    """Return the HMAC-SHA256 hex digest of a webhook body, keyed with the secret"""
+    return hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """Check a webhook signature in constant time
+
+    Args:
+        secret: the webhook secret, see client.webhooks.retrieve_secret()
+        body: the raw request body
+        signature: value of the signature header, hex encoded, optionally
+            prefixed with "sha256="
+
+    Returns:
+        True if the signature matches
+    """
+    if not signature:
+        return False
+    if signature.startswith("sha256="):
+        signature = signature[len("sha256=") :]
+    return hmac.compare_digest(compute_signature(secret, body), signature.lower())
+
+
+class WebhookReceiver:
+    def __init__(
+        self,
+        secret: str = None,
+        client=None,
+        max_workers: int = 4,
+        max_body_size: int = DEFAULT_MAX_BODY_SIZE,
+        event_store=None,
+    ):
+        """Receives webhook deliveries, verifies and dispatches them to handlers
+
+        Usable as a WSGI application (wsgi()) or an ASGI application (asgi()).
+        Each request is verified against the webhook secret and parsed into a
+        WebhookEvent. The handlers registered for its event type are then run on a
+        worker pool, and the request is acknowledged right away, without waiting
+        for them. Exceptions raised by handlers are logged.
+
+        Handlers run concurrently, so events for the same Bundle may be handled in
+        a different order than they were delivered.
+
+        Deliveries can be retried, so every event id is recorded in an event store
+        before its handlers are scheduled, and repeated deliveries of an event are
+        acknowledged without running them again. Events missed altogether, eg.
+        while the receiver was down, can be recovered with catch_up() or
+        reconcile().
+
+        Typical Usage:
+            receiver = WebhookReceiver(client=client)
+
+            @receiver.on(EVENT_TYPE.EVENT_BUNDLE_COMPLETE)
+            def bundle_complete(event: WebhookEvent):
+                print(event.bundle_id)
+
+            # eg. with a WSGI server
+            app = receiver.wsgi
+
+        Args:
+            secret: the webhook secret. If not given, it is retrieved with
+                client.webhooks.retrieve_secret() on the first delivery.
+            client: a blueink Client, required if no secret is given
+            max_workers: number of threads running handlers
+            max_body_size: larger requests are rejected
+            event_store: records the ids of received events, eg. a
+                SQLiteEventStore to drop duplicates across restarts. Defaults to
+                an in-memory RecentEventIds.
+        """
+        if secret is None and client is None:
+            raise ValueError("Either a secret or a client is required")
+
+        self._secret = secret
+        self._client = client
+        self._max_body_size = max_body_size
+        self._event_store = event_store if event_store is not None else RecentEventIds()
+        self._handlers: Dict[str, List[Callable]] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="blueink-webhook"
+        )
+
+    def on(self, event_type: str, handler: Callable = None):
+        """Register a handler for an event type
+
+        Can be used as a decorator, or called with the handler.
+
+        Args:
+            event_type: one of EVENT_TYPE, or ALL_EVENTS
+            handler: called with the WebhookEvent, in a worker thread
+
+        Returns:
+            the handler, or a decorator if no handler is given
+        """
+
+        def register(func: Callable) -> Callable:
+            with self._lock:
+                self._handlers.setdefault(event_type, []).append(func)
+            return func
+
+        if handler is None:
+            return register
+        return register(handler)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker pool, by default waiting for running handlers"""
+        self._executor.shutdown(wait=wait)
+
+    @property
+    def secret(self) -> str:
+        if self._secret is None:
+            with self._lock:
+                if self._secret is None:
+                    response = self._client.webhooks.retrieve_secret()
+                    self._secret = response.data.secret
+        return self._secret
+
+    def receive(self, body: bytes, headers: Mapping[str, str]):
+        """Verify and parse a delivery, and schedule its handlers
+
+        For use with web frameworks other than plain WSGI / ASGI.
+
+        Args:
+            body: the raw request body
+            headers: the request headers; names are matched case insensitively
+
+        Returns:
+            (HTTP status to respond with, the event or None if it was rejected or
+            is a duplicate)
+        """
+        signature = None
+        for name, value in headers.items():
+            if name.lower() == BLUEINK_WEBHOOK_SIGNATURE_HEADER.lower():
+                signature = value
+        if not verify_signature(self.secret, body, signature):
+            return 401, None
+
+        try:
+            event = WebhookEvent.parse_obj(json.loads(body))
+        except (ValueError, TypeError, ValidationError):
+            return 400, None
+
+        if not self._accept(event):
+            return 200, None
+        self.dispatch(event)
+        return 200, event
+
+    def catch_up(
+        self,
+        per_page: int = 100,
+        max_workers: int = 4,
+        max_pages: int = None,
+        **query_params,
+    ) -> List[WebhookEvent]:
+        """Replay the events listed since the last catch-up
+
+        Pages through client.webhooks.list_events() (newest first) until the
+        checkpointed last event is found, fetching max_workers pages at a time
+        concurrently. The events after it are then replayed oldest first (by
+        their "created" time, when listed), running their handlers in the calling
+        thread, one event after the other. Events already received are skipped,
+        and the checkpoint advances with every replayed event, so catch_up() can be
+        interrupted and run again. Only catch_up() moves the checkpoint: live
+        deliveries are just recorded in the event store, so events missed during
+        an outage are still found after deliveries resume. Requires a client.
+
+        Without a checkpoint (eg. on the first run) nothing is replayed; the newest
+        event becomes the checkpoint.
+
+        Args:
+            per_page: number of events per page
+            max_workers: number of pages fetched concurrently
+            max_pages: Optional bound on the number of pages read, should the
+                checkpoint event no longer be listed
+            query_params: filters for list_events()
+
+        Returns:
+            the events replayed
+        """
+        if self._client is None:
+            raise RuntimeError("Catching up on events requires a client")
+
+        webhooks = self._client.webhooks
+        checkpoint = self._event_store.get_checkpoint(LAST_EVENT_CHECKPOINT)
+
+        def list_page(page):
+            return webhooks.list_events(page=page, per_page=per_page, **query_params)
+
+        first = list_page(1)
+        if checkpoint is None:
+            if first.data:
+                newest = first.data[0].get("id")
+                self._event_store.set_checkpoint(LAST_EVENT_CHECKPOINT, newest)
+            return []
+
+        total_pages = first.pagination.total_pages if first.pagination else 1
+        if max_pages is not None:
+            total_pages = min(total_pages, max_pages)
+
+        # Events newer than the checkpoint, newest first
+        missed = []
+        found = self._collect_missed(first.data, checkpoint, missed)
+        page = 2
+        while not found and page <= total_pages:
+            window = range(page, min(page + max_workers, total_pages + 1))
+            for result in run_batch(list_page, window, max_workers=max_workers):
+                if not result.ok:
+                    raise result.error
+                if not found:
+                    found = self._collect_missed(
+                        result.response.data, checkpoint, missed
+                    )
+            page = window.stop
+
+        events = [WebhookEvent.parse_obj(event) for event in reversed(missed)]
+        if all(getattr(event, "created", None) for event in events):
+            events.sort(key=lambda event: event.created)
+
+        replayed = []
+        for event in events:
+            if self._accept(event):
+                for handler in self._handlers_for(event):
+                    try:
+                        self._run(handler, event)
+                    except Exception:
+                        pass  # Logged by _run(), like for live deliveries
+                replayed.append(event)
+            if event.id is not None:
+                self._event_store.set_checkpoint(LAST_EVENT_CHECKPOINT, event.id)
+        return replayed
+
+    @staticmethod
+    def _collect_missed(events: List[dict], checkpoint: str, missed: list) -> bool:
+        # Add the events listed before the checkpoint to missed, returning True
+        # once the checkpoint is found
+        for event in events:
+            if event.get("id") == checkpoint:
+                return True
+            missed.append(event)
+        return False
+
+    def reconcile(self, per_page: int = 50, **query_params) -> List[WebhookEvent]:
+        """Dispatch the events of deliveries that never reached this receiver
+
+        Pages through client.webhooks.list_deliveries(), and dispatches every
+        event not recorded in the event store, eg. because the receiver was down.
+        Event details missing from the listing are fetched with
+        retrieve_delivery() or retrieve_event(). Requires a client.
+
+        Args:
+            per_page: number of deliveries per page
+            query_params: filters for list_deliveries()
+
+        Returns:
+            the events dispatched
+        """
+        if self._client is None:
+            raise RuntimeError("Reconciling deliveries requires a client")
+
+        dispatched = []
+        page = 1
+        while True:
+            response = self._client.webhooks.list_deliveries(
+                page=page, per_page=per_page, **query_params
+            )
+            for delivery in response.data:
+                event = self._delivery_event(delivery)
+                if event is not None and self._accept(event):
+                    self.dispatch(event)
+                    dispatched.append(event)
+
+            pagination = response.pagination
+            if pagination is None or page >= pagination.total_pages:
+                return dispatched
+            page += 1
+
+    def _delivery_event(self, delivery: dict) -> Optional[WebhookEvent]:
+        webhooks = self._client.webhooks
+        event = delivery.get("event")
+        if isinstance(event, str):
+            # Only the id is listed; skip the request for events already seen
+            if event in self._event_store:
+                return None
+            event = webhooks.retrieve_event(event).data
+        elif event is None:
+            event = webhooks.retrieve_delivery(delivery["id"]).data.get("event")
+        if not isinstance(event, dict):
+            return None
+        return WebhookEvent.parse_obj(event)
+
+    def _accept(self, event: WebhookEvent) -> bool:
+        # Record the event, returning False if it was seen before
+        return event.id is None or self._event_store.add(event.id)
+
+    def dispatch(self, event: WebhookEvent) -> List[Future]:
+        """Schedule the handlers for an event on the worker pool
+
+        Returns:
+            one Future per handler
+        """
+        handlers = self._handlers_for(event)
+        return [self._executor.submit(self._run, h, event) for h in handlers]
+
+    def _handlers_for(self, event: WebhookEvent) -> List[Callable]:
+        with self._lock:
+            return self._handlers.get(event.event_type, []) + self._handlers.get(
+                ALL_EVENTS, []
+            )
+
+    @staticmethod
+    def _run(handler: Callable, event: WebhookEvent):
+        try:
+            return handler(event)
+        except Exception:
+            logger.exception(
+                "Webhook handler %r failed for event %s", handler, event.id
+            )
+            raise
+
+    def wsgi(self, environ: dict, start_response: Callable):
+        """WSGI application receiving webhook deliveries"""
+        status = self._check_request(
+            environ.get("REQUEST_METHOD"), environ.get("CONTENT_LENGTH")
+        )
+        if status is None:
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+            body = environ["wsgi.input"].read(length)
+            headers = {
+                key[len("HTTP_") :].replace("_", "-"): value
+                for key, value in environ.items()
+                if key.startswith("HTTP_")
+            }
+            status = self.receive(body, headers)[0]
+
+        start_response(_STATUS_TEXT[status], [("Content-Type", "text/plain")])
+        return [_STATUS_TEXT[status].encode("utf-8")]
+
+    async def asgi(self, scope: dict, receive: Callable, send: Callable):
+        """ASGI (HTTP) application receiving webhook deliveries"""
+        if scope["type"] != "http":
+            return
+
+        headers = {
+            name.decode("latin-1"): value.decode("latin-1")
+            for name, value in scope.get("headers", [])
+        }
+        status = self._check_request(scope.get("method"), headers.get("content-length"))
+        if status is None:
+            chunks = []
+            size = 0
+            more_body = True
+            while more_body:
+                message = await receive()
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                if size > self._max_body_size:
+                    status = 413
+                    break
+                chunks.append(chunk)
+                more_body = message.get("more_body", False)
+            if status is None:
+                if self._secret is None:
+                    # Retrieving the secret is a blocking request; keep it off the
+                    # event loop
+                    loop = asyncio.get_running_loop()
+                    await loop.run_in_executor(None, lambda: self.secret)
+                # Verifying and parsing are quick; handlers run on the worker pool
+                status = self.receive(b"".join(chunks), headers)[0]
+
+        text = _STATUS_TEXT[status].encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(b"content-type", b"text/plain")],
+            }
+        )
+        await send({"type": "http.response.body", "body": text})
+
+    def _check_request(self, method: str, content_length) -> Optional[int]:
+        # The status to reject a request with before reading its body, if any
+        if method != "POST":
+            return 405
+        try:
+            if int(content_length or 0) > self._max_body_size:
+                return 413
+        except ValueError:
+            return 400
+        return None
@@ -0,0 +1,161 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# Default number of event ids remembered in memory
+DEFAULT_RECENT_EVENT_IDS = 10000
+
+
+class RecentEventIds:
+    def __init__(self, max_size: int = DEFAULT_RECENT_EVENT_IDS):
+        """Bounded, thread-safe set of the most recently seen webhook event ids
+
+        Drops duplicate deliveries of recent events without any I/O. Once full, the
+        least recently seen ids are forgotten, so memory stays bounded. Also holds
+        named checkpoints, eg. the last event seen (see WebhookReceiver.catch_up()),
+        for the lifetime of the process.
+
+        Args:
+            max_size: number of event ids remembered
+        """
+        self._max_size = max_size
+        self._ids = OrderedDict()
+        self._checkpoints = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, event_id: str):
+        with self._lock:
+            return event_id in self._ids
+
+    def add(self, event_id: str) -> bool:
+        """Record an event id
+
+        Returns:
+            True if the id was not seen before, False for a duplicate
+        """
+        with self._lock:
+            if event_id in self._ids:
+                self._ids.move_to_end(event_id)
+                return False
+            self._ids[event_id] = None
+            if len(self._ids) > self._max_size:
+                self._ids.popitem(last=False)
+            return True
+
+    def discard(self, event_id: str):
+        """Forget an event id, if it is remembered"""
+        with self._lock:
+            self._ids.pop(event_id, None)
+
+    def get_checkpoint(self, name: str) -> Optional[str]:
+        return self._checkpoints.get(name)
+
+    def set_checkpoint(self, name: str, value: str):
+        self._checkpoints[name] = value
+
+
+class SQLiteEventStore:
+    def __init__(self, path: str, recent_size: int = DEFAULT_RECENT_EVENT_IDS):
+        """Persistent record of processed webhook event ids, stored in SQLite
+
+        Survives restarts and can be shared by several receiver processes. Recent
+        ids are also kept in memory (see RecentEventIds), so most duplicates are
+        dropped without a query. Named checkpoints are persisted as well.
+
+        Args:
+            path: SQLite database file
+            recent_size: number of event ids also remembered in memory
+        """
+        self._recent = RecentEventIds(recent_size)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS webhook_events (
+                event_id TEXT PRIMARY KEY,
+                received_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS webhook_events_received_at
+                ON webhook_events (received_at);
+            CREATE TABLE IF NOT EXISTS webhook_checkpoints (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM webhook_events").fetchone()[0]
+
+    def __contains__(self, event_id: str):
+        if event_id in self._recent:
+            return True
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM webhook_events WHERE event_id = ?", (event_id,)
+            ).fetchone()
+        return row is not None
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def add(self, event_id: str) -> bool:
+        """Record an event id
+
+        Returns:
+            True if the id was not seen before, False for a duplicate
+        """
+        if not self._recent.add(event_id):
+            return False
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO webhook_events VALUES (?, ?)",
+                (event_id, time.time()),
+            )
+        return cursor.rowcount == 1
+
+    def prune(self, max_age: float) -> int:
+        """Forget event ids recorded more than max_age seconds ago, in the
+        database and in memory
+
+        Returns:
+            number of ids removed
+        """
+        cutoff = time.time() - max_age
+        with self._lock, self._db:
+            pruned = [
+                row[0]
+                for row in self._db.execute(
+                    "SELECT event_id FROM webhook_events WHERE received_at < ?",
+                    (cutoff,),
+                )
+            ]
+            self._db.execute(
+                "DELETE FROM webhook_events WHERE received_at < ?", (cutoff,)
+            )
+        for event_id in pruned:
+            self._recent.discard(event_id)
+        return len(pruned)
+
+    def get_checkpoint(self, name: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM webhook_checkpoints WHERE name = ?", (name,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_checkpoint(self, name: str, value: str):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO webhook_checkpoints VALUES (?, ?)",
+                (name, value),
+            )